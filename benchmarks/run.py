@@ -0,0 +1,194 @@
+"""Times each stage of the merge/purge workflow on synthetic lists
+
+Usage:
+    python benchmarks/run.py --sizes 1000,10000 --output results.json
+    python benchmarks/run.py --sizes 1000,10000 --compare results.json
+
+Each scenario reports its wall time, a throughput in records (or matches) per second and, unless
+--no-memory is given, the peak memory traced while it ran (in a second, untimed run, since tracing
+slows Python down). Results are written as JSON so runs of different versions can be compared.
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict
+
+import context  # noqa: F401
+import pandas as pd
+import synthetic
+from mergepurge import clean, match, purge
+from mergepurge.index import BlockingIndex
+
+
+LOC_COLS     = ['address', 'city', 'state', 'zipcode']
+CONTACT_COLS = ['first', 'last']
+COMPANY_COLS = ['company']
+
+
+def _clean(df, **kwargs):
+    return clean.build_matching_cols(df.copy(), LOC_COLS, CONTACT_COLS, COMPANY_COLS, **kwargs)
+
+
+def scenarios(size, dup_rate, noise):
+    """Builds the inputs for one size and returns a dict of name -> (function, records)
+
+    Each function runs one stage on inputs prepared ahead of time, so only that stage is timed.
+    """
+
+    search_in, search_for = synthetic.lists(size, size, dup_rate=dup_rate, noise=noise)
+
+    clean.PARSE_CACHE.clear()
+    cleaned_in = _clean(search_in)
+    cleaned_for = _clean(search_for)
+    idx = BlockingIndex(cleaned_in)
+    related = match.find_related(cleaned_for, idx)
+    n_matches = sum(len(m) for (_, _, m) in related)
+    dupes = pd.concat([cleaned_in, cleaned_for], ignore_index=True)
+
+    def clean_uncached():
+        _clean(search_for, cache=False)
+
+    def clean_cached():
+        clean.PARSE_CACHE.clear()
+        _clean(search_for)
+
+    def clean_fast_path():
+        _clean(search_for, cache=False, fast_path=True)
+
+    return OrderedDict([
+        ('build_matching_cols', (clean_uncached, size)),
+        ('build_matching_cols_cached', (clean_cached, size)),
+        ('build_matching_cols_fast_path', (clean_fast_path, size)),
+        ('build_index', (lambda: BlockingIndex(cleaned_in), size)),
+        ('find_related', (lambda: match.find_related(cleaned_for, idx), size)),
+        ('find_neighbors', (lambda: match.find_neighbors(cleaned_for, cleaned_in), size)),
+        ('merge_lists', (lambda: match.merge_lists(cleaned_for, cleaned_in, related, ['email']),
+                         n_matches)),
+        ('purge', (lambda: purge.find_duplicates(dupes), len(dupes))),
+    ])
+
+
+def measure(func, records, memory=True):
+    """Times func() and optionally traces its peak memory
+
+    Returns:
+        result (dict): seconds, records, per_second and peak_mb
+    """
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - start
+
+        peak_mb = None
+        if memory:
+            tracemalloc.start()
+            func()
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+
+    return OrderedDict([('seconds', round(seconds, 4)),
+                        ('records', records),
+                        ('per_second', round(records / seconds, 1) if seconds > 0 else None),
+                        ('peak_mb', None if peak_mb is None else round(peak_mb, 2))])
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, dup_rate=0.5, noise=0.1, memory=True, only=None):
+    """Runs every scenario at every size
+
+    Returns:
+        results (dict): environment info and a list of one dict per scenario and size
+    """
+
+    results = OrderedDict([
+        ('revision', _git_revision()),
+        ('python', platform.python_version()),
+        ('pandas', pd.__version__),
+        ('dup_rate', dup_rate),
+        ('noise', noise),
+        ('runs', []),
+    ])
+
+    for size in sizes:
+        with contextlib.redirect_stdout(io.StringIO()):
+            stages = scenarios(size, dup_rate, noise)
+
+        for (name, (func, records)) in stages.items():
+            if only and name not in only:
+                continue
+            result = OrderedDict([('scenario', name), ('size', size)])
+            result.update(measure(func, records, memory))
+            results['runs'].append(result)
+            print('{scenario:>28} {size:>9} {seconds:>10.3f}s {per_second:>12}/s'
+                  ' {peak_mb} MB'.format(**result), file=sys.stderr)
+
+    return results
+
+
+def compare(baseline, results, tolerance=0.1):
+    """Lists the runs that got slower than baseline by more than tolerance (a fraction)"""
+
+    before = {(r['scenario'], r['size']): r for r in baseline['runs']}
+    slower = []
+    for run_ in results['runs']:
+        old = before.get((run_['scenario'], run_['size']))
+        if old is None or not old['seconds']:
+            continue
+        ratio = run_['seconds'] / old['seconds']
+        if ratio > 1 + tolerance:
+            slower.append((run_['scenario'], run_['size'], round(ratio, 2)))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000',
+                        help='comma separated number of records in each list')
+    parser.add_argument('--dup-rate', type=float, default=0.5)
+    parser.add_argument('--noise', type=float, default=0.1)
+    parser.add_argument('--scenarios', default='', help='comma separated scenarios to run')
+    parser.add_argument('--no-memory', action='store_true', help="don't trace peak memory")
+    parser.add_argument('--output', help='file to write the JSON results to, default stdout')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare to')
+    parser.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    only = [name for name in args.scenarios.split(',') if name]
+
+    results = run(sizes, args.dup_rate, args.noise, not args.no_memory, only)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            slower = compare(json.load(f), results, args.tolerance)
+        for (scenario, size, ratio) in slower:
+            print('{} at {} records is {}x slower'.format(scenario, size, ratio), file=sys.stderr)
+        return 1 if slower else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
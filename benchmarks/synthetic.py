@@ -0,0 +1,169 @@
+"""Synthetic contact/account lists for benchmarking
+
+Generates a list of unique contacts (the list searched in) and a list of records to search for,
+some of which are noisy copies of contacts in the first list, at any scale.
+"""
+import numpy as np
+import pandas as pd
+
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda',
+               'David', 'Elizabeth', 'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica',
+               'Thomas', 'Sarah', 'Charles', 'Karen', 'Christopher', 'Lisa', 'Daniel', 'Nancy',
+               'Matthew', 'Betty', 'Anthony', 'Margaret', 'Mark', 'Sandra', 'Donald', 'Ashley',
+               'Steven', 'Kimberly', 'Paul', 'Emily', 'Andrew', 'Donna', 'Joshua', 'Michelle',
+               'Kenneth', 'Carol', 'Kevin', 'Amanda', 'Brian', 'Dorothy', 'George', 'Melissa',
+               'Timothy', 'Deborah', 'Kathrine', 'Lavern', 'Heather', 'Rob', 'Catherine']
+
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis',
+              'Rodriguez', 'Martinez', 'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson',
+              'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin', 'Lee', 'Perez', 'Thompson', 'White',
+              'Harris', 'Sanchez', 'Clark', 'Ramirez', 'Lewis', 'Robinson', 'Walker', 'Young',
+              'Allen', 'King', 'Wright', 'Scott', 'Torres', 'Nguyen', 'Hill', 'Flores', 'Green',
+              'Adams', 'Nelson', 'Baker', 'Hall', 'Rivera', 'Campbell', 'Mitchell', 'Carter',
+              'Roberts', 'Kline', 'Bannister', 'Sanford', 'Chatman', 'Smyth']
+
+STREET_NAMES = ['Oak', 'Pine', 'Maple', 'Cedar', 'Elm', 'Washington', 'Lake', 'Hill', 'Park',
+                'Main', 'Oakgreen', 'Tall Pine', 'Black Springs', 'Sunset', 'River', 'Highland',
+                'Forest', 'Meadow', 'Ridge', 'Valley', 'Church', 'Spring', 'Mill', 'Walnut']
+
+STREET_TYPES = ['St', 'Ave', 'Rd', 'Dr', 'Ln', 'Blvd', 'Ct', 'Way', 'Trail', 'Cove', 'Cir', 'Pl']
+
+# (city, state, zip prefix)
+CITIES = [('Kieler', 'WI', '538'), ('Sheffield', 'IL', '613'), ('Chicago', 'IL', '606'),
+          ('Springfield', 'IL', '627'), ('Madison', 'WI', '537'), ('Milwaukee', 'WI', '532'),
+          ('Los Angeles', 'CA', '900'), ('San Diego', 'CA', '921'), ('Fresno', 'CA', '937'),
+          ('Sacramento', 'CA', '958'), ('Houston', 'TX', '770'), ('Austin', 'TX', '787'),
+          ('Dallas', 'TX', '752'), ('New York', 'NY', '100'), ('Buffalo', 'NY', '142'),
+          ('Albany', 'NY', '122'), ('Miami', 'FL', '331'), ('Orlando', 'FL', '328'),
+          ('Tampa', 'FL', '336'), ('Seattle', 'WA', '981'), ('Spokane', 'WA', '992'),
+          ('Denver', 'CO', '802'), ('Boulder', 'CO', '803'), ('Phoenix', 'AZ', '850'),
+          ('Tucson', 'AZ', '857'), ('Pittsburgh', 'PA', '152'), ('Philadelphia', 'PA', '191')]
+
+COMPANY_WORDS = ['Research', 'Software', 'Solutions', 'Speed', 'Omega', 'General', 'Power',
+                 'Studio', 'Star', 'Universal', 'Max', 'Internet', 'Innovation', 'Application',
+                 'Network', 'East', 'Global', 'Systems', 'Data', 'Health', 'Logistics', 'Energy',
+                 'Capital', 'Partners', 'Digital', 'Media', 'Labs', 'Dynamics', 'Summit', 'Apex']
+
+COMPANY_SUFFIXES = ['Inc.', 'LLC', 'Ltd.', 'Corp.', 'Co.', '']
+
+
+def _pick(rng, values, n):
+    return np.asarray(values, dtype=object)[rng.integers(0, len(values), n)]
+
+
+def contacts(n, seed=0):
+    """A DataFrame of n random contacts with an address, name, company and email
+
+    Args:
+        n (int): Number of contacts
+        seed (int, optional): Seed of the random number generator
+
+    Returns:
+        contacts (pd.DataFrame): columns ID, address, city, company, email, first, last, state,
+            zipcode
+    """
+
+    rng = np.random.default_rng(seed)
+
+    first = _pick(rng, FIRST_NAMES, n)
+    last = _pick(rng, LAST_NAMES, n)
+    city_ix = rng.integers(0, len(CITIES), n)
+    zips = rng.integers(0, 100, n)
+
+    street_nums = rng.integers(1, 20000, n).astype(str)
+    streets = _pick(rng, STREET_NAMES, n)
+    street_types = _pick(rng, STREET_TYPES, n)
+    address = [' '.join(parts) for parts in zip(street_nums, streets, street_types)]
+
+    words = [_pick(rng, COMPANY_WORDS, n) for _ in range(3)]
+    n_words = rng.integers(1, 4, n)
+    company = [' '.join([w[i] for w in words[:n_words[i]]] + [suffix]).strip()
+               for (i, suffix) in enumerate(_pick(rng, COMPANY_SUFFIXES, n))]
+
+    return pd.DataFrame({
+        'ID': np.arange(n),
+        'address': address,
+        'city': [CITIES[i][0] for i in city_ix],
+        'company': company,
+        'email': ['{}.{}{}@example.com'.format(f[0], l, i).lower()
+                  for (i, (f, l)) in enumerate(zip(first, last))],
+        'first': first,
+        'last': last,
+        'state': [CITIES[i][1] for i in city_ix],
+        'zipcode': ['{}{:02d}'.format(CITIES[i][2], z) for (i, z) in zip(city_ix, zips)],
+    })
+
+
+def _typo(rng, value):
+    """value with two adjacent characters swapped, or one dropped"""
+
+    if not isinstance(value, str) or len(value) < 4:
+        return value
+
+    i = int(rng.integers(1, len(value) - 2))
+    if rng.random() < 0.5:
+        return value[:i] + value[i + 1] + value[i] + value[i + 2:]
+    return value[:i] + value[i + 1:]
+
+
+def add_noise(df, noise=0.1, seed=0):
+    """Copy of df with typos, missing values and formatting differences added
+
+    Args:
+        df (pd.DataFrame): Contacts from contacts()
+        noise (float, optional): Probability that each field of each record is changed
+
+    Returns:
+        noisy (pd.DataFrame)
+    """
+
+    rng = np.random.default_rng(seed)
+    noisy = df.copy()
+    n = len(df)
+
+    for col in ['address', 'city', 'company', 'first', 'last']:
+        changed = rng.random(n) < noise
+        noisy.loc[changed, col] = [_typo(rng, val) for val in noisy.loc[changed, col]]
+
+    # formatting differences the cleaning step should undo
+    spaced = rng.random(n) < noise
+    noisy.loc[spaced, 'address'] = noisy.loc[spaced, 'address'].str.replace(' ', '  ', n=1)
+    upper = rng.random(n) < noise
+    noisy.loc[upper, 'city'] = noisy.loc[upper, 'city'].str.upper()
+
+    for col in ['address', 'first', 'email', 'zipcode']:
+        missing = rng.random(n) < noise / 2
+        noisy.loc[missing, col] = np.nan
+
+    return noisy
+
+
+def lists(n_search_in, n_search_for, dup_rate=0.5, noise=0.1, seed=0):
+    """A list to search in and a list to search for, with known matches between them
+
+    Args:
+        n_search_in (int): Number of unique contacts to search in
+        n_search_for (int): Number of records to search for
+        dup_rate (float, optional): Fraction of search_for records that are noisy copies of a
+            search_in contact, the rest are new contacts
+        noise (float, optional): See add_noise()
+        seed (int, optional): Seed of the random number generator
+
+    Returns:
+        (search_in, search_for): The ID column of search_for is the ID of the search_in record it
+            is a copy of, or -1 if it isn't a copy
+    """
+
+    rng = np.random.default_rng(seed)
+    search_in = contacts(n_search_in, seed)
+
+    n_dupes = int(round(n_search_for * dup_rate))
+    copied = search_in.iloc[rng.integers(0, n_search_in, n_dupes)]
+    fresh = contacts(n_search_for - n_dupes, seed + 1)
+    fresh['ID'] = -1
+
+    search_for = pd.concat([add_noise(copied, noise, seed), fresh], ignore_index=True)
+    search_for = search_for.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+    return search_in, search_for
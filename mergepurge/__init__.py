@@ -1,2 +1,11 @@
 from . import clean
 from . import match
+from . import index
+from . import scoring
+from . import stream
+from . import purge
+from . import stats
+from . import ngram
+from . import matcher
+from . import batching
+from . import rules
@@ -0,0 +1,142 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from . import match
+
+
+class MatchBatcher(object):
+    """Answers concurrent match lookups from asyncio code, batching them into match.match_many()
+
+    Each lookup waits at most max_wait seconds for others to arrive, then everything that arrived
+    (up to max_batch records) is matched together in a worker thread, scoring each state's fuzzy
+    candidates for the whole batch in one matrix. The event loop is never blocked, and while one
+    batch is being matched the next one fills up, so throughput grows with the number of
+    concurrent lookups instead of each one waiting its turn.
+
+    search_in is only read, so it can be shared with other batchers and threads, but it must not
+    be changed (e.g. a matcher.Matcher being added to) while lookups are running.
+
+    Args:
+        search_in (index.BlockingIndex): Index of the records to look for matches in
+        max_batch (int, optional): Most records matched together
+        max_wait (float, optional): Most seconds a lookup waits for others to batch with
+        executor (concurrent.futures.Executor, optional): Where batches are matched, defaults to a
+            thread of the batcher's own
+        **match_kwargs: Additional arguments to match.match_many() e.g. contact_cols, backend
+
+    Example:
+    >>> from mergepurge import batching, index
+    >>> batcher = batching.MatchBatcher(index.load_index('customers.idx'), max_wait=0.002,
+    ...                                 contact_cols=['first', 'last'], addy_cols=['state'])
+    >>> match_type, ids = await batcher.match({'first': 'Leo', 'last': 'Spaceman', 'state': 'NY'})
+    """
+
+    def __init__(self, search_in, max_batch=256, max_wait=0.005, executor=None, **match_kwargs):
+        self.search_in = search_in
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.match_kwargs = match_kwargs
+        self.batches = 0
+        self.records = 0
+
+        self._own_executor = executor is None
+        self._executor = ThreadPoolExecutor(max_workers=1) if executor is None else executor
+        self._queue = None
+        self._worker = None
+
+    async def match(self, record):
+        """(match type, ids) of one record, see match.match_one()"""
+
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+        answer = asyncio.get_running_loop().create_future()
+        await self._queue.put((record, answer))
+        return await answer
+
+    async def match_all(self, records):
+        """(match type, ids) of each of records, looked up concurrently"""
+        return await asyncio.gather(*(self.match(record) for record in records))
+
+    async def _next_batch(self, batch):
+        """Fills batch with the lookups waiting in the queue, after waiting for at least one"""
+
+        loop = asyncio.get_running_loop()
+        batch.append(await self._queue.get())
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        batch = []
+        try:
+            while True:
+                batch = []
+                await self._next_batch(batch)
+                records = [record for (record, _) in batch]
+
+                try:
+                    answers = await loop.run_in_executor(self._executor, self._match_many,
+                                                         records)
+                except Exception as e:
+                    for (_, answer) in batch:
+                        if not answer.done():
+                            answer.set_exception(e)
+                    continue
+
+                self.batches += 1
+                self.records += len(records)
+                for ((_, answer), found) in zip(batch, answers):
+                    if not answer.done():
+                        answer.set_result(found)
+        except BaseException as e:
+            # nothing answers the lookups taken or still queued once the worker is gone
+            self._fail_pending(batch, e)
+            raise
+
+    def _fail_pending(self, batch, error):
+        pending = list(batch)
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+
+        for (_, answer) in pending:
+            if answer.done():
+                continue
+            if isinstance(error, asyncio.CancelledError):
+                answer.cancel()
+            else:
+                answer.set_exception(error)
+
+    def _match_many(self, records):
+        return match.match_many(records, self.search_in, **self.match_kwargs)
+
+    async def close(self):
+        """Stops batching, lookups still waiting are cancelled"""
+
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except (asyncio.CancelledError, Exception):
+                # a worker that died already handed its error to the lookups it left
+                pass
+            self._worker = None
+
+        if self._queue is not None:
+            while not self._queue.empty():
+                (_, answer) = self._queue.get_nowait()
+                answer.cancel()
+
+        if self._own_executor:
+            self._executor.shutdown(wait=False)
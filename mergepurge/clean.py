@@ -1,9 +1,20 @@
+import importlib.metadata
+import os
+import pickle
 import re
+import threading
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
 import probablepeople
 import usaddress
+from .stats import CleanStats, Timer
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:  # pragma: no cover - pyarrow is optional
+    pyarrow = None
 
 
 STATES = {"AL", "AK", "AZ", "AR", "CA", "CO", "CT", "DC", "DE", "FL", "GA",
@@ -17,6 +28,378 @@ STATES = {"AL", "AK", "AZ", "AR", "CA", "CO", "CT", "DC", "DE", "FL", "GA",
 # (keeping sur and given names for doctors, lawyers, etc.)
 KEEPERS = ['CorporationName', 'Surname', 'GivenName']
 
+# street types the fast path recognizes (the tagger isn't consistent about some others, e.g. Way)
+FAST_STREET_TYPES = ['St', 'Street', 'Ave', 'Avenue', 'Rd', 'Road', 'Dr', 'Drive', 'Ln', 'Lane',
+                     'Blvd', 'Boulevard', 'Ct', 'Court', 'Trail', 'Trl', 'Cir', 'Circle', 'Ter',
+                     'Terrace']
+
+# built columns with few distinct values, stored as categoricals by compact_matching_cols()
+CATEGORICAL_COLS = ['aa_city', 'aa_state', 'aa_zip', 'aa_zip5', 'aa_zip3', 'aa_title']
+
+# built columns stored as Arrow strings (or interned str objects) by compact_matching_cols()
+STRING_COLS = ['aa_streetnum', 'aa_street', 'aa_fulladdy', 'aa_firstname', 'aa_lastname',
+               'aa_fullname', 'aa_company', 'aa_phone', 'aa_phone_ext', 'aa_fullname_sdx',
+               'aa_fullname_tokens', 'aa_company_sdx', 'aa_company_tokens']
+
+# pre-cleaning of the concatenated columns of a record, before parsing (and keying the cache)
+NOT_AVAILABLE_RE = re.compile(r'(not\s*available|not\s*provided|n/a)', re.IGNORECASE)
+NEWLINES_RE = re.compile(r'\n+')
+WHITESPACE_RE = re.compile(r'\s+')
+
+# help the usaddress tokenizer by spreading out words on either side of a slash ('/')
+# note: in 3 steps to avoid splitting up numerical fractions like '1/2'
+SLASH_RES = [re.compile(r'(?P<one>[^0-9]+)[/\\](?P<two>[0-9]+)'),
+             re.compile(r'(?P<one>[^0-9]+)[/\\](?P<two>[^0-9]+)'),
+             re.compile(r'(?P<one>[0-9]+)[/\\](?P<two>[^0-9]+)')]
+
+# (pattern, replacement) of each substitution, in order
+ADDRESS_SUBS = [(NOT_AVAILABLE_RE, ''), (NEWLINES_RE, ', '), (WHITESPACE_RE, ' ')] + \
+               [(slash, r'\g<1> / \g<2>') for slash in SLASH_RES]
+# names only lose their notes (there's no category for non-names to train parserator with)
+NAME_SUBS = [(NOT_AVAILABLE_RE, '')]
+
+# splits a lowercased phone number into what's before the first "ext" and what's after it
+PHONE_EXT_RE = re.compile(r'^(?P<number>.*?)(?:ext(?P<ext>.*?)(?:ext.*)?)?$', re.DOTALL)
+NON_DIGITS_RE = re.compile(r'[^0-9]')
+
+# the 5 leading digits of a zip code, with or without its +4
+ZIP5_RE = re.compile(r'^\s*(\d{5})')
+
+# words of a name for its keys, and what splits them
+NAME_TOKEN_RE = re.compile(r'[a-z0-9]+')
+NON_LETTERS_RE = re.compile(r'[^A-Z]+')
+
+# Soundex digit of each letter, the letters left out are dropped
+SOUNDEX_DIGITS = dict([(letter, '1') for letter in 'BFPV'] +
+                      [(letter, '2') for letter in 'CGJKQSXZ'] +
+                      [(letter, '3') for letter in 'DT'] + [('L', '4')] +
+                      [(letter, '5') for letter in 'MN'] + [('R', '6')])
+
+# first letters that sound alike, folded together (as NYSIIS does) so Katherine and Catherine or
+# Phillips and Filips get the same code
+SOUNDEX_PREFIXES = [('KN', 'N'), ('PH', 'F'), ('PF', 'F'), ('WR', 'R'), ('K', 'C'), ('Q', 'C'),
+                    ('Z', 'S')]
+
+# words that make an address ambiguous enough to leave it to the tagger
+FAST_ADDRESS_STOPWORDS = set(FAST_STREET_TYPES) | {
+    'North', 'South', 'East', 'West', 'Northeast', 'Northwest', 'Southeast', 'Southwest',
+    'Highway', 'Route', 'Suite', 'Unit', 'Apt', 'Box', 'Rural', 'County', 'State', 'Old', 'Saint',
+    'Fort', 'Mount', 'Port', 'Lake', 'Park', 'Hill', 'Point', 'Center', 'Square', 'Plaza', 'Loop',
+    'Run', 'Row', 'Pass', 'Path', 'Pike', 'Walk', 'Alley', 'Crossing', 'Station', 'Way', 'Cove',
+    'Cv', 'Place', 'Pl', 'Parkway', 'Pkwy', 'Ridge'}
+
+# words that make a name ambiguous enough to leave it to the tagger
+FAST_NAME_STOPWORDS = {
+    'Mr', 'Mrs', 'Ms', 'Miss', 'Dr', 'Doctor', 'Prof', 'Professor', 'Rev', 'Reverend', 'Hon',
+    'Sir', 'Madam', 'Jr', 'Sr', 'Esq', 'Phd', 'Md', 'Dds', 'Cpa', 'Mba', 'Rn', 'Capt', 'Sgt', 'Lt',
+    'Col', 'Gen', 'Maj', 'Fr', 'Sister', 'Brother', 'Father', 'Mother', 'Dame', 'Lord', 'Lady',
+    'Judge', 'Mayor', 'Senator', 'Rep', 'Gov', 'President', 'Officer', 'Chief', 'Coach', 'Pastor',
+    'Rabbi', 'Imam', 'Bishop', 'Deacon', 'Elder', 'The', 'And', 'Of', 'Van', 'Von', 'Del', 'Della',
+    'De', 'Da', 'Di', 'Du', 'La', 'Le', 'Mac', 'Mc', 'St', 'Ste', 'Saint', 'Ii', 'Iii', 'Iv'}
+
+_FAST_WORD = r'[A-Z][a-z]{2,}'
+FAST_ADDRESS_RE = re.compile(r'^(\d{{1,6}}) ((?:{w} ){{0,2}}{w}) (?:{types}),? ({w}) '
+                             r'([A-Z]{{2}}) (\d{{5}})$'.format(w=_FAST_WORD,
+                                                              types='|'.join(FAST_STREET_TYPES)))
+FAST_NAME_RE = re.compile(r'^([A-Z][a-z]+) ([A-Z][a-z]+)$')
+
+
+class ParseCache(object):
+    """Bounded LRU cache of parser output keyed on the cleaned string that was parsed
+
+    Real exports repeat the same company names, cities and streets many times, so caching skips
+    re-running the CRF taggers on strings that were already parsed. Keys include the parser, the
+    `strict` flag and the probablepeople parser type along with the cleaned string.
+
+    Safe to share between threads: lookups hold a lock while they read or update the cache, but
+    not while parsing, so threads parsing different strings don't wait on each other.
+
+    Args:
+        maxsize (int, optional): Most parses to keep, the least recently used are dropped first
+        path (str, optional): File to persist the cache to with save(), loaded now if it exists so
+            parses from previous runs are reused
+
+    Attributes:
+        hits (int): Parses that were found in the cache
+        misses (int): Parses that had to be run
+
+    Example:
+    >>> from mergepurge import clean
+    >>> cache = clean.ParseCache(maxsize=500000, path='parse_cache.pkl')
+    >>> df = clean.build_matching_cols(df, addy_cols, contact_cols, company_cols, cache=cache)
+    >>> cache.save()
+    """
+
+    def __init__(self, maxsize=100000, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._parsed = OrderedDict()
+        self._lock = threading.Lock()
+
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self._parsed)
+
+    def __contains__(self, key):
+        return key in self._parsed
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def lookup(self, key, parse, *args):
+        """Returns the cached output for key, or the output of parse(*args) after caching it"""
+
+        with self._lock:
+            try:
+                parsed = self._parsed[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._parsed.move_to_end(key)
+                return parsed
+
+        parsed = parse(*args)
+        with self._lock:
+            self._parsed[key] = parsed
+            if len(self._parsed) > self.maxsize:
+                self._parsed.popitem(last=False)
+
+        return parsed
+
+    def stats(self):
+        """Returns a dict of the hits, misses, current size and maxsize of the cache"""
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self._parsed), 'maxsize': self.maxsize}
+
+    def clear(self):
+        with self._lock:
+            self._parsed.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def save(self, path=None):
+        """Pickles the cached parses to path (defaults to the path the cache was created with)"""
+
+        path = self.path if path is None else path
+        if path is None:
+            raise ValueError('No path to save the parse cache to.')
+
+        with self._lock:
+            parsed = list(self._parsed.items())
+        with open(path, 'wb') as f:
+            pickle.dump({'versions': _parser_versions(), 'parsed': parsed},
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def load(self, path):
+        """Adds the parses saved to path, unless they were made by other versions of the parsers"""
+
+        with open(path, 'rb') as f:
+            saved = pickle.load(f)
+
+        if saved.get('versions') != _parser_versions():
+            return
+
+        with self._lock:
+            for (key, parsed) in saved['parsed'][-self.maxsize:]:
+                self._parsed[key] = parsed
+
+
+def _parser_versions():
+    """Versions of the tagging libraries, cached parses from other versions may be out of date"""
+
+    versions = []
+    for pkg in ('usaddress', 'probablepeople'):
+        try:
+            versions.append(importlib.metadata.version(pkg))
+        except importlib.metadata.PackageNotFoundError:
+            versions.append(None)
+    return tuple(versions)
+
+
+# shared by build_matching_cols() calls unless told otherwise
+PARSE_CACHE = ParseCache()
+
+
+def _get_cache(cache):
+    """Resolves the cache argument of build_matching_cols() to a ParseCache or None"""
+
+    if cache is True:
+        return PARSE_CACHE
+    if cache is False or cache is None:
+        return None
+    return cache
+
+
+def _worker_cache(cache):
+    """Resolves the cache argument of build_matching_cols() for worker processes
+
+    A ParseCache is not sent to the workers, each process caches in its own clean.PARSE_CACHE
+    instead, so only whether to cache is passed on. An empty ParseCache is falsy (it has a len),
+    hence no bool(cache).
+    """
+
+    return cache is not None and cache is not False
+
+
+def _fillna(row):
+    """row with missing values replaced by '', row can be a pd.Series or a dict"""
+
+    if isinstance(row, dict):
+        return {col: '' if pd.isnull(val) else val for (col, val) in row.items()}
+    return row.fillna('')
+
+
+def _concat_row(row, cols, street_comma=False):
+    """The values of cols of one record joined by spaces, a ',' after street columns if asked"""
+
+    row = _fillna(row)
+    concat = []
+    for col in cols:
+        val = str(row.get(col, ''))
+        if street_comma and 'street' in col.lower():
+            val += ','
+        concat.append(val)
+    return ' '.join(concat)
+
+
+def _concat_cols(df, cols, street_comma=False):
+    """_concat_row() of every record of df at once, as a pd.Series of str"""
+
+    concat = pd.Series('', index=df.index, dtype=object)
+    for (i, col) in enumerate(cols):
+        if col in df.columns:
+            val = df[col].astype(object).where(df[col].notnull(), '').astype(str)
+        else:
+            val = pd.Series('', index=df.index, dtype=object)
+        if street_comma and 'street' in col.lower():
+            val = val + ','
+        concat = val if i == 0 else concat + ' ' + val
+    return concat
+
+
+def _preclean(text, subs):
+    for (pattern, repl) in subs:
+        text = pattern.sub(repl, text)
+    return text
+
+
+def preclean_location_cols(df, addr_cols):
+    """The text parse_location_cols() parses, for every record of a DataFrame at once
+
+    Concatenates the address columns and applies the pre-cleaning substitutions (ADDRESS_SUBS)
+    with vectorized string methods instead of once per row.
+
+    Args:
+        df (pd.DataFrame): Records to clean
+        addr_cols (list): Address column names in order, see parse_location_cols()
+
+    Returns:
+        cleaned (pd.Series): The cleaned address text of each record
+    """
+
+    cleaned = _concat_cols(df, addr_cols, street_comma=True)
+    for (pattern, repl) in ADDRESS_SUBS:
+        cleaned = cleaned.str.replace(pattern, repl, regex=True)
+    return cleaned
+
+
+def preclean_name_cols(df, name_cols):
+    """The text parse_contact_name() and parse_business_name() parse, for every record at once
+
+    Args:
+        df (pd.DataFrame): Records to clean
+        name_cols (list): Name column names in order
+
+    Returns:
+        cleaned (pd.Series): The cleaned name text of each record
+    """
+
+    cleaned = _concat_cols(df, name_cols)
+    for (pattern, repl) in NAME_SUBS:
+        cleaned = cleaned.str.replace(pattern, repl, regex=True)
+    return cleaned
+
+
+def _fallback_state(row, addr_cols):
+    """The first state column of a record holding a valid state abbreviation, or np.nan"""
+
+    row = _fillna(row)
+    for col in addr_cols:
+        if 'state' in col.lower():
+            row_state = str(row.get(col, '')).upper().strip()
+            if row_state in STATES:
+                return row_state
+    return np.nan
+
+
+def _fallback_states(df, addr_cols):
+    """_fallback_state() of every record of df at once"""
+
+    fallback = pd.Series(np.nan, index=df.index, dtype=object)
+    for col in addr_cols:
+        if 'state' in col.lower() and col in df.columns:
+            row_state = _concat_cols(df, [col]).str.upper().str.strip()
+            fallback = fallback.where(fallback.notnull() | ~row_state.isin(STATES), row_state)
+    return fallback
+
+
+def _fast_address(cleaned):
+    """Parses a plain 'number street type city state zip' address without the tagger
+
+    Returns:
+        (addy_num, street, city, state, zip_) like _tag_address(), or None if the address isn't
+        simple enough to be sure how the tagger would parse it
+    """
+
+    found = FAST_ADDRESS_RE.match(cleaned.strip())
+    if found is None:
+        return None
+
+    addy_num, street, city, state, zip_ = found.groups()
+    if state not in STATES:
+        return None
+    for word in street.split() + city.split():
+        if word in FAST_ADDRESS_STOPWORDS:
+            return None
+
+    return addy_num, street, city, state, zip_
+
+
+def _fast_contact_name(cleaned):
+    """Parses a plain 'First Last' name without the tagger
+
+    Returns:
+        (title, first, last, full_name) like _tag_contact_name(), or None if the name isn't simple
+        enough to be sure how the tagger would parse it
+    """
+
+    found = FAST_NAME_RE.match(cleaned)
+    if found is None:
+        return None
+
+    first, last = found.groups()
+    if first in FAST_NAME_STOPWORDS or last in FAST_NAME_STOPWORDS:
+        return None
+
+    return np.nan, first, last, cleaned
+
+
+def _cached_parse(cache, key, parse, *args):
+    if cache is None:
+        return parse(*args)
+    return cache.lookup(key, parse, *args)
+
 
 def find_repeated_address_label(addr):
     """Analyzes addresses that raise RepeatedLabelErrors
@@ -46,56 +429,8 @@ def find_repeated_address_label(addr):
     return problem_key, problem_vals, nameparts_so_far
 
 
-def parse_location_cols(row, addr_cols, strict=False):
-    """Parses address columns with usaddress library
-
-    Returns a subset of normalized address components that are useful when comparing contacts.
-    Eliminates notes and other non-address text from dirty data.
-
-    Args:
-        row (pd.Series): A record
-        addr_cols (list): A list of column names in the record, in order, that collectively contain
-            an address
-        strict (boolean, optional): Whether or not to raise a RepeatedLabelError when parsing, if
-            False, the first value of the repeated labels will be used for the parse
-
-    Returns:
-        A standardized value (str, or np.nan if missing) for the following parts of a parsed
-        mailing address:
-            addy_num, street, city, state, zip_, full_addy
-
-    Warning:
-        This strips out 'Address 2' data like `C/O Recipient and P.O. Box 1234`
-        as well as some prefixes and modifiers of street names and should not be used as a valid
-        mailing address.
-
-    Example:
-        Adding four new columns of parsed address data to a pd.DataFrame:
-    >>> from mergepurge import clean
-    >>> df['p_street_num'], df['p_street'], df['p_city'], df['p_state'], *_ = \
-    ...     zip(*df.apply(clean.parse_location_cols, axis=1, addr_cols=['address','city','state']))
-    """
-
-    row = row.fillna('')
-    concat = []
-    for col in addr_cols:
-        if 'street' in col.lower():
-            val = str(row.get(col, ''))
-            concat.append(val + ',')
-        else:
-            concat.append(str(row.get(col, '')))
-
-    concat = ' '.join(concat)
-
-    cleaned = re.sub(r'(not\s*available|not\s*provided|n/a)', '', concat, flags=re.IGNORECASE)
-    cleaned = re.sub('\n+', ', ', concat)
-    cleaned = re.sub('\s+', ' ', concat)
-
-    # help the usaddress tokenizer by spreading out words on either side of a slash ('/')
-    # note: in 3 steps to avoid splitting up numerical fractions like '1/2'
-    cleaned = re.sub(r'(?P<one>[^0-9]+)[/\\](?P<two>[0-9]+)', '\g<1> / \g<2>', cleaned)
-    cleaned = re.sub(r'(?P<one>[^0-9]+)[/\\](?P<two>[^0-9]+)', '\g<1> / \g<2>', cleaned)
-    cleaned = re.sub(r'(?P<one>[0-9]+)[/\\](?P<two>[^0-9]+)', '\g<1> / \g<2>', cleaned)
+def _tag_address(cleaned, strict=False, stats=None):
+    """Tags a cleaned address string, the cacheable part of parse_location_cols()"""
 
     try:
         parsed = usaddress.tag(cleaned)
@@ -103,6 +438,9 @@ def parse_location_cols(row, addr_cols, strict=False):
         if strict:
             raise e
 
+        if stats is not None:
+            stats.fallbacks += 1
+
         parsed = [OrderedDict()]
         # take the first occurance of each of the fields we are interested in
         for (val, addr_part) in reversed(e.parsed_string):
@@ -130,14 +468,71 @@ def parse_location_cols(row, addr_cols, strict=False):
     state    = parsed[0].get('StateName', np.nan)
     zip_     = parsed[0].get('ZipCode', np.nan)
 
+    return addy_num, street, city, state, zip_
+
+
+def parse_location_cols(row, addr_cols, strict=False, cache=None, stats=None, fast_path=False):
+    """Parses address columns with usaddress library
+
+    Returns a subset of normalized address components that are useful when comparing contacts.
+    Eliminates notes and other non-address text from dirty data.
+
+    Args:
+        row (pd.Series or dict): A record
+        addr_cols (list): A list of column names in the record, in order, that collectively contain
+            an address
+        strict (boolean, optional): Whether or not to raise a RepeatedLabelError when parsing, if
+            False, the first value of the repeated labels will be used for the parse
+        cache (ParseCache, optional): Cache of previously parsed addresses to reuse
+        stats (stats.ParserStats, optional): Counts RepeatedLabelError fallbacks and fast path
+            parses
+        fast_path (boolean, optional): Parse plain addresses like '123 Main St Springfield IL
+            62701' with a regular expression instead of the usaddress tagger. Much faster, but
+            the tagger occasionally mislabels such addresses and the fast path won't.
+
+    Returns:
+        A standardized value (str, or np.nan if missing) for the following parts of a parsed
+        mailing address:
+            addy_num, street, city, state, zip_, full_addy
+
+    Warning:
+        This strips out 'Address 2' data like `C/O Recipient and P.O. Box 1234`
+        as well as some prefixes and modifiers of street names and should not be used as a valid
+        mailing address.
+
+    Example:
+        Adding four new columns of parsed address data to a pd.DataFrame:
+    >>> from mergepurge import clean
+    >>> df['p_street_num'], df['p_street'], df['p_city'], df['p_state'], *_ = \
+    ...     zip(*df.apply(clean.parse_location_cols, axis=1, addr_cols=['address','city','state']))
+    """
+
+    cleaned = _preclean(_concat_row(row, addr_cols, street_comma=True), ADDRESS_SUBS)
+    return _parse_address(cleaned, _fallback_state(row, addr_cols), strict, cache, stats,
+                          fast_path)
+
+
+def _parse_address(cleaned, fallback_state=np.nan, strict=False, cache=None, stats=None,
+                   fast_path=False):
+    """Parses pre-cleaned address text, the part of parse_location_cols() after pre-cleaning
+
+    Args:
+        cleaned (str): Output of the pre-cleaning, also the key of the parse in the cache
+        fallback_state (str or np.nan): State to use if the parse didn't find one
+    """
+
+    parsed = _fast_address(cleaned) if fast_path else None
+    if parsed is None:
+        parsed = _cached_parse(cache, ('address', cleaned, strict), _tag_address, cleaned, strict,
+                               stats)
+    elif stats is not None:
+        stats.fast += 1
+
+    addy_num, street, city, state, zip_ = parsed
+
     if pd.isnull(state):
         # fallback to the unparsed State column if there is one and the value looks good
-        for col in addr_cols:
-            if 'state' in col.lower():
-                row_state = row.get(col, '').upper().strip()
-                if row_state in STATES:
-                    state = row_state
-                    break
+        state = fallback_state
 
     full_addy = cleaned
 
@@ -196,7 +591,34 @@ def find_repeated_label(name_, type=None):
     return problem_key, problem_vals, nameparts_so_far
 
 
-def parse_contact_name(row, name_cols, strict=False, type='person'):
+def _tag_contact_name(cleaned, strict=False, type='person', stats=None):
+    """Tags a cleaned person's name, the cacheable part of parse_contact_name()"""
+
+    try:
+        parsed = probablepeople.tag(cleaned, type)
+    except probablepeople.RepeatedLabelError as e:
+        if strict:
+            raise e
+
+        if stats is not None:
+            stats.fallbacks += 1
+
+        problem_key, problem_vals, parsed = find_repeated_label(cleaned)
+        parsed = (parsed, '')
+
+    title  = parsed[0].get('PrefixOther', np.nan)
+    first  = parsed[0].get('GivenName', np.nan)
+    last   = parsed[0].get('Surname', np.nan)
+    try:
+        full_name = first + ' ' + last
+    except TypeError as e:
+        full_name = np.nan
+
+    return title, first, last, full_name
+
+
+def parse_contact_name(row, name_cols, strict=False, type='person', cache=None, stats=None,
+                       fast_path=False):
     """Parses a person's name with probablepeople library
 
     Concatenates all the contact name columns into a single string and then attempts to parse it
@@ -204,47 +626,73 @@ def parse_contact_name(row, name_cols, strict=False, type='person'):
     comparing contacts. This process eliminates notes and other non-name text from dirty data.
 
     Args:
-        row (pd.Series): A record
+        row (pd.Series or dict): A record
         name_cols (list): A list of column names in the record, in order, that when concatenated
             comprise a person's name
         strict (boolean, optional): Whether or not to raise a RepeatedLabelError when parsing, if
             False, the last value of the repeated labels will be used for the parse
         type (str): Which probableparser to use: 'generic', 'person' or 'company'
+        cache (ParseCache, optional): Cache of previously parsed names to reuse
+        stats (stats.ParserStats, optional): Counts RepeatedLabelError fallbacks and fast path
+            parses
+        fast_path (boolean, optional): Parse plain 'First Last' names of people with a regular
+            expression instead of the probablepeople tagger. Much faster, but the tagger
+            occasionally mislabels such names and the fast path won't.
 
     Returns:
         A subset (tuple of str, or np.nan) of the standardized name components, namely:
             (title, first, last, full_name)
     """
 
-    row = row.fillna('')
-    concat = []
-    for col in name_cols:
-        concat.append(row.get(col, ''))
-    concat = ' '.join(concat)
+    cleaned = _preclean(_concat_row(row, name_cols), NAME_SUBS)
+    return _parse_contact(cleaned, strict, type, cache, stats, fast_path)
 
-    cleaned = re.sub(r'(not\s*available|not\s*provided|n/a)', '', concat, flags=re.IGNORECASE)
+
+def _parse_contact(cleaned, strict=False, type='person', cache=None, stats=None, fast_path=False):
+    """Parses pre-cleaned name text, the part of parse_contact_name() after pre-cleaning"""
+
+    if fast_path and type == 'person':
+        parsed = _fast_contact_name(cleaned)
+        if parsed is not None:
+            if stats is not None:
+                stats.fast += 1
+            return parsed
+
+    return _cached_parse(cache, ('person', cleaned, strict, type),
+                         _tag_contact_name, cleaned, strict, type, stats)
+
+
+def _tag_business_name(cleaned, strict=False, type='generic', stats=None):
+    """Tags a cleaned company name, the cacheable part of parse_business_name()"""
 
     try:
-        parsed = probablepeople.tag(cleaned, type)
+        parsed = probablepeople.tag(cleaned, type)  # type='company'? general parser works better
     except probablepeople.RepeatedLabelError as e:
         if strict:
             raise e
 
+        if stats is not None:
+            stats.fallbacks += 1
+
         problem_key, problem_vals, parsed = find_repeated_label(cleaned)
         parsed = (parsed, '')
 
-    title  = parsed[0].get('PrefixOther', np.nan)
-    first  = parsed[0].get('GivenName', np.nan)
-    last   = parsed[0].get('Surname', np.nan)
-    try:
-        full_name = first + ' ' + last
-    except TypeError as e:
-        full_name = np.nan
+    # filter out other name components that are bad for matching (e.g. too generic: llc)
+    rebuilt_name = []
+    for (k, v) in parsed[0].items():
+        if k in KEEPERS:
+            rebuilt_name.append(v)
 
-    return title, first, last, full_name
+    biz_name = ' '.join(rebuilt_name)
+
+    if pd.isnull(biz_name):
+        return np.nan
+
+    return biz_name
 
 
-def parse_business_name(row, name_cols, strict=False, type='generic'):
+def parse_business_name(row, name_cols, strict=False, type='generic', cache=None,
+                        stats=None):
     """Parses a Company name with probablepeople library
 
     Concatenates all the company name columns into a single string and then attempts to parse it
@@ -253,12 +701,14 @@ def parse_business_name(row, name_cols, strict=False, type='generic'):
     dirty data.
 
     Args:
-        row (pd.Series): A record
+        row (pd.Series or dict): A record
         name_cols (list): A list of column names in the record, in order, that when concatenated
             comprise a company/business name
         strict (boolean, optional): Whether or not to raise a RepeatedLabelError when parsing, if
             False, the last value of the repeated labels will be used for the parse
         type (str): Which probableparser to use: 'generic', 'person' or 'company'
+        cache (ParseCache, optional): Cache of previously parsed names to reuse
+        stats (stats.ParserStats, optional): Counts RepeatedLabelError fallbacks
 
     Returns:
         biz_name (str or np.nan): Filtered and standardized company name
@@ -270,52 +720,158 @@ def parse_business_name(row, name_cols, strict=False, type='generic'):
     ...     df.apply(clean.parse_business_name, axis=1, name_cols=['Account Name'], strict=False)
     """
 
-    row = row.fillna('')
-    concat = []
-    for col in name_cols:
-        concat.append(str(row.get(col, '')))
-    concat = ' '.join(concat)
-
-    # pre-processing (no category for non-names to train parserator with)
-    cleaned = re.sub(r'(not\s*available|not\s*provided|n/a)', '', concat, flags=re.IGNORECASE)
-
-    try:
-        parsed = probablepeople.tag(cleaned, type)  # type='company'? general parser works better
-    except probablepeople.RepeatedLabelError as e:
-        if strict:
-            raise e
+    cleaned = _preclean(_concat_row(row, name_cols), NAME_SUBS)
+    return _parse_business(cleaned, strict, type, cache, stats)
 
-        problem_key, problem_vals, parsed = find_repeated_label(cleaned)
-        parsed = (parsed, '')
 
-    # filter out other name components that are bad for matching (e.g. too generic: llc)
-    rebuilt_name = []
-    for (k, v) in parsed[0].items():
-        if k in KEEPERS:
-            rebuilt_name.append(v)
+def _parse_business(cleaned, strict=False, type='generic', cache=None, stats=None):
+    """Parses pre-cleaned company name text, the part of parse_business_name() after pre-cleaning"""
 
-    biz_name = ' '.join(rebuilt_name)
+    return _cached_parse(cache, ('business', cleaned, strict, type),
+                         _tag_business_name, cleaned, strict, type, stats)
 
-    if pd.isnull(biz_name):
-        return np.nan
 
-    return biz_name
+def _parse_records(df, addy_cols, contact_cols, company_cols, cache=None, stats=None,
+                   fast_path=False):
+    """Runs each of the parsers over a DataFrame
 
+    Returns:
+        A tuple of lists with one entry per record (or an empty list if there were no columns to
+        parse) with the output of parse_location_cols, parse_contact_name and parse_business_name,
+        followed by the CleanStats of the parsing (stats, if it was given)
+    """
 
-def build_matching_cols(df, addy_cols=None, contact_cols=None, company_cols=None):
+    cache = _get_cache(cache)
+    if stats is None:
+        stats = CleanStats()
+    addys, contacts, companies = [], [], []
+
+    with Timer(stats):
+        if len(addy_cols) > 0:
+            parser_stats = stats.parser('address')
+            with Timer(parser_stats):
+                addys = [_parse_address(cleaned, fallback, False, cache, parser_stats, fast_path)
+                         for (cleaned, fallback) in zip(preclean_location_cols(df, addy_cols),
+                                                        _fallback_states(df, addy_cols))]
+            parser_stats.calls += len(df)
+
+        if len(contact_cols) > 0:
+            parser_stats = stats.parser('person')
+            with Timer(parser_stats):
+                contacts = [_parse_contact(cleaned, False, 'person', cache, parser_stats,
+                                           fast_path)
+                            for cleaned in preclean_name_cols(df, contact_cols)]
+            parser_stats.calls += len(df)
+
+        if len(company_cols) > 0:
+            parser_stats = stats.parser('business')
+            with Timer(parser_stats):
+                companies = [_parse_business(cleaned, False, 'generic', cache, parser_stats)
+                             for cleaned in preclean_name_cols(df, company_cols)]
+            parser_stats.calls += len(df)
+
+    stats.records += len(df)
+
+    return addys, contacts, companies, stats
+
+
+def _parse_records_in_pool(df, addy_cols, contact_cols, company_cols, executor, chunksize,
+                           cache=None, stats=None, progress=None, fast_path=False):
+    """Same as _parse_records() but with the records split into chunks parsed by executor"""
+
+    if stats is None:
+        stats = CleanStats()
+
+    # a column df doesn't have is left out, the chunks then treat it as blank like _parse_records()
+    used_cols = []
+    for col in addy_cols + contact_cols + company_cols:
+        if col in df.columns and col not in used_cols:
+            used_cols.append(col)
+
+    chunks = [df[used_cols].iloc[start:start + chunksize]
+              for start in range(0, len(df), chunksize)]
+
+    n_chunks = len(chunks)
+    parsed = executor.map(_parse_records,
+                          chunks,
+                          [addy_cols] * n_chunks,
+                          [contact_cols] * n_chunks,
+                          [company_cols] * n_chunks,
+                          [cache] * n_chunks,
+                          [None] * n_chunks,
+                          [fast_path] * n_chunks)
+
+    # executor.map() yields results in the order of the chunks, so records keep their order
+    addys, contacts, companies = [], [], []
+    with Timer(stats):
+        for (chunk_addys, chunk_contacts, chunk_companies, chunk_stats) in parsed:
+            addys.extend(chunk_addys)
+            contacts.extend(chunk_contacts)
+            companies.extend(chunk_companies)
+
+            # the chunk's own wall time is already covered by the timer
+            chunk_stats.seconds = 0.0
+            stats.merge(chunk_stats)
+
+            if progress is not None:
+                progress(stats.records, len(df))
+
+    return addys, contacts, companies, stats
+
+
+def build_matching_cols(df, addy_cols=None, contact_cols=None, company_cols=None,
+                        n_jobs=1, executor=None, chunksize=None, cache=True, stats=None,
+                        progress=None, fast_path=False, phone_cols=None, compact=False,
+                        fulladdy=True, name_keys=False, geo_keys=False):
     """Adds normalized contact columns to a DataFrame
 
     First step in the merge/purge process. Generates a set of standardized columns for each record
     in the input DataFrame that can be used to compare to other contact and account records.
 
+    Parsing is CPU-bound and independent for each record, so large DataFrames can be split into
+    chunks and parsed on several cores. The output is the same as parsing serially.
+
     Args:
         addy_cols (list): Address column names in order e.g. ['street','address 2','city',...]
         contact_cols (list): Contact name column names in order e.g. ['first', 'last']
         company_cols (list): Company name column names in order e.g. ['Account Name']
+        n_jobs (int, optional): Number of processes to parse with, -1 for one per core. Ignored if
+            executor is given.
+        executor (concurrent.futures.Executor, optional): An executor to parse chunks of records
+            with, e.g. a ProcessPoolExecutor shared between calls
+        chunksize (int, optional): Records per chunk when parsing in parallel, defaults to
+            splitting the records into 4 chunks per worker
+        cache (boolean or ParseCache, optional): Reuse the parses of strings seen before. True
+            (default) shares clean.PARSE_CACHE between calls, False parses every record. Worker
+            processes each use their own clean.PARSE_CACHE, which lives as long as the process:
+            a ParseCache given here is only used when parsing serially or in threads, and its
+            hits and misses don't count the parses done in worker processes.
+        stats (stats.CleanStats, optional): Filled in with the time spent in each parser and the
+            number of RepeatedLabelError fallbacks, summed over the worker processes
+        progress (function, optional): Called with (records done, total records) after each chunk
+            is parsed when parsing in parallel
+        fast_path (boolean, optional): Parse plain addresses and 'First Last' names with regular
+            expressions, only falling back to the taggers for the rest, see parse_location_cols().
+            stats reports how many records fell back.
+        phone_cols (list, optional): Phone number column names in order, cleaned into aa_phone and
+            aa_phone_ext with clean_US_phones()
+        compact (boolean, optional): Store the added columns in less memory, see
+            compact_matching_cols()
+        fulladdy (boolean, optional): Keep the aa_fulladdy column, which nothing in mergepurge
+            matches on
+        name_keys (boolean, optional): Also add the phonetic and sorted word keys of the names,
+            see build_name_keys()
+        geo_keys (boolean, optional): Also add the zip code prefixes that the geo_blocks of
+            match.find_related() block on, see build_geo_keys()
 
     Returns:
         df (pd.DataFrame): A DataFrame with added columns good for matching against other dataframes
         with similar contact or account data
+
+    Example:
+    >>> from mergepurge import clean
+    >>> contacts = clean.build_matching_cols(contacts, ['address', 'city', 'state', 'zip'],
+    ...                                      ['first', 'last'], ['company'], n_jobs=-1)
     """
 
     if addy_cols is None:
@@ -325,30 +881,182 @@ def build_matching_cols(df, addy_cols=None, contact_cols=None, company_cols=None
     if company_cols is None:
         company_cols = []
 
+    addy_cols, contact_cols, company_cols = list(addy_cols), list(contact_cols), list(company_cols)
+
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+
+    if len(df) == 0 or (executor is None and n_jobs == 1):
+        parsed = _parse_records(df, addy_cols, contact_cols, company_cols, cache, stats,
+                                fast_path)
+    elif executor is not None:
+        if chunksize is None:
+            chunksize = max(1, int(np.ceil(len(df) / 4)))
+        if isinstance(executor, ProcessPoolExecutor):
+            # don't pickle the cache to every chunk, each process has its own
+            cache = _worker_cache(cache)
+        parsed = _parse_records_in_pool(df, addy_cols, contact_cols, company_cols,
+                                        executor, chunksize, cache, stats, progress, fast_path)
+    else:
+        if chunksize is None:
+            chunksize = max(1, int(np.ceil(len(df) / (n_jobs * 4))))
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            parsed = _parse_records_in_pool(df, addy_cols, contact_cols, company_cols,
+                                            pool, chunksize, _worker_cache(cache), stats, progress,
+                                            fast_path)
+
+    addys, contacts, companies, _ = parsed
+
     if len(addy_cols) > 0:
         df['aa_streetnum'], df['aa_street'], df['aa_city'],\
-            df['aa_state'], df['aa_zip'], df['aa_fulladdy'] = \
-            zip(*df[addy_cols].apply(parse_location_cols,
-                                     axis=1,
-                                     addr_cols=addy_cols,
-                                     strict=False))
+            df['aa_state'], df['aa_zip'], df['aa_fulladdy'] = zip(*addys)
 
     if len(contact_cols) > 0:
         df['aa_title'], df['aa_firstname'],\
-            df['aa_lastname'], df['aa_fullname'] = \
-            zip(*df[contact_cols].apply(parse_contact_name,
-                                        axis=1,
-                                        name_cols=contact_cols,
-                                        strict=False))
+            df['aa_lastname'], df['aa_fullname'] = zip(*contacts)
+
+    if phone_cols:
+        df['aa_phone'], df['aa_phone_ext'] = clean_US_phones(df, list(phone_cols))
+
+    if len(company_cols) > 0:
+        df['aa_company'] = companies
+
+    if not fulladdy and 'aa_fulladdy' in df.columns:
+        del df['aa_fulladdy']
+
+    if name_keys:
+        build_name_keys(df)
+
+    if geo_keys:
+        build_geo_keys(df)
+
+    if compact:
+        compact_matching_cols(df)
+
+    return df
+
+
+def _compact_strings(values):
+    """A column of strings as Arrow strings, or else with one str object per distinct value"""
+
+    if pyarrow is not None:
+        return values.astype(pd.StringDtype('pyarrow', na_value=np.nan))
+
+    codes, uniques = pd.factorize(values)
+    interned = np.full(len(values), np.nan, dtype=object)
+    present = codes >= 0
+    interned[present] = np.asarray(uniques, dtype=object)[codes[present]]
+    return pd.Series(interned, index=values.index, dtype=object)
+
+
+def compact_matching_cols(df):
+    """Stores the columns added by build_matching_cols() in less memory, in place
+
+    The columns with few distinct values (CATEGORICAL_COLS) become categoricals, an int code per
+    record into one copy of each value. The rest (STRING_COLS) become Arrow strings if pyarrow is
+    installed, otherwise each distinct value is kept once and shared by the records that have it.
+    The values, and so the matches found, stay the same.
+
+    Args:
+        df (pd.DataFrame): DF run through build_matching_cols()
 
-    if len(company_cols) == 0:
-        return df
+    Returns:
+        df (pd.DataFrame): The same DataFrame
+
+    Example:
+    >>> from mergepurge import clean
+    >>> contacts = clean.compact_matching_cols(pd.read_pickle('contacts_cleaned.pkl'))
+    """
+
+    for col in CATEGORICAL_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
 
-    df['aa_company'] = df.apply(parse_business_name, axis=1, name_cols=company_cols, strict=False)
+    for col in STRING_COLS:
+        if col in df.columns:
+            df[col] = _compact_strings(df[col])
 
     return df
 
 
+def build_matching_record(record, addy_cols=None, contact_cols=None, company_cols=None,
+                          cache=True, stats=None, fast_path=False, phone_cols=None,
+                          name_keys=False, geo_keys=False):
+    """Adds normalized contact fields to a single record
+
+    The same fields build_matching_cols() adds to each row of a DataFrame, for one record at a
+    time without building a DataFrame around it, e.g. to look up records as they arrive.
+
+    Args:
+        record (dict): Field name -> value
+        addy_cols, contact_cols, company_cols (list): Fields to build the matching fields from,
+            see build_matching_cols()
+        cache (boolean or ParseCache, optional): Reuse the parses of strings seen before
+        stats (stats.CleanStats, optional): Filled in with the time spent in each parser
+        fast_path (boolean, optional): See build_matching_cols()
+        phone_cols (list, optional): Fields to build aa_phone and aa_phone_ext from
+        name_keys (boolean, optional): Also add the phonetic and sorted word keys of the names
+        geo_keys (boolean, optional): Also add aa_zip5 and aa_zip3, see build_geo_keys()
+
+    Returns:
+        record (dict): A copy of record with the aa_ fields added
+
+    Example:
+    >>> from mergepurge import clean
+    >>> clean.build_matching_record({'first': 'Leo', 'last': 'Spaceman', 'state': 'NY'},
+    ...                             ['state'], ['first', 'last'])['aa_fullname']
+    'Leo Spaceman'
+    """
+
+    cache = _get_cache(cache)
+    if stats is None:
+        stats = CleanStats()
+    record = dict(record)
+
+    with Timer(stats):
+        if addy_cols:
+            parser_stats = stats.parser('address')
+            with Timer(parser_stats):
+                parsed = parse_location_cols(record, addy_cols, False, cache, parser_stats,
+                                             fast_path)
+            parser_stats.calls += 1
+            record.update(zip(['aa_streetnum', 'aa_street', 'aa_city', 'aa_state', 'aa_zip',
+                               'aa_fulladdy'], parsed))
+
+        if contact_cols:
+            parser_stats = stats.parser('person')
+            with Timer(parser_stats):
+                parsed = parse_contact_name(record, contact_cols, False, cache=cache,
+                                            stats=parser_stats, fast_path=fast_path)
+            parser_stats.calls += 1
+            record.update(zip(['aa_title', 'aa_firstname', 'aa_lastname', 'aa_fullname'],
+                              parsed))
+
+        if company_cols:
+            parser_stats = stats.parser('business')
+            with Timer(parser_stats):
+                record['aa_company'] = parse_business_name(record, company_cols, False,
+                                                           cache=cache, stats=parser_stats)
+            parser_stats.calls += 1
+
+        if phone_cols:
+            record['aa_phone'], record['aa_phone_ext'] = clean_US_phone(record, phone_cols,
+                                                                        extension=True)
+
+        if name_keys:
+            for col in ('aa_fullname', 'aa_company'):
+                if col in record:
+                    record[col + '_sdx'] = phonetic_key(record[col])
+                    record[col + '_tokens'] = token_key(record[col])
+
+        if geo_keys and 'aa_zip' in record:
+            record['aa_zip5'], record['aa_zip3'] = zip_prefix(record['aa_zip'])
+
+    stats.records += 1
+
+    return record
+
+
 def clean_US_phone(row, phone_cols, extension=False):
     """Returns cleaned 10 digit str of US phone number
 
@@ -357,7 +1065,7 @@ def clean_US_phone(row, phone_cols, extension=False):
     Output is useful for comparing Contacts and Accounts.
 
     Args:
-        row (pd.Series): A record
+        row (pd.Series or dict): A record
         phone_cols (list): A list of column names in the record, in order, that when concatenated
             comprise a phone number, e.g. ['country_code','area_code','local_number']
         strict (boolean, optional): Whether or not to raise an Exception when parsing, if
@@ -381,14 +1089,10 @@ def clean_US_phone(row, phone_cols, extension=False):
     ...                                        extension=True)
     """
 
-    row = row.fillna('')
-    concat = []
-    for col in phone_cols:
-        concat.append(str(row.get(col, '')))
-    concat = ' '.join(concat)
+    concat = _concat_row(row, phone_cols)
 
     # Drop any weird unicode chars that eval to numeric
-    dirty_number = str(concat.encode('ascii', 'ignore'))
+    dirty_number = concat.encode('ascii', 'ignore').decode('ascii')
 
     num_and_ext = dirty_number.lower().split("ext", 2)
     number = ''.join(char_ for char_ in num_and_ext[0] if char_.isdigit())
@@ -411,3 +1115,212 @@ def clean_US_phone(row, phone_cols, extension=False):
         return number, ext
     else:
         return number
+
+
+def clean_US_phones(df, phone_cols):
+    """Cleans the US phone numbers of every record of a DataFrame at once
+
+    The same cleaning as clean_US_phone() with extension=True, done a column at a time with
+    pandas' vectorized string methods instead of once per row.
+
+    Args:
+        df (pd.DataFrame): Records to clean the phone numbers of
+        phone_cols (list): Column names, in order, that when concatenated comprise a phone number
+
+    Returns:
+        A tuple of pd.Series with the same index as df, (number, ext):
+            number (str or np.nan): Cleaned, 10 digit phone number
+            ext (str or np.nan): Cleaned, digits of extension (np.nan if there was none or the
+                number couldn't be cleaned)
+
+    Example:
+    >>> from mergepurge import clean
+    >>> df['phone'], df['ext'] = clean.clean_US_phones(df, ['dirty_phone'])
+    """
+
+    concat = _concat_cols(df, phone_cols)
+
+    # Drop any weird unicode chars that eval to numeric
+    dirty = concat.str.encode('ascii', 'ignore').str.decode('ascii').str.lower()
+
+    # the number is everything before the first "ext", the extension what's between it and the next
+    parts = dirty.str.extract(PHONE_EXT_RE)
+    number = parts['number'].str.replace(NON_DIGITS_RE, '', regex=True)
+    ext = parts['ext'].str.replace(NON_DIGITS_RE, '', regex=True)
+
+    lengths = number.str.len()
+    long_distance = (lengths == 11) & number.str.startswith('1')
+    number = number.where(~long_distance, number.str.slice(1))
+    valid = (lengths == 10) | long_distance
+
+    number = number.astype(object).where(valid, np.nan)
+    ext = ext.astype(object).where(valid & ext.notnull(), np.nan)
+    return number, ext
+
+
+def zip_prefix(zip_):
+    """Returns the 5 and 3 digit prefixes of a zip code, for blocking on the area around it
+
+    Args:
+        zip_ (str): A zip code, e.g. aa_zip of a record, with or without its +4
+
+    Returns:
+        A tuple of (zip5, zip3), both np.nan if zip_ doesn't start with 5 digits
+
+    Example:
+    >>> from mergepurge import clean
+    >>> clean.zip_prefix('02134-1203')
+    ('02134', '021')
+    """
+
+    found = ZIP5_RE.match(zip_) if isinstance(zip_, str) else None
+    if found is None:
+        return np.nan, np.nan
+    return found.group(1), found.group(1)[:3]
+
+
+def zip_prefixes(zips):
+    """Returns the 5 and 3 digit prefixes of a column of zip codes, like zip_prefix()
+
+    Args:
+        zips (pd.Series): Zip codes, e.g. the aa_zip column
+
+    Returns:
+        A tuple of pd.Series with the same index as zips, (zip5, zip3)
+
+    Example:
+    >>> from mergepurge import clean
+    >>> df['aa_zip5'], df['aa_zip3'] = clean.zip_prefixes(df['aa_zip'])
+    """
+
+    zip5 = zips.astype(object).str.extract(ZIP5_RE, expand=False).astype(object)
+    return zip5, zip5.str.slice(0, 3)
+
+
+def soundex(word):
+    """Returns the Soundex code of a word, e.g. 'S530' for both Smith and Smyth
+
+    A letter and 3 digits coding the consonants that follow it, with alike sounding first letters
+    folded together first (see SOUNDEX_PREFIXES).
+
+    Args:
+        word (str): A word, anything but letters is ignored
+
+    Returns:
+        code (str): '' if word has no letters
+    """
+
+    word = NON_LETTERS_RE.sub('', word.upper())
+    if word == '':
+        return ''
+
+    for (prefix, folded) in SOUNDEX_PREFIXES:
+        if word.startswith(prefix):
+            word = folded + word[len(prefix):]
+            break
+
+    code = word[0]
+    last = SOUNDEX_DIGITS.get(word[0], '')
+    for letter in word[1:]:
+        digit = SOUNDEX_DIGITS.get(letter, '')
+        if digit != '' and digit != last:
+            code += digit
+        # a vowel between two letters with the same digit codes both, H and W don't
+        if letter not in 'HW':
+            last = digit
+
+    return (code + '000')[:4]
+
+
+def phonetic_key(name):
+    """Returns the Soundex codes of the words of a name, in order, for near exact matching
+
+    Args:
+        name (str): e.g. aa_fullname or aa_company of a record
+
+    Returns:
+        key (str or np.nan): e.g. 'C365 S530' for Katherine Smyth, np.nan if name has no letters
+
+    Example:
+    >>> from mergepurge import clean
+    >>> clean.phonetic_key('Katherine Smyth') == clean.phonetic_key('Catherine Smith')
+    True
+    """
+
+    if not isinstance(name, str):
+        return np.nan
+    codes = [soundex(word) for word in name.split()]
+    key = ' '.join(code for code in codes if code != '')
+    return key if key != '' else np.nan
+
+
+def token_key(name):
+    """Returns the lowercased words of a name, sorted, to match names with their words reordered
+
+    Args:
+        name (str): e.g. aa_fullname or aa_company of a record
+
+    Returns:
+        key (str or np.nan): e.g. 'acme co widget' for 'Widget Co. (Acme)', np.nan if name has no
+            letters or digits
+    """
+
+    if not isinstance(name, str):
+        return np.nan
+    key = ' '.join(sorted(NAME_TOKEN_RE.findall(name.lower())))
+    return key if key != '' else np.nan
+
+
+def _map_distinct(values, func):
+    """func() of each value of a column, called once per distinct value"""
+
+    codes, uniques = pd.factorize(values)
+    keys = np.array([func(value) for value in uniques] + [np.nan], dtype=object)
+    return pd.Series(keys[codes], index=values.index, dtype=object)
+
+
+def build_name_keys(df):
+    """Adds the phonetic and sorted word keys of the contact and company names, in place
+
+    aa_fullname_sdx and aa_company_sdx are the names' phonetic_key(), aa_fullname_tokens and
+    aa_company_tokens their token_key(). match.find_related() looks the token keys up in the same
+    state and the phonetic keys in the same city before scoring any names, so reordered names and
+    spelling variants are matched by a hash lookup. Only the keys of the name columns df has are
+    added.
+
+    Args:
+        df (pd.DataFrame): DF run through build_matching_cols()
+
+    Returns:
+        df (pd.DataFrame): The same DataFrame
+
+    Example:
+    >>> from mergepurge import clean
+    >>> contacts = clean.build_name_keys(pd.read_pickle('contacts_cleaned.pkl'))
+    """
+
+    for col in ('aa_fullname', 'aa_company'):
+        if col in df.columns:
+            df[col + '_sdx'] = _map_distinct(df[col], phonetic_key)
+            df[col + '_tokens'] = _map_distinct(df[col], token_key)
+
+    return df
+
+
+def build_geo_keys(df):
+    """Adds aa_zip5 and aa_zip3, the 5 and 3 digit prefixes of aa_zip, in place
+
+    The keys of the zip5 and zip3 blocks that match.find_related() widens through with geo_blocks,
+    see zip_prefixes(). Nothing is added if df has no aa_zip column.
+
+    Args:
+        df (pd.DataFrame): DF run through build_matching_cols()
+
+    Returns:
+        df (pd.DataFrame): The same DataFrame
+    """
+
+    if 'aa_zip' in df.columns:
+        df['aa_zip5'], df['aa_zip3'] = zip_prefixes(df['aa_zip'])
+
+    return df
@@ -0,0 +1,531 @@
+import json
+import os
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from .ngram import NgramIndex
+
+
+# name of each block -> the built matching columns that make up its key
+DEFAULT_BLOCKS = OrderedDict([
+    ('name_state', ('aa_fullname', 'aa_state')),
+    ('address',    ('aa_streetnum', 'aa_street', 'aa_state')),
+    ('state',      ('aa_state',)),
+    ('phone',      ('aa_phone',)),
+    ('name_tokens_state',    ('aa_fullname_tokens', 'aa_state')),
+    ('name_sound_city',      ('aa_fullname_sdx', 'aa_city', 'aa_state')),
+    ('company_tokens_state', ('aa_company_tokens', 'aa_state')),
+    ('company_sound_city',   ('aa_company_sdx', 'aa_city', 'aa_state')),
+])
+
+# geographic blocks, narrowest first, that the FuzzBiz tier of match.find_related() can widen
+# through with geo_blocks, added to an index the first time they're needed
+GEO_BLOCKS = OrderedDict([
+    ('zip5',       ('aa_zip5',)),
+    ('zip3',       ('aa_zip3',)),
+    ('city_state', ('aa_city', 'aa_state')),
+    ('state',      ('aa_state',)),
+])
+
+EMPTY = np.array([], dtype=np.intp)
+
+# bump whenever the layout written by BlockingIndex.save() changes
+FORMAT_VERSION = 1
+
+# join() looks up each key instead of merging when the index has this many times more records
+LOOKUP_JOIN_RATIO = 16
+
+FNV_OFFSET = np.uint64(14695981039346656037)
+FNV_PRIME  = np.uint64(1099511628211)
+
+
+class BlockingIndex(object):
+    """Hash index of a DataFrame of records built with clean.build_matching_cols()
+
+    Built once over the records being searched so that each lookup is a constant-time hash of the
+    key columns instead of a boolean-mask scan over every record. Each block maps a tuple of key
+    values to the positions (not index labels) of the records sharing those values. Records with a
+    missing value in any of the key columns are left out of that block, the same as comparing them
+    with `==` would.
+
+    Args:
+        search_in (pd.DataFrame): DF of records to look for matches in
+        blocks (dict, optional): block name -> tuple of column names making up the key, defaults to
+            DEFAULT_BLOCKS. Blocks whose columns are not all present in search_in are skipped.
+
+    Example:
+    >>> from mergepurge import index, match
+    >>> idx = index.BlockingIndex(other_contacts)
+    >>> related = match.find_related(contacts, idx)
+    """
+
+    # whether add_block() can be called
+    read_only = False
+
+    def __init__(self, search_in, blocks=None):
+
+        if not search_in.index.is_unique:
+            raise ValueError('Duplicate index entries of records being searched are not allowed.')
+
+        if blocks is None:
+            blocks = DEFAULT_BLOCKS
+
+        self.frame = search_in
+        self.keys = OrderedDict()
+        self.blocks = {}
+        self._subframes = {}
+        self._values = {}
+        self._ngrams = {}
+
+        for name, cols in blocks.items():
+            self.add_block(name, cols)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def add_block(self, name, cols):
+        """Builds (or rebuilds) a block keyed on the values of cols
+
+        Args:
+            name (str): Name to look the block up by
+            cols (tuple): Column names that together make up the key
+
+        Returns:
+            built (boolean): False if any of the columns are missing from the indexed records
+        """
+
+        cols = tuple(cols)
+        if not all(col in self.frame.columns for col in cols):
+            return False
+
+        groups = self.frame.groupby(list(cols), sort=False).indices
+        if len(cols) == 1:
+            groups = {(key,): positions for (key, positions) in groups.items()}
+
+        self.keys[name] = cols
+        self.blocks[name] = groups
+        return True
+
+    def has_block(self, name):
+        return name in self.blocks
+
+    def lookup(self, name, key):
+        """Positions of the records whose key columns equal key
+
+        Args:
+            name (str): Name of the block to search
+            key (tuple): Values to look up, in the same order as the block's columns
+
+        Returns:
+            positions (np.ndarray): Positions of matching records, empty if nothing matched, the
+                block doesn't exist or any part of the key is missing
+        """
+
+        block = self.blocks.get(name)
+        if block is None:
+            return EMPTY
+
+        for val in key:
+            if pd.isnull(val):
+                return EMPTY
+
+        return block.get(key, EMPTY)
+
+    def groups(self, name):
+        """Key and positions of the records sharing it, for each key of a block
+
+        Args:
+            name (str): Name of the block, e.g. 'state'
+
+        Returns:
+            groups (iterator): (key, positions) pairs, same as (key, lookup(name, key)), of every
+                key at least one record has. Nothing if the block doesn't exist.
+        """
+        return iter(self.blocks.get(name, {}).items())
+
+    def join(self, name, keys):
+        """Positions of the records matching each row of a DataFrame of keys, all at once
+
+        An equi-join of keys against the indexed records on the block's columns, done as a single
+        pandas hash merge instead of a lookup() per row. A handful of keys against a big index
+        (see LOOKUP_JOIN_RATIO) are looked up instead, a merge reads every record.
+
+        Args:
+            name (str): Name of the block to search
+            keys (pd.DataFrame): One column per column of the block's key, in the same order
+
+        Returns:
+            (offsets, positions): The positions matching row i of keys are
+                positions[offsets[i]:offsets[i + 1]], the same ones lookup() would give
+        """
+
+        offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        if name not in self.blocks or len(keys) == 0:
+            return offsets, EMPTY
+        if len(keys) * LOOKUP_JOIN_RATIO < len(self):
+            return self._join_by_lookup(name, keys)
+
+        on = list(range(len(self.keys[name])))
+        left = pd.DataFrame({i: keys.iloc[:, i].to_numpy(dtype=object) for i in on})
+        left['row'] = np.arange(len(keys))
+        left = left[left[on].notnull().all(axis=1)]
+
+        right = pd.DataFrame({i: self.values(col, slice(None))
+                              for (i, col) in enumerate(self.keys[name])})
+        right['position'] = np.arange(len(self))
+        right = right[right[on].notnull().all(axis=1)]
+
+        pairs = left.merge(right, on=on, sort=False)
+        order = np.lexsort((pairs['position'].to_numpy(), pairs['row'].to_numpy()))
+        rows = pairs['row'].to_numpy()[order]
+        positions = pairs['position'].to_numpy()[order].astype(np.intp, copy=False)
+
+        offsets[1:] = np.cumsum(np.bincount(rows, minlength=len(keys)))
+        return offsets, positions
+
+    def _join_by_lookup(self, name, keys):
+        """join() for indexes without a frame to merge with, one lookup() per distinct key
+
+        The rows are grouped on their key, each distinct key is looked up once and the positions
+        it found are spread back over its rows.
+        """
+
+        offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        if name not in self.blocks or len(keys) == 0:
+            return offsets, EMPTY
+
+        rows = np.flatnonzero(keys.notnull().all(axis=1).to_numpy())
+        if len(rows) == 0:
+            return offsets, EMPTY
+
+        complete = keys.iloc[rows]
+        codes = complete.groupby(list(complete.columns), sort=False).ngroup().to_numpy()
+        found = [self.lookup(name, key)
+                 for key in complete.drop_duplicates().itertuples(index=False, name=None)]
+
+        counts = np.array([len(positions) for positions in found], dtype=np.int64)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        found = np.concatenate(found).astype(np.intp, copy=False)
+
+        row_counts = counts[codes]
+        offsets[rows + 1] = row_counts
+        np.cumsum(offsets, out=offsets)
+
+        # position j of row r's matches is found[starts[code of r] + j]
+        total = int(row_counts.sum())
+        row_starts = np.repeat(offsets[rows], row_counts)
+        gather = np.repeat(starts[codes], row_counts) + (np.arange(total) - row_starts)
+        return offsets, found[gather]
+
+    def ngram_index(self, name, key, col):
+        """NgramIndex of col over the records of one block, built the first time it's needed
+
+        Args:
+            name (str): Name of the block, e.g. 'state'
+            key (tuple): Key of the block, e.g. ('CA',)
+            col (str): Column to index, e.g. 'aa_company'
+
+        Returns:
+            grams (ngram.NgramIndex or None): Indexes the values of col in the order of
+                lookup(name, key), None if the block is empty
+        """
+
+        cache_key = (name, key, col)
+        grams = self._ngrams.get(cache_key)
+        if grams is None:
+            positions = self.lookup(name, key)
+            if len(positions) == 0:
+                return None
+            grams = NgramIndex(self.values(col, positions))
+            self._ngrams[cache_key] = grams
+        return grams
+
+    def candidates(self, name, key, col, query, threshhold):
+        """Positions of the records of a block whose col could have a fuzz.ratio above threshhold
+
+        Args:
+            name (str): Name of the block, e.g. 'state'
+            key (tuple): Key of the block, e.g. ('CA',)
+            col (str): Column the query is compared to, e.g. 'aa_company'
+            query (str): Name being searched for
+            threshhold (int): Scores must be > this number
+
+        Returns:
+            positions (np.ndarray): A subset of lookup(name, key), in the same order, that includes
+                every record that would score above threshhold
+        """
+
+        grams = self.ngram_index(name, key, col)
+        if grams is None:
+            return EMPTY
+        return self.lookup(name, key)[grams.candidates(query, threshhold)]
+
+    def labels(self, positions):
+        """Index labels of the records at positions"""
+        return self.frame.index[positions]
+
+    def values(self, col, positions):
+        """Values of col for the records at positions, as an object array"""
+
+        values = self._values.get(col)
+        if values is None:
+            values = self.frame[col].to_numpy(dtype=object)
+            self._values[col] = values
+
+        return values[positions]
+
+    def subframe(self, positions, columns):
+        """The records at positions, limited to the given columns
+
+        Args:
+            positions (np.ndarray): Positions returned by lookup()
+            columns (list): Column names to include
+
+        Returns:
+            records (pd.DataFrame)
+        """
+
+        columns = tuple(columns)
+        narrow = self._subframes.get(columns)
+        if narrow is None:
+            narrow = self.frame[list(columns)]
+            self._subframes[columns] = narrow
+
+        return narrow.iloc[positions]
+
+    def save(self, path, columns=None):
+        """Saves the index to a directory that load_index() can memory-map
+
+        Each column is stored as an array of sorted unique strings and an array of int32 codes into
+        it, and each block as sorted hashes of its key codes with CSR-style offsets into an array
+        of positions. Everything is a plain .npy file, so loading is near instant and processes
+        that memory-map the same directory share one copy in the OS page cache.
+
+        Args:
+            path (str): Directory to write to, created if it doesn't exist
+            columns (list, optional): Columns to save in addition to the aa_ columns, e.g. the
+                columns you will want to merge from these records. Values are saved as strings.
+
+        Example:
+        >>> from mergepurge import index
+        >>> index.BlockingIndex(customers).save('customers.idx', columns=['customer_ID'])
+        >>> idx = index.load_index('customers.idx')
+        """
+
+        os.makedirs(path, exist_ok=True)
+
+        if columns is None:
+            columns = []
+        columns = [col for col in self.frame.columns if col.startswith('aa_')] + \
+                  [col for col in columns if not col.startswith('aa_')]
+
+        labels = np.asarray(self.frame.index)
+        if labels.dtype.kind not in 'biuf':
+            labels = labels.astype(str)
+        np.save(os.path.join(path, 'labels.npy'), labels)
+
+        codes = {}
+        for col in columns:
+            (codes[col], categories) = _encode(self.frame[col])
+            np.save(os.path.join(path, 'col.{}.codes.npy'.format(col)), codes[col])
+            np.save(os.path.join(path, 'col.{}.cats.npy'.format(col)), categories)
+
+        # a loaded index can't add blocks, so the ones geo_blocks needs are always written
+        blocks = OrderedDict(self.keys)
+        for (name, cols) in GEO_BLOCKS.items():
+            blocks.setdefault(name, cols)
+
+        for (name, cols) in blocks.items():
+            if not all(col in codes for col in cols):
+                continue
+
+            key_codes = np.column_stack([codes[col] for col in cols])
+            positions = np.flatnonzero((key_codes >= 0).all(axis=1))
+            hashes = _hash_codes(key_codes[positions])
+
+            # sorted by hash, then by position so matches keep the order of the records
+            order = np.lexsort((positions, hashes))
+            hashes, positions = hashes[order], positions[order]
+            (keys, starts) = np.unique(hashes, return_index=True)
+            offsets = np.append(starts, len(hashes)).astype(np.int64)
+
+            np.save(os.path.join(path, 'block.{}.keys.npy'.format(name)), keys)
+            np.save(os.path.join(path, 'block.{}.offsets.npy'.format(name)), offsets)
+            np.save(os.path.join(path, 'block.{}.positions.npy'.format(name)),
+                    positions.astype(np.int64))
+
+        meta = {'version': FORMAT_VERSION,
+                'length': len(self.frame),
+                'columns': columns,
+                'blocks': OrderedDict((name, list(cols)) for (name, cols) in blocks.items()
+                                      if all(col in codes for col in cols))}
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+
+def _encode(values):
+    """Encodes a column as int32 codes into a sorted array of its unique values as strings
+
+    Returns:
+        (codes, categories): codes is -1 where values are missing
+    """
+
+    missing = pd.isnull(values).to_numpy()
+    strings = values.to_numpy(dtype=object)[~missing].astype(str)
+    (categories, inverse) = np.unique(strings, return_inverse=True)
+
+    codes = np.full(len(values), -1, dtype=np.int32)
+    codes[~missing] = inverse
+    if len(categories) == 0:
+        categories = np.array([], dtype='U1')
+
+    return codes, categories
+
+
+def _hash_codes(key_codes):
+    """FNV-1a style 64 bit hash of each row of a 2d array of codes"""
+
+    hashes = np.full(len(key_codes), FNV_OFFSET, dtype=np.uint64)
+    for i in range(key_codes.shape[1]):
+        hashes = (hashes ^ key_codes[:, i].astype(np.uint64)) * FNV_PRIME
+    return hashes
+
+
+class MappedIndex(BlockingIndex):
+    """Read-only BlockingIndex loaded from the files written by BlockingIndex.save()
+
+    Lookups binary search the memory-mapped arrays, so only the pages they touch are read from
+    disk. Use load_index() to open one.
+
+    Args:
+        path (str): Directory the index was saved to
+        mmap (boolean, optional): Memory-map the arrays instead of reading them into memory
+    """
+
+    read_only = True
+
+    def __init__(self, path, mmap=True):
+
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta['version'] != FORMAT_VERSION:
+            raise ValueError('Index at {} was saved in format version {}, expected {}'.format(
+                             path, meta['version'], FORMAT_VERSION))
+
+        mode = 'r' if mmap else None
+
+        def _load(fname):
+            return np.load(os.path.join(path, fname), mmap_mode=mode)
+
+        self.path = path
+        self.length = meta['length']
+        self.columns = meta['columns']
+        self.keys = OrderedDict((name, tuple(cols)) for (name, cols) in meta['blocks'].items())
+
+        self._labels = _load('labels.npy')
+        self._codes = {col: _load('col.{}.codes.npy'.format(col)) for col in self.columns}
+        self._cats = {col: _load('col.{}.cats.npy'.format(col)) for col in self.columns}
+        self.blocks = {name: (_load('block.{}.keys.npy'.format(name)),
+                              _load('block.{}.offsets.npy'.format(name)),
+                              _load('block.{}.positions.npy'.format(name)))
+                       for name in self.keys}
+        self._frame = None
+        self._ngrams = {}
+
+    def __len__(self):
+        return self.length
+
+    def add_block(self, name, cols):
+        raise TypeError('A MappedIndex is read-only, add blocks before saving it.')
+
+    def join(self, name, keys):
+        return self._join_by_lookup(name, keys)
+
+    def _code(self, col, value):
+        """Code of value in col, or -1 if the value never occurs in that column"""
+
+        categories = self._cats[col]
+        value = str(value)
+        code = int(np.searchsorted(categories, value))
+        if code < len(categories) and categories[code] == value:
+            return code
+        return -1
+
+    def lookup(self, name, key):
+
+        if name not in self.blocks:
+            return EMPTY
+
+        cols = self.keys[name]
+        key_codes = []
+        for (col, val) in zip(cols, key):
+            if pd.isnull(val):
+                return EMPTY
+            code = self._code(col, val)
+            if code < 0:
+                return EMPTY
+            key_codes.append(code)
+
+        (keys, offsets, positions) = self.blocks[name]
+        hashed = _hash_codes(np.array([key_codes], dtype=np.int64))[0]
+        i = int(np.searchsorted(keys, hashed))
+        if i >= len(keys) or keys[i] != hashed:
+            return EMPTY
+
+        found = np.asarray(positions[offsets[i]:offsets[i + 1]])
+
+        # weed out any records whose key only collided with this one's hash
+        for (col, code) in zip(cols, key_codes):
+            found = found[self._codes[col][found] == code]
+
+        return found
+
+    def groups(self, name):
+
+        if name not in self.blocks:
+            return
+
+        cols = self.keys[name]
+        key_codes = np.column_stack([np.asarray(self._codes[col]) for col in cols])
+        key_codes = np.unique(key_codes[(key_codes >= 0).all(axis=1)], axis=0)
+        for codes in key_codes:
+            key = tuple(str(self._cats[col][code]) for (col, code) in zip(cols, codes))
+            yield key, self.lookup(name, key)
+
+    def labels(self, positions):
+        return pd.Index(self._labels[positions])
+
+    def values(self, col, positions):
+        """Values of col for the records at positions, as an object array with nan if missing"""
+
+        codes = np.asarray(self._codes[col][positions])
+        values = np.full(len(codes), np.nan, dtype=object)
+        present = codes >= 0
+        values[present] = self._cats[col][codes[present]].astype(object)
+        return values
+
+    def subframe(self, positions, columns):
+        return pd.DataFrame({col: self.values(col, positions) for col in columns},
+                            index=self.labels(positions), columns=list(columns))
+
+    @property
+    def frame(self):
+        """All the saved columns as a DataFrame, built the first time it's needed"""
+
+        if self._frame is None:
+            self._frame = self.subframe(np.arange(self.length), self.columns)
+        return self._frame
+
+
+def load_index(path, mmap=True):
+    """Opens an index saved with BlockingIndex.save() for use as search_in of match.find_related()
+
+    Args:
+        path (str): Directory the index was saved to
+        mmap (boolean, optional): Memory-map the arrays (default) instead of reading them into
+            memory, so several processes can share one copy
+
+    Returns:
+        idx (MappedIndex)
+    """
+    return MappedIndex(path, mmap)
@@ -1,8 +1,27 @@
+import time
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
-from fuzzywuzzy import fuzz
+from .index import EMPTY, BlockingIndex
+from .result import MatchResult
+from .rules import DEFAULT_RULES, compile_rules
+from .stats import MatchStats, Timer
+from . import clean, scoring
 
 
-def find_match_by_biz_name(bname, search_DF, threshhold=90, topN=False):
+# every match type find_related() can return, from the first tier tried to the last
+MATCH_TYPES = [rule.name for rule in DEFAULT_RULES]
+
+
+def _top_frame(search_DF, scores, topN):
+    """The topN best scoring records of search_DF, best first, with an aa_score column added"""
+
+    top = scoring.top_k(scores, topN)
+    return search_DF.iloc[top].assign(aa_score=scores[top])
+
+
+def find_match_by_biz_name(bname, search_DF, threshhold=90, topN=False, backend=None,
+                           ngram_index=None):
     """Lookup matching records using fuzzy business name comparison
 
     Searches the search_DF data by copmany name, using fuzz.ratio() of the fuzzywuzzy library
@@ -11,18 +30,23 @@ def find_match_by_biz_name(bname, search_DF, threshhold=90, topN=False):
         bname (str): Company name to search for
         search_DF (pd.DataFrame): A DF to search with a 'aa_company' column
         threshhold (int): fuzz.ratio of company name and potential matches must be > this number
-        topN (boolean): if True, returns a tuple: (matches, topN) where topN is a DF containing
-            the top N matches regardless of threshhold value
+        topN (int, optional): if given, returns a tuple: (matches, topN) where topN is a DF
+            containing the top N matches regardless of threshhold value
+        backend (str or object, optional): scoring backend to compute fuzz.ratio with, see
+            scoring.get_backend()
+        ngram_index (ngram.NgramIndex, optional): Index of the name column of search_DF (in the
+            same order) to skip scoring the records that can't be a match. Ignored with topN.
 
     Returns:
-        If topN=False (default):
+        Without topN (default):
             matches (pd.DataFrame): A DF with all the matching records in search_DF above the
                 threshhold
-        If topN=True: A tuple of (matches, topN)
+        With topN=N: A tuple of (matches, topN)
             matches (pd.DataFrame): A DF with all the matching records in search_DF above the
                 threshhold
-            topN (pd.DataFrame): A DF with the top N related records to bname from search_DF
-                regardless of threshhold value
+            topN (pd.DataFrame): A DF with up to N records of search_DF most related to bname,
+                regardless of threshhold value, best first, with their scores in an aa_score
+                column
     """
 
     bname = str(bname)
@@ -34,46 +58,50 @@ def find_match_by_biz_name(bname, search_DF, threshhold=90, topN=False):
 
     bname = bname.strip()
 
-    def _compare_names(m_name):
-        if m_name.strip() == '':
-            return 0
-        return fuzz.ratio(bname, m_name)
+    if ngram_index is not None and not topN:
+        search_DF = search_DF.iloc[ngram_index.candidates(bname, threshhold)]
 
-    temp_MR = search_DF['aa_company'].fillna('').apply(_compare_names)
+    cutoff = 0 if topN else threshhold
+    temp_MR = scoring.score_column(bname, search_DF['aa_company'], cutoff, backend)
 
     matches = search_DF[temp_MR > threshhold]
 
     if topN:
-        # FIXME - this sort doesn't work because I'm no longer storing the scores
-        # in a dataframe column (to elimiate a setting with copy warning)
-        # why isn't that warning thrown during the find_by_contact() below?
-        top_ = search_DF.sort_values(by=['temp_MR'], ascending=False).head(topN)
+        top_ = _top_frame(search_DF, temp_MR, topN)
         return matches, top_
     else:
         return matches
 
 
-def find_match_by_contact_name(cname, search_DF, threshhold=90, topN=False, nameparts='full'):
+def find_match_by_contact_name(cname, search_DF, threshhold=90, topN=False, nameparts='full',
+                               backend=None, ngram_index=None):
     """Lookup matching records using fuzzy contact name
 
-    Searches the search_DF data by full name or last, using fuzz.ratio() of the fuzzywuzzy library
+    Searches the search_DF data by full name or last, using fuzz.ratio() of the fuzzywuzzy library.
+    search_DF is not modified, so it is safe to share between calls.
 
     Args:
         cname (str): Contact name to search for
         search_DF (pd.DataFrame): A DF to search with 'aa_fullname' and/or 'aa_lastname' columns
         threshhold (int): fuzz.ratio of contact name and potential matches must be > this number
-        topN (boolean): if True, returns a tuple: (matches, topN) where topN is a DF containing
-            the top N matches regardless of threshhold value
+        topN (int, optional): if given, returns a tuple: (matches, topN) where topN is a DF
+            containing the top N matches regardless of threshhold value
+        nameparts (str): Which part of the name to compare, 'full' or 'last'
+        backend (str or object, optional): scoring backend to compute fuzz.ratio with, see
+            scoring.get_backend()
+        ngram_index (ngram.NgramIndex, optional): Index of the name column of search_DF (in the
+            same order) to skip scoring the records that can't be a match. Ignored with topN.
 
     Returns:
-        If topN=False (default):
+        Without topN (default):
             matches (pd.DataFrame): A DF with all the matching records in search_DF above the
                 threshhold
-        If topN=True: A tuple of (matches, topN)
+        With topN=N: A tuple of (matches, topN)
             matches (pd.DataFrame): A DF with all the matching records in search_DF above the
                 threshhold
-            topN (pd.DataFrame): A DF with the top N related records to cname from search_DF
-                regardless of threshhold value
+            topN (pd.DataFrame): A DF with up to N records of search_DF most related to cname,
+                regardless of threshhold value, best first, with their scores in an aa_score
+                column
     """
 
     cname = str(cname)
@@ -85,34 +113,73 @@ def find_match_by_contact_name(cname, search_DF, threshhold=90, topN=False, name
 
     cname = cname.strip()
 
-    def _compare_names(m_name):
-        if m_name.strip() == '':
-            return 0
-        return fuzz.ratio(cname, m_name)
-
     if nameparts == 'full':
-        search_DF['temp_MR'] = search_DF['aa_fullname'].fillna('').apply(_compare_names)
+        name_col = 'aa_fullname'
     elif nameparts == 'last':
-        search_DF['temp_MR'] = search_DF['aa_lastname'].fillna('').apply(_compare_names)
+        name_col = 'aa_lastname'
+    else:
+        raise ValueError("nameparts must be 'full' or 'last', not {}".format(nameparts))
+
+    if ngram_index is not None and not topN:
+        search_DF = search_DF.iloc[ngram_index.candidates(cname, threshhold)]
 
-    matches = search_DF[search_DF['temp_MR'] > threshhold]
+    cutoff = 0 if topN else threshhold
+    temp_MR = scoring.score_column(cname, search_DF[name_col], cutoff, backend)
+
+    matches = search_DF[temp_MR > threshhold]
 
     if topN:
-        top_ = search_DF.sort(columns=['temp_MR'], ascending=False).head(topN)
+        top_ = _top_frame(search_DF, temp_MR, topN)
         return matches, top_
     else:
         return matches
 
 
-def find_related(search_for, search_in):
+def find_related(search_for, search_in, backend=None, result='tuples', stats=None,
+                 progress=None, progress_every=1000, prune=True, verbose=True, geo_blocks=None):
     """Searches a DataFrame for the contacts/accounts of another
 
     Perform a series of searches for each record in search_for against all the records of search_in
     using the columns generated by running each DataFrame through clean.build_matching_cols()
 
+    The tiers are the rules of rules.DEFAULT_RULES, in order, and a record is only searched for
+    with a tier if none of the earlier ones matched it. The exact tiers are joins against a
+    BlockingIndex of search_in and the fuzzy tiers only score the records of search_in in the same
+    state, so search_in is only scanned once, when the index is built. If both DataFrames were
+    built with phone_cols, records not matched by name or address are matched on their aa_phone
+    before trying the fuzzy tiers. Likewise if both were built with name_keys, names with their
+    words reordered (in the same state) or that sound alike (Smyth/Smith, in the same city) are
+    matched with hash lookups before any names are scored.
+
+    With geo_blocks, the business name tier first scores the records in the same 5 digit zip code,
+    then widens to the same 3 digit zip prefix, city and state, stopping at the first area with a
+    match. That keeps a national chain's locations in other cities from matching, and a block with
+    more records than its level allows is skipped instead of being scored.
+
     Args:
         search_for (pd.DataFrame): DF of records to look for
-        search_in (pd.DataFrame):  DF of records to look matches in
+        search_in (pd.DataFrame or index.BlockingIndex):  DF of records to look matches in, or an
+            index already built over one (to reuse it across calls)
+        backend (str or object, optional): scoring backend for the fuzzy tiers, see
+            scoring.get_backend()
+        result (str, optional): 'tuples' (default) for the list of tuples described below, or 'csr'
+            for the same matches in a compact MatchResult
+        stats (stats.MatchStats, optional): Filled in with the time spent, candidates looked at and
+            matches found by each tier
+        progress (function, optional): Called with (records done, total records) every
+            progress_every records and once all the records are done
+        progress_every (int, optional): How often to call progress
+        prune (boolean, optional): Skip scoring the records of the state that can't be a fuzzy
+            match, using an ngram.NgramIndex of each state's names built the first time the state
+            is searched. The matches are the same either way.
+        verbose (boolean, optional): Print the percentages of records with a match and with
+            multiple matches
+        geo_blocks (boolean or list, optional): True to widen the business name tier through
+            rules.GEO_LEVELS, or a list of (block name, max records) to widen through, narrowest
+            first, e.g. [('zip5', None), ('city_state', 5000)]. Blocks of index.GEO_BLOCKS are
+            added to the index if it doesn't have them (and it isn't read-only), levels the index
+            can't have are left out. The zip levels need the aa_zip5 and aa_zip3 columns added by
+            clean.build_matching_cols() with geo_keys. None (default) only searches the state.
 
     Returns:
         A list of tuples like:
@@ -122,92 +189,424 @@ def find_related(search_for, search_in):
         match.merge_lists()
     """
 
-    more_than_one = 0
-    total_matches = 0
-    search_for_related  = []
+    if isinstance(search_in, BlockingIndex):
+        idx = search_in
+    else:
+        idx = BlockingIndex(search_in)
+
+    plan = compile_rules(DEFAULT_RULES, idx)
+    return plan.run(search_for, backend, result, stats, prune, verbose, progress, progress_every,
+                    geo_blocks)
+
+
+def match_one(record, search_in, addy_cols=None, contact_cols=None, company_cols=None,
+              backend=None, prune=True, stats=None, cache=True, phone_cols=None,
+              geo_blocks=None, name_keys=False):
+    """Searches an index for the matches of a single record, e.g. a signup as it comes in
+
+    Runs the same tiers as find_related() on a dict instead of a DataFrame, so looking up one
+    record costs a few hash lookups and the fuzzy scoring of one state, with no pandas objects
+    built along the way.
+
+    Args:
+        record (dict): Field name -> value, with the aa_ fields already built or the fields to
+            build them from given by addy_cols, contact_cols and company_cols
+        search_in (index.BlockingIndex): Index of the records to look for matches in, built once
+            and reused across calls. A DataFrame is indexed on every call.
+        addy_cols, contact_cols, company_cols (list, optional): Fields of record to build the
+            matching fields from with clean.build_matching_record()
+        backend (str or object, optional): scoring backend for the fuzzy tiers, see
+            scoring.get_backend()
+        prune (boolean, optional): See find_related()
+        stats (stats.MatchStats, optional): Adds this lookup to the counters of each tier
+        cache (boolean or ParseCache, optional): Parse cache used when cleaning the record
+        phone_cols (list, optional): Fields of record to build aa_phone from, for the ExactPhone
+            tier
+        geo_blocks (boolean or list, optional): See find_related()
+        name_keys (boolean, optional): Add the phonetic and sorted word keys of the record's names
+            (see clean.build_name_keys()), for an index of records built with them
+
+    Returns:
+        (match type, ids): How the record was matched and the index values of the matching
+            records of search_in, (None, []) if nothing matched
+
+    Example:
+    >>> from mergepurge import index, match
+    >>> idx = index.BlockingIndex(accounts)
+    >>> match.match_one({'first': 'Leo', 'last': 'Spaceman', 'state': 'NY'}, idx,
+    ...                 ['state'], ['first', 'last'])
+    ('ExactNameState', [1207])
+    """
+
+    started = time.perf_counter()
+
+    if isinstance(search_in, BlockingIndex):
+        idx = search_in
+    else:
+        idx = BlockingIndex(search_in)
+
+    if addy_cols or contact_cols or company_cols or phone_cols or name_keys:
+        record = clean.build_matching_record(record, addy_cols, contact_cols, company_cols,
+                                             cache=cache, phone_cols=phone_cols,
+                                             name_keys=name_keys, geo_keys=bool(geo_blocks))
+
+    run_stats = MatchStats() if stats is None else stats
+
+    plan = compile_rules(DEFAULT_RULES, idx)
+    mtype, matches = plan.match_record(record, run_stats, backend, prune, geo_blocks)
+
+    run_stats.records += 1
+    if mtype is not None:
+        run_stats.matched += 1
+        if len(matches) > 1:
+            run_stats.multiple += 1
+    run_stats.seconds += time.perf_counter() - started
+
+    if mtype is None:
+        return None, []
+    return mtype, idx.labels(matches).tolist()
+
 
-    num_to_match = len(search_for)
+def match_many(records, search_in, addy_cols=None, contact_cols=None, company_cols=None,
+               backend=None, prune=True, stats=None, cache=True, phone_cols=None,
+               geo_blocks=None, name_keys=False):
+    """Searches an index for the matches of several records at once
+
+    Gives the same answers as calling match_one() on each record, but the records are run through
+    the tiers together like find_related() does: each exact tier is one join and the records that
+    get as far as a fuzzy tier are grouped by state and scored together, so a batch of lookups
+    costs little more than the slowest of them. Only reads search_in, so batches
+    can be run from several threads at once (as long as search_in isn't being changed).
+
+    Args:
+        records (list): dicts of field name -> value, see match_one()
+        search_in (index.BlockingIndex): Index of the records to look for matches in
+        addy_cols, contact_cols, company_cols, backend, prune, stats, cache, phone_cols,
+            geo_blocks, name_keys: See match_one()
+
+    Returns:
+        answers (list): (match type, ids) of each record, in order
+
+    Example:
+    >>> from mergepurge import index, match
+    >>> idx = index.BlockingIndex(accounts)
+    >>> match.match_many(signups.to_dict('records'), idx, ['state'], ['first', 'last'])
+    """
+
+    if isinstance(search_in, BlockingIndex):
+        idx = search_in
+    else:
+        idx = BlockingIndex(search_in)
+
+    if addy_cols or contact_cols or company_cols or phone_cols or name_keys:
+        records = [clean.build_matching_record(record, addy_cols, contact_cols, company_cols,
+                                               cache=cache, phone_cols=phone_cols,
+                                               name_keys=name_keys, geo_keys=bool(geo_blocks))
+                   for record in records]
+
+    plan = compile_rules(DEFAULT_RULES, idx)
+    related = plan.run(pd.DataFrame.from_records(records, index=range(len(records))), backend,
+                       'csr', stats, prune, verbose=False, geo_blocks=geo_blocks)
+
+    answers = []
+    for (mtype, _, ids) in related.to_tuples():
+        answers.append((None, []) if mtype is None else (mtype, ids.tolist()))
+    return answers
+
+
+# most scores (queries x records of their block) in one matrix of rank_candidates(), to bound its
+# memory; a block bigger than this is still scored a query at a time
+RANK_CELLS = 2 ** 22
+
+
+def rank_candidates(search_for, search_in, col='aa_fullname', k=5, block='state', min_score=1,
+                    backend=None):
+    """The k best scoring records of search_in for every record of search_for, with their scores
+
+    Near misses included: unlike the fuzzy tiers of find_related() there is no threshhold to pass,
+    which makes this a source of candidates to review by hand. The records of search_for are
+    grouped by block and each group is scored in one matrix, from which the top k of each row are
+    picked with scoring.top_k() instead of sorting every score.
+
+    Args:
+        search_for (pd.DataFrame): DF of records to look for, run through
+            clean.build_matching_cols()
+        search_in (pd.DataFrame or index.BlockingIndex): DF of records to rank, or an index
+            already built over one
+        col (str, optional): Built matching column to score, e.g. 'aa_company'
+        k (int, optional): Most candidates per record
+        block (str, optional): Name of the index block candidates have to share with the record,
+            e.g. 'state', or None to rank all of search_in
+        min_score (int, optional): Leave out candidates scoring less than this
+        backend (str or object, optional): scoring backend, see scoring.get_backend()
+
+    Returns:
+        candidates (pd.DataFrame): A row per candidate with columns search_for_ID, search_in_ID,
+            score and rank (1 for the best), ordered by search_for record then rank. Ties are
+            ranked by the order of search_in.
+
+    Example:
+    >>> from mergepurge import match
+    >>> review = match.rank_candidates(leads, accounts, 'aa_company', k=3, min_score=70)
+    """
 
     if not search_for.index.is_unique:
         raise ValueError('Duplicate index entries of records being searched for are not allowed.')
-    if not search_in.index.is_unique:
-        raise ValueError('Duplicate index entries of records being searched are not allowed.')
 
-    for sf_ind, attendee in search_for.iterrows():
+    if isinstance(search_in, BlockingIndex):
+        idx = search_in
+    else:
+        idx = BlockingIndex(search_in)
 
-        # Exact match on Full Contact Name and State Abbrv.
-        if pd.isnull(attendee.aa_fullname) is False:
+    if block is not None and not idx.has_block(block):
+        raise ValueError('search_in has no block named {}'.format(block))
 
-            matches = search_in[search_in['aa_fullname'] == attendee.aa_fullname]
-            if len(matches) > 0:
-                matches = matches[matches.aa_state == attendee.aa_state]
+    names = search_for.reindex(columns=[col])[col].to_numpy(dtype=object)
 
-            if len(matches) > 0:
-                total_matches += 1
+    # rows of search_for to rank, grouped by the key of their block
+    groups = OrderedDict()
+    if block is None:
+        keys = [None] * len(search_for)
+    else:
+        keys = search_for.reindex(columns=list(idx.keys[block])).itertuples(index=False,
+                                                                           name=None)
+    for (row, (name, key)) in enumerate(zip(names, keys)):
+        if str(name).startswith('nan'):
+            continue
+        if key is not None and any(pd.isnull(val) for val in key):
+            continue
+        groups.setdefault(key, []).append(row)
 
-                if len(matches) > 1:
-                    more_than_one += 1
+    found_rows, found_positions, found_scores = [], [], []
+    for (key, rows) in groups.items():
+        if block is None:
+            in_block = np.arange(len(idx))
+        else:
+            in_block = idx.lookup(block, key)
+        if len(in_block) == 0:
+            continue
 
-                search_for_related.append(('ExactNameState', sf_ind, matches.index))
-                continue
+        chunk_rows = max(1, RANK_CELLS // len(in_block))
+        for start in range(0, len(rows), chunk_rows):
+            chunk = rows[start:start + chunk_rows]
+            queries = [str(names[row]).strip() for row in chunk]
 
-        # Exact match on some parts of the address
-        matches = search_in[(search_in.aa_streetnum == attendee.aa_streetnum) &
-                            (search_in.aa_street    == attendee.aa_street) &
-                            (search_in.aa_state     == attendee.aa_state)]
+            scores = scoring.score_matrix(queries, idx.values(col, in_block), min_score, backend)
+            top = scoring.top_k(scores, k)
+            top_scores = np.take_along_axis(scores, top, axis=1)
 
-        if len(matches) > 0:
-            total_matches += 1
+            found_rows.append(np.repeat(chunk, top.shape[1]))
+            found_positions.append(in_block[top].ravel())
+            found_scores.append(top_scores.ravel())
 
-            if len(matches) > 1:
-                more_than_one += 1
+    rows = np.concatenate(found_rows + [EMPTY])
+    positions = np.concatenate(found_positions + [EMPTY])
+    scores = np.concatenate(found_scores + [np.zeros(0, dtype=np.int64)])
 
-            search_for_related.append(('ExactAddress', sf_ind, matches.index))
-            continue
+    keep = (scores > 0) & (scores >= min_score)
+    (rows, positions, scores) = (rows[keep], positions[keep], scores[keep])
 
-        # Fuzzy match on Contact Name and Exact match on State
-        matches = find_match_by_contact_name(attendee['aa_fullname'], search_in, 89)
-        if len(matches) > 0:
-            matches = matches[matches.aa_state == attendee.aa_state]
+    # rows come grouped by block, put them back in order of search_for, keeping each row's ranks
+    order = np.argsort(rows, kind='stable')
+    (rows, positions, scores) = (rows[order], positions[order], scores[order])
+    starts = np.searchsorted(rows, rows, side='left')
 
-        if len(matches) > 0:
-            total_matches += 1
+    return pd.DataFrame({'search_for_ID': search_for.index[rows],
+                         'search_in_ID': idx.labels(positions),
+                         'score': scores,
+                         'rank': np.arange(len(rows)) - starts + 1})
 
-            if len(matches) > 1:
-                more_than_one += 1
 
-            search_for_related.append(('fuzzContact-ExactState', sf_ind, matches.index))
+# (match type, sort key columns, column compared, threshhold) of each pass of find_neighbors()
+NEIGHBOR_PASSES = [
+    ('Neighbor-StateName',    ('aa_state', 'aa_lastname', 'aa_firstname'), 'aa_fullname', 89),
+    ('Neighbor-ZipStreet',    ('aa_zip', 'aa_street', 'aa_streetnum'),     'aa_company', 90),
+    ('Neighbor-StateCompany', ('aa_state', 'aa_company'),                  'aa_company', 90),
+]
+
+# most records of a pass scored at once by find_neighbors(), to bound its memory
+NEIGHBOR_CHUNK = 8192
+
+
+def _sort_keys(df, cols):
+    """Composite sort key of each record, its uppercased cols joined, None if they're all missing"""
+
+    parts = df.reindex(columns=list(cols)).astype(object)
+    strings = parts.fillna('').astype(str)
+
+    keys = strings.iloc[:, 0].str.upper()
+    for col in strings.columns[1:]:
+        keys = keys + '\x1f' + strings[col].str.upper()
+
+    keys = keys.to_numpy(dtype=object)
+    keys[parts.isnull().all(axis=1).to_numpy()] = None
+    return keys
+
+
+def find_neighbors(search_for, search_in, passes=None, window=10, backend=None, result='tuples',
+                   stats=None, verbose=True):
+    """Searches a DataFrame for the contacts/accounts of another with the sorted neighborhood method
+
+    An alternative to the blocks of find_related() for noisy data, where a typo in the state or a
+    missing field would keep two records out of the same block. Each pass sorts search_in on a
+    composite key of aa_ columns and scores every record of search_for against only the window
+    records of search_in nearest to where its own key sorts. That costs O(M log M + N log M) to
+    sort and look up plus N * window comparisons per pass, however big the blocks are.
+
+    Like the tiers of find_related(), a record is only searched for by a pass if none of the earlier
+    passes matched it. Records whose key columns are all missing are left out of the pass.
+
+    Args:
+        search_for (pd.DataFrame): DF of records to look for, run through
+            clean.build_matching_cols()
+        search_in (pd.DataFrame or index.BlockingIndex): DF of records to look for matches in, or
+            an index already built over one
+        passes (list, optional): (match type, sort key columns, column compared, threshhold) of
+            each pass, in order, defaults to NEIGHBOR_PASSES
+        window (int, optional): Records of search_in each record is compared to in each pass
+        backend (str or object, optional): scoring backend, see scoring.get_backend()
+        result (str, optional): 'tuples' (default) or 'csr', see find_related()
+        stats (stats.MatchStats, optional): Filled in with the records, comparisons and matches of
+            each pass, under its match type
+        verbose (boolean, optional): Print the percentages of records with a match and with
+            multiple matches
+
+    Returns:
+        The same list of tuples (or MatchResult) as find_related(), with the passes' match types
+
+    Example:
+    >>> from mergepurge import match, stats
+    >>> pass_stats = stats.MatchStats()
+    >>> related = match.find_neighbors(vendors, accounts, window=20, stats=pass_stats)
+    >>> pass_stats.tiers['Neighbor-StateName'].comparisons
+    """
+
+    if result not in ('tuples', 'csr'):
+        raise ValueError("result must be 'tuples' or 'csr', not {}".format(result))
+
+    if not search_for.index.is_unique:
+        raise ValueError('Duplicate index entries of records being searched for are not allowed.')
+
+    if passes is None:
+        passes = NEIGHBOR_PASSES
+
+    run_stats = MatchStats()
+    started = time.perf_counter()
+
+    if isinstance(search_in, BlockingIndex):
+        idx = search_in
+    else:
+        idx = BlockingIndex(search_in, {})
+
+    found = [(None, EMPTY)] * len(search_for)
+    unresolved = np.ones(len(search_for), dtype=bool)
+
+    for (mtype, cols, col, threshhold) in passes:
+        tier = run_stats.tier(mtype)
+
+        with Timer(tier):
+            in_keys = _sort_keys(idx.frame, cols)
+            in_order = np.flatnonzero(pd.notnull(in_keys))
+            in_order = in_order[np.argsort(in_keys[in_order], kind='stable')]
+            sorted_keys = in_keys[in_order]
+            width = min(window, len(in_order))
+
+            for_keys = _sort_keys(search_for, cols)
+            names = search_for.reindex(columns=[col])[col].to_numpy(dtype=object)
+            rows = np.flatnonzero(unresolved & pd.notnull(for_keys))
+            rows = rows[[not str(names[row]).startswith('nan') for row in rows]]
+
+        tier.attempted += int(unresolved.sum())
+        if width == 0:
             continue
 
-        # Exact match on State and Fuzzy match on business name
-        # FIXME! this is not specific enough for National chains
-        matches = search_in[search_in.aa_state == attendee.aa_state]
-        if len(matches) > 0:
-            # No business name column here, so use the contact name again
-            matches = find_match_by_biz_name(attendee['aa_company'], matches, 90)
+        for start in range(0, len(rows), NEIGHBOR_CHUNK):
+            chunk = rows[start:start + NEIGHBOR_CHUNK]
+
+            with Timer(tier):
+                # the window of search_in centered on where each record's key sorts
+                spots = np.searchsorted(sorted_keys, for_keys[chunk])
+                firsts = np.clip(spots - width // 2, 0, len(in_order) - width)
+                neighbors = in_order[firsts[:, np.newaxis] + np.arange(width)]
 
-        if len(matches) > 0:
-            total_matches += 1
+                queries = np.repeat(np.array([str(names[row]).strip() for row in chunk],
+                                             dtype=object), width)
+                scores = scoring.score_pairs(queries, idx.values(col, neighbors.ravel()),
+                                             threshhold, backend).reshape(neighbors.shape)
+                hits = scores > threshhold
 
-            if len(matches) > 1:
-                more_than_one += 1
+            tier.candidates += neighbors.size
+            tier.comparisons += neighbors.size
 
-            search_for_related.append(('FuzzBiz-ExactState', sf_ind, matches.index))
+            for j in np.flatnonzero(hits.any(axis=1)):
+                tier.matched += 1
+                found[chunk[j]] = (mtype, np.sort(neighbors[j][hits[j]]))
+                unresolved[chunk[j]] = False
+
+    offsets = np.zeros(len(found) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(matches) for (_, matches) in found])
+    positions = np.concatenate([matches for (_, matches) in found] + [EMPTY])
+
+    run_stats.records = len(found)
+    run_stats.matched = int(sum(mtype is not None for (mtype, _) in found))
+    run_stats.multiple = int((np.diff(offsets) > 1).sum())
+    run_stats.seconds = time.perf_counter() - started
+    if stats is not None:
+        stats.merge(run_stats)
+
+    if verbose:
+        print(run_stats.summary())
+
+    related = MatchResult(search_for.index, offsets, idx.labels(positions),
+                          [mtype for (mtype, _) in found])
+    if result == 'csr':
+        return related
+    return related.to_tuples()
+
+
+def _flatten_matches(matching_indices):
+    """Flattens the output of find_related() into one entry per pair of matching records
+
+    Returns:
+        A tuple of arrays (dest_ids, src_ids, match_types, counts) where dest_ids, match_types and
+        counts have an entry for each search_for record that matched something and src_ids has the
+        counts[i] matching search_in index values of each of them, one after the other
+    """
+
+    if isinstance(matching_indices, MatchResult):
+        matched = matching_indices.counts > 0
+        return (np.asarray(matching_indices.search_for_index, dtype=object)[matched],
+                np.asarray(matching_indices.matches),
+                np.asarray(matching_indices.match_type, dtype=object)[matched],
+                matching_indices.counts[matched])
+
+    dest_ids, src_ids, match_types, counts = [], [], [], []
+
+    for (rec_type, dest_ind, src_index) in matching_indices:
+        if len(src_index) < 1:
             continue
 
-        # give up no matches for this record
-        search_for_related.append((None, None, ()))
+        dest_ids.append(dest_ind)
+        match_types.append(rec_type)
+        counts.append(len(src_index))
+        src_ids.append(np.asarray(src_index))
+
+    counts = np.array(counts, dtype=np.int64)
+    if len(src_ids) > 0:
+        src_ids = np.concatenate(src_ids)
+    else:
+        src_ids = np.array([], dtype=object)
 
-    print(''.join((str(round(total_matches / len(search_for.head(num_to_match)) * 100, 2)),
-          '% (', str(total_matches), ') of search_for records have at least 1 matching record.')))
+    return np.array(dest_ids, dtype=object), src_ids, np.array(match_types, dtype=object), counts
 
-    print(''.join((str(round(more_than_one / len(search_for.head(num_to_match)) * 100, 2)),
-          '% (', str(more_than_one), ') of search_for records have multiple matching records.')))
 
-    return search_for_related
+def _join_unique(values):
+    """Default aggregation for merge_lists(how='aggregate'), the distinct values joined by ', '"""
+    return ', '.join(str(val) for val in pd.unique(values.dropna()))
 
 
-def merge_lists(dest, src, matching_indices, wanted_cols):
+def merge_lists(dest, src, matching_indices, wanted_cols, how='all', agg=_join_unique,
+                verbose=True):
     """Merges contact info from src DataFrame to dest
 
     Merges two pandas Dataframes using the output of `match.find_related(dest, src)` which is a
@@ -215,55 +614,65 @@ def merge_lists(dest, src, matching_indices, wanted_cols):
     dataframes of contacts/accounts with addresses, names and email addresses partially present in
     either DataFrame.
 
+    The matches are flattened into arrays of index values and the wanted columns of all the matching
+    src records are taken at once, so the cost doesn't grow with a per-record loop over src.
+
     Args:
         dest (pd.DataFrame): DF you would like to add columns from another source to
         src (pd.DataFrame): DF containing matching contacts complete with the desired columns
-        matching_indices (list): list of tuples - the output of match.find_related():
-            [('ExactAddress', 2, Int64Index([2585, 2586]))]
+        matching_indices (list or MatchResult): list of tuples - the output of
+            match.find_related(): [('ExactAddress', 2, Int64Index([2585, 2586]))], or the same
+            matches as a MatchResult
         wanted_cols (list): list of column names (str) to add to the destination dataframe from
             the src dataframe
+        how (str, optional): What to do when a dest record matches more than one src record:
+            'all' (default) adds a row for every match, 'first' keeps only the first match and
+            'aggregate' combines the wanted columns of every match into one row with agg
+        agg (function, optional): Aggregation passed to DataFrameGroupBy.agg() for
+            how='aggregate', defaults to joining the distinct values with ', '
+        verbose (boolean, optional): Print how many dest records were matched by each match type
 
     Returns:
         output (pd.DataFrame): The dest DF merged with the src[wanted_cols] DF along with a few
             extra columns that are added to document how each record was matched and the original
-            index values of each input df that facilitate the join.
+            index values of each input df that facilitate the join: src_ID, dest_ID, source_type
+            and multiple_emails (whether the dest record matched more than one src record).
+            With how='aggregate', src_ID is a tuple of all the matching src index values.
     """
 
-    addtl_dest_cols = []
-    src_matches = 0
-
-    for (rec_type, dest_ind, src_index) in matching_indices:
-
-        if len(src_index) < 1:
-            addtl_dest_cols.append({})
-            continue
-        elif len(src_index) == 1:
-            multi = False
-        else:
-            multi = True
-
-        src_matches += 1
-
-        matches = src.ix[src_index]
-
-        for id_, m in matches.iterrows():
-
-            # user-requested columns from src data
-            total_record = m[wanted_cols].to_dict()
-
-            total_record['src_ID']          = src_index
-            total_record['dest_ID']         = dest_ind
-            total_record['source_type']     = rec_type
-            total_record['multiple_emails'] = multi
-
-            addtl_dest_cols.append(total_record)
-
-    morecols = pd.DataFrame(addtl_dest_cols)
+    if how not in ('all', 'first', 'aggregate'):
+        raise ValueError("how must be 'all', 'first' or 'aggregate', not {}".format(how))
+
+    (dest_ids, src_ids, match_types, counts) = _flatten_matches(matching_indices)
+
+    src_positions = src.index.get_indexer(src_ids)
+    if (src_positions < 0).any():
+        raise KeyError('Matched index values missing from src: {}'.format(
+                       list(src_ids[src_positions < 0])[:10]))
+
+    morecols = src[wanted_cols].take(src_positions)
+    morecols.index = pd.RangeIndex(len(morecols))
+    morecols['src_ID']          = src_ids
+    morecols['dest_ID']         = pd.Series(np.repeat(dest_ids, counts)).infer_objects()
+    morecols['source_type']     = np.repeat(match_types, counts)
+    morecols['multiple_emails'] = np.repeat(counts > 1, counts)
+
+    if how == 'first':
+        firsts = np.cumsum(counts) - counts
+        morecols = morecols.take(firsts)
+    elif how == 'aggregate':
+        grouped = morecols.groupby('dest_ID', sort=False)
+        aggregated = grouped[wanted_cols].agg(agg)
+        aggregated['src_ID'] = grouped['src_ID'].agg(tuple)
+        aggregated['source_type'] = grouped['source_type'].first()
+        aggregated['multiple_emails'] = grouped['multiple_emails'].first()
+        morecols = aggregated.reset_index()[list(morecols.columns)]
 
     # How many of the original list we're merging with src did we match by each method?
-    print(morecols.drop_duplicates(subset=['dest_ID']).source_type.value_counts())
+    if verbose:
+        print(pd.Series(match_types, name='source_type', dtype=object).value_counts())
 
-    output = dest.merge(pd.DataFrame(addtl_dest_cols),
+    output = dest.merge(morecols,
                         suffixes=('_dest', '_src'),
                         right_on='dest_ID',
                         left_index=True,
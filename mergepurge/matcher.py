@@ -0,0 +1,328 @@
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from . import clean
+from .index import DEFAULT_BLOCKS, EMPTY, BlockingIndex
+from .ngram import NgramIndex
+
+
+class Matcher(BlockingIndex):
+    """A BlockingIndex of a list of records that changes, updated in place as records come and go
+
+    Records are kept in growable arrays, one per column, and each block maps its keys to the
+    positions of the live records sharing them. add() appends to the arrays and to the blocks of
+    the new keys only, remove() drops positions from the blocks of the removed records' keys, so
+    neither rebuilds the index and match.find_related() sees every change immediately.
+
+    The n-gram indexes that prune the fuzzy tiers are kept too: records added since one was built
+    are scored without pruning until there are enough of them to be worth rebuilding it.
+
+    Positions of removed records are reused once more than half of the stored records have been
+    removed, when the arrays are compacted, so positions are only meaningful until the next
+    change. Index labels are stable.
+
+    Searching a Matcher only reads it, but it must not be changed by one thread while another
+    searches it.
+
+    Args:
+        records (pd.DataFrame, optional): Records to start with
+        addy_cols, contact_cols, company_cols (list, optional): Columns of the records to build
+            matching columns from with clean.build_matching_cols() when they are added. Leave them
+            all out if the records are added with the aa_ columns already built.
+        blocks (dict, optional): block name -> tuple of column names making up the key, defaults to
+            index.DEFAULT_BLOCKS
+        **build_kwargs: Additional arguments to clean.build_matching_cols() e.g. n_jobs
+
+    Example:
+    >>> from mergepurge import match, matcher
+    >>> accounts = matcher.Matcher(customers, ['address', 'city', 'state', 'zip'],
+    ...                            ['first', 'last'], ['company'])
+    >>> accounts.add(signups)
+    >>> accounts.remove(closed_ids)
+    >>> related = match.find_related(leads, accounts)
+    """
+
+    def __init__(self, records=None, addy_cols=None, contact_cols=None, company_cols=None,
+                 blocks=None, **build_kwargs):
+
+        if blocks is None:
+            blocks = DEFAULT_BLOCKS
+
+        self.addy_cols = addy_cols
+        self.contact_cols = contact_cols
+        self.company_cols = company_cols
+        self.build_kwargs = build_kwargs
+
+        self.columns = []
+        self.keys = OrderedDict()
+        self.blocks = {}
+        # blocks to build once the records have all their columns
+        self._wanted_blocks = OrderedDict((name, tuple(cols)) for (name, cols) in blocks.items())
+
+        self._arrays = {}
+        self._labels = np.empty(0, dtype=object)
+        self._alive = np.zeros(0, dtype=bool)
+        self._n = 0
+        self._positions = {}
+        self._ngrams = {}
+        self._frame = None
+
+        if records is not None:
+            self.add(records)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, label):
+        return label in self._positions
+
+    def _clean(self, records):
+        if self.addy_cols is None and self.contact_cols is None and self.company_cols is None:
+            return records
+        return clean.build_matching_cols(records.copy(), self.addy_cols, self.contact_cols,
+                                         self.company_cols, **self.build_kwargs)
+
+    def _reserve(self, extra):
+        """Grows the arrays to fit extra more records, doubling so appends are amortized O(1)"""
+
+        needed = self._n + extra
+        capacity = len(self._alive)
+        if needed <= capacity:
+            return
+
+        capacity = max(needed, 2 * capacity, 16)
+
+        def grow(values, fill):
+            bigger = np.full(capacity, fill, dtype=values.dtype)
+            bigger[:self._n] = values[:self._n]
+            return bigger
+
+        self._arrays = {col: grow(values, None) for (col, values) in self._arrays.items()}
+        self._labels = grow(self._labels, None)
+        self._alive = grow(self._alive, False)
+
+    def _block_groups(self, cols, positions):
+        """key -> positions of the records at positions, grouped on cols like BlockingIndex"""
+
+        keys = pd.DataFrame({col: self._arrays[col][positions] for col in cols})
+        groups = keys.groupby(list(cols), sort=False).indices
+        if len(cols) == 1:
+            groups = {(key,): positions[rows] for (key, rows) in groups.items()}
+        else:
+            groups = {key: positions[rows] for (key, rows) in groups.items()}
+        return groups
+
+    def add_block(self, name, cols):
+        """Builds (or rebuilds) a block keyed on the values of cols
+
+        Args:
+            name (str): Name to look the block up by
+            cols (tuple): Column names that together make up the key
+
+        Returns:
+            built (boolean): False if any of the columns are missing from the records
+        """
+
+        cols = tuple(cols)
+        self._wanted_blocks[name] = cols
+        if not all(col in self._arrays for col in cols):
+            return False
+
+        self.keys[name] = cols
+        self.blocks[name] = self._block_groups(cols, np.flatnonzero(self._alive[:self._n]))
+        for cache_key in [k for k in self._ngrams if k[0] == name]:
+            del self._ngrams[cache_key]
+        return True
+
+    def _changed(self, name, key):
+        self._frame = None
+        for cache_key in [k for k in self._ngrams if k[:2] == (name, key)]:
+            # positions of the records the n-gram index was built over may have been dropped
+            self._ngrams[cache_key].stale = True
+
+    def add(self, records):
+        """Adds records, cleaning them first if the Matcher was given columns to clean
+
+        Args:
+            records (pd.DataFrame): New records, their index labels must not be in the Matcher yet
+
+        Returns:
+            self
+        """
+
+        if len(records) == 0:
+            return self
+
+        if not records.index.is_unique or any(label in self._positions
+                                              for label in records.index):
+            raise ValueError('Duplicate index entries of records being searched are not allowed.')
+
+        records = self._clean(records)
+        n_new = len(records)
+
+        self._reserve(n_new)
+        start, end = self._n, self._n + n_new
+        positions = np.arange(start, end)
+
+        for col in records.columns:
+            if col not in self._arrays:
+                self.columns.append(col)
+                self._arrays[col] = np.full(len(self._alive), None, dtype=object)
+            self._arrays[col][start:end] = records[col].to_numpy(dtype=object)
+
+        self._labels[start:end] = np.asarray(records.index, dtype=object)
+        self._alive[start:end] = True
+        self._positions.update(zip(records.index, positions))
+        self._n = end
+        self._frame = None
+
+        for (name, cols) in self._wanted_blocks.items():
+            if name not in self.blocks:
+                self.add_block(name, cols)
+                continue
+            block = self.blocks[name]
+            for (key, new) in self._block_groups(cols, positions).items():
+                old = block.get(key)
+                block[key] = new if old is None else np.concatenate((old, new))
+                self._changed(name, key)
+
+        return self
+
+    def remove(self, ids):
+        """Removes the records with the given index labels
+
+        Args:
+            ids (list-like): Index labels of records in the Matcher
+
+        Returns:
+            self
+        """
+
+        missing = [label for label in ids if label not in self._positions]
+        if missing:
+            raise KeyError('{} not in the Matcher'.format(missing))
+
+        positions = np.array([self._positions.pop(label) for label in ids], dtype=np.intp)
+        if len(positions) == 0:
+            return self
+
+        self._alive[positions] = False
+        self._frame = None
+
+        for (name, cols) in self.keys.items():
+            block = self.blocks[name]
+            for (key, gone) in self._block_groups(cols, positions).items():
+                kept = block[key][~np.isin(block[key], gone)]
+                if len(kept) > 0:
+                    block[key] = kept
+                else:
+                    del block[key]
+                self._changed(name, key)
+
+        if len(self._positions) < self._n / 2:
+            self.compact()
+
+        return self
+
+    def update(self, records):
+        """Replaces the records with the same index labels as records, adds the rest
+
+        Updated records are cleaned again and move to the end of the Matcher, as if they were
+        removed and added.
+
+        Args:
+            records (pd.DataFrame): New versions of records
+
+        Returns:
+            self
+        """
+
+        self.remove([label for label in records.index if label in self._positions])
+        return self.add(records)
+
+    def compact(self):
+        """Drops removed records from the arrays and rebuilds the blocks over what's left"""
+
+        alive = np.flatnonzero(self._alive[:self._n])
+        n = len(alive)
+
+        self._arrays = {col: values[alive] for (col, values) in self._arrays.items()}
+        self._labels = self._labels[alive]
+        self._alive = np.ones(n, dtype=bool)
+        self._positions = dict(zip(self._labels, range(n)))
+        self._n = n
+        self._ngrams = {}
+        self._frame = None
+
+        for (name, cols) in list(self.keys.items()):
+            self.add_block(name, cols)
+
+    def ngram_index(self, name, key, col):
+        """NgramIndex of col over the records of one block when it was last built, see
+        candidates()"""
+
+        cache_key = (name, key, col)
+        grams = self._ngrams.get(cache_key)
+        positions = self.lookup(name, key)
+
+        # rebuild once the unindexed records make up a fair share of the block
+        if grams is None or grams.stale and \
+                (len(positions) - grams.n_indexed) * 4 > max(len(positions), 64):
+            if len(positions) == 0:
+                self._ngrams.pop(cache_key, None)
+                return None
+            grams = NgramIndex(self.values(col, positions))
+            grams.positions = positions
+            grams.n_indexed = len(positions)
+            grams.up_to = self._n
+            grams.stale = False
+            self._ngrams[cache_key] = grams
+
+        return grams
+
+    def candidates(self, name, key, col, query, threshhold):
+        """Positions of the records of a block whose col could have a fuzz.ratio above threshhold
+
+        The records indexed when the block's NgramIndex was built are pruned with it, the records
+        added since are all returned.
+
+        Returns:
+            positions (np.ndarray): A subset of lookup(name, key), in the same order
+        """
+
+        grams = self.ngram_index(name, key, col)
+        if grams is None:
+            return EMPTY
+
+        pruned = grams.positions[grams.candidates(query, threshhold)]
+        if not grams.stale:
+            return pruned
+
+        pruned = pruned[self._alive[pruned]]
+        positions = self.lookup(name, key)
+        added = positions[np.searchsorted(positions, grams.up_to):]
+        return np.concatenate((pruned, added))
+
+    def join(self, name, keys):
+        return self._join_by_lookup(name, keys)
+
+    def labels(self, positions):
+        """Index labels of the records at positions"""
+        return pd.Index(list(self._labels[positions]))
+
+    def values(self, col, positions):
+        """Values of col for the records at positions, as an object array"""
+        return self._arrays[col][positions]
+
+    def subframe(self, positions, columns):
+        """The records at positions, limited to the given columns"""
+        return pd.DataFrame({col: self._arrays[col][positions] for col in columns},
+                            index=self.labels(positions), columns=list(columns))
+
+    @property
+    def frame(self):
+        """The current records as a DataFrame, in the order they were added"""
+
+        if self._frame is None:
+            self._frame = self.subframe(np.flatnonzero(self._alive[:self._n]), self.columns)
+        return self._frame
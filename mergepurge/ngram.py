@@ -0,0 +1,94 @@
+from collections import Counter
+import numpy as np
+import pandas as pd
+
+
+def _grams(value, q):
+    """Multiset of the q-grams of value"""
+    return Counter(value[i:i + q] for i in range(len(value) - q + 1))
+
+
+class NgramIndex(object):
+    """Inverted index of the character q-grams of a column of names, for pruning fuzzy searches
+
+    fuzz.ratio() is 100 * (1 - d / (len(a) + len(b))) where d is the indel distance of the two
+    strings, so a score above threshhold puts an upper bound on d. Since d can't be less than the
+    difference in lengths, and strings within edit distance k share at least
+    max(len(a), len(b)) - q + 1 - k * q q-grams, candidates too far apart in length or without
+    enough q-grams in common can't score above threshhold and are skipped without being scored.
+    The candidates that are left are exactly scored as usual, so results are identical to scoring
+    every value.
+
+    Args:
+        values (list-like): Strings to index, in order, missing values are never candidates
+        q (int, optional): Length of the character grams
+
+    Example:
+    >>> from mergepurge import match, ngram
+    >>> grams = ngram.NgramIndex(accounts['aa_company'])
+    >>> matches = match.find_match_by_biz_name('Acme Corp', accounts, 90, ngram_index=grams)
+    """
+
+    def __init__(self, values, q=2):
+
+        self.q = q
+
+        values = pd.Series(values, dtype=object).fillna('').map(str)
+        (self.value_ids, uniques) = pd.factorize(values.to_numpy(dtype=object))
+        self.lengths = np.array([len(val) for val in uniques], dtype=np.int64)
+        self.blank = np.array([val.strip() == '' for val in uniques], dtype=bool)
+
+        postings = {}
+        for (uid, val) in enumerate(uniques):
+            for (gram, count) in _grams(val, q).items():
+                postings.setdefault(gram, []).append((uid, count))
+
+        self.slots = {}
+        ids, counts, offsets = [], [], [0]
+        for (slot, (gram, posting)) in enumerate(postings.items()):
+            self.slots[gram] = slot
+            ids.extend(uid for (uid, _) in posting)
+            counts.extend(count for (_, count) in posting)
+            offsets.append(len(ids))
+
+        self.post_ids = np.array(ids, dtype=np.int64)
+        self.post_counts = np.array(counts, dtype=np.int64)
+        self.post_offsets = np.array(offsets, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.value_ids)
+
+    def candidates(self, query, threshhold):
+        """Positions of the values that could have a fuzz.ratio with query above threshhold
+
+        Args:
+            query (str): Name being searched for (already stripped, as the finders do)
+            threshhold (int): Scores must be > this number
+
+        Returns:
+            positions (np.ndarray): Sorted positions into the indexed values
+        """
+
+        if query == '':
+            return np.array([], dtype=np.intp)
+
+        q = self.q
+        la = len(query)
+
+        # most indel edits a pair can be apart and still round to a score above threshhold
+        max_dist = (la + self.lengths) * (1 - (threshhold + 0.5) / 100.0) + 1e-9
+        possible = ~self.blank & (np.abs(la - self.lengths) <= max_dist)
+
+        need = np.maximum(la, self.lengths) - q + 1 - np.floor(max_dist) * q
+        check = possible & (need > 0)
+        if check.any():
+            shared = np.zeros(len(self.lengths), dtype=np.int64)
+            for (gram, count) in _grams(query, q).items():
+                slot = self.slots.get(gram)
+                if slot is None:
+                    continue
+                start, end = self.post_offsets[slot], self.post_offsets[slot + 1]
+                shared[self.post_ids[start:end]] += np.minimum(self.post_counts[start:end], count)
+            possible &= ~check | (shared >= need)
+
+        return np.flatnonzero(possible[self.value_ids])
@@ -0,0 +1,207 @@
+import numpy as np
+import pandas as pd
+from . import rules
+from .index import BlockingIndex
+
+
+class UnionFind(object):
+    """Disjoint sets of the positions 0..n-1, merged with union() and labeled with find()
+
+    Args:
+        n (int): Number of elements
+    """
+
+    def __init__(self, n):
+        self.parent = np.arange(n)
+        self.size = np.ones(n, dtype=np.int64)
+
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            # path halving
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, i, j):
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i == root_j:
+            return
+        if self.size[root_i] < self.size[root_j]:
+            root_i, root_j = root_j, root_i
+        self.parent[root_j] = root_i
+        self.size[root_i] += self.size[root_j]
+
+    def union_all(self, positions):
+        """Puts all of positions in the same set"""
+        for j in positions[1:]:
+            self.union(positions[0], j)
+
+    def roots(self):
+        return np.array([self.find(i) for i in range(len(self.parent))])
+
+
+def _searchable(name):
+    """Whether find_related() would run a fuzzy search for this name"""
+    return not str(name).startswith('nan')
+
+
+def _link_exact(uf, idx, block, resolved):
+    """Links the records of each block that one of them would have been matched to the others by
+
+    A record matches every other record sharing its key, so a block with at least one record that
+    isn't resolved yet ends up as a single cluster. Its unresolved records become resolved.
+    """
+
+    newly = np.zeros(len(resolved), dtype=bool)
+    for (_, positions) in idx.groups(block):
+        if len(positions) < 2 or resolved[positions].all():
+            continue
+        uf.union_all(positions)
+        newly[positions] = True
+
+    return resolved | newly
+
+
+def _link_fuzzy(uf, idx, block, col, threshhold, resolved, backend=None, prune=True):
+    """Links records of the same block with fuzzy matching values of col
+
+    Every unresolved record is linked to the other records of its block, resolved or not, whose
+    value scores above threshhold. As in match.find_related(), the unresolved records of a block
+    are scored together with rules.fuzzy_batch(), only against the records their n-grams could
+    match (with prune). But since fuzz.ratio is symmetric each pair of records is only scored
+    once: an unresolved record is scored against the resolved records and the unresolved records
+    after it, never against itself.
+
+    Returns:
+        pairs_compared (int), resolved (np.ndarray)
+    """
+
+    pairs_compared = 0
+    newly = np.zeros(len(resolved), dtype=bool)
+    usable = np.array([_searchable(name) for name in idx.values(col, np.arange(len(idx)))],
+                      dtype=bool)
+
+    for (key, positions) in idx.groups(block):
+        queries = positions[~resolved[positions] & usable[positions]]
+        if len(queries) == 0:
+            continue
+
+        def keep(i, found):
+            return found[usable[found] & (resolved[found] | (found > queries[i]))]
+
+        (matches, comparisons) = rules.fuzzy_batch(idx.values(col, queries), idx, block, key, col,
+                                                   threshhold, backend, prune, keep)
+        pairs_compared += comparisons
+
+        for (q, found) in zip(queries, matches):
+            if len(found) == 0:
+                continue
+            uf.union_all(np.append(q, found))
+            newly[q] = True
+            newly[found] = True
+
+    return pairs_compared, resolved | newly
+
+
+def find_duplicates(df, backend=None):
+    """Clusters the records of a DataFrame that are duplicates of each other
+
+    Uses the same tiers as match.find_related(), the rules of rules.DEFAULT_RULES: exact name and
+    state, exact address, exact phone number (if the records have an aa_phone column), the same
+    sorted name words in the same state and the same phonetic name in the same city (if the records
+    were built with name_keys), fuzzy contact name in the same state and fuzzy company name in the
+    same state, where a record is only searched for with a tier if none of the previous tiers
+    matched it to another record. Matches are transitive, records are clustered with union-find so
+    A~B and B~C puts A, B and C together.
+
+    Unlike find_related(df, df) no record is compared to itself and each pair of records is
+    compared at most once.
+
+    Args:
+        df (pd.DataFrame or index.BlockingIndex): DF of records run through
+            clean.build_matching_cols(), or an index of them, e.g. from index.load_index()
+        backend (str or object, optional): scoring backend for the fuzzy tiers, see
+            scoring.get_backend()
+
+    Returns:
+        clusters (np.ndarray): An int cluster id for each record of df, in order, numbered from 0
+            in order of the first record of each cluster
+    """
+
+    idx = df if isinstance(df, BlockingIndex) else BlockingIndex(df)
+    n = len(idx)
+
+    uf = UnionFind(n)
+    resolved = np.zeros(n, dtype=bool)
+
+    plan = rules.compile_rules(rules.DEFAULT_RULES, idx)
+    for rule in plan.rules:
+        block = plan.blocks[rule.name]
+        if rule.comparator == 'exact':
+            resolved = _link_exact(uf, idx, block, resolved)
+        elif rule.fields[0] in idx.frame.columns:
+            _, resolved = _link_fuzzy(uf, idx, block, rule.fields[0], rule.threshhold, resolved,
+                                      backend)
+
+    clusters, _ = pd.factorize(uf.roots())
+    return clusters
+
+
+def _completeness(df):
+    """Number of non-missing values of each record, not counting the aa_ columns"""
+    cols = [col for col in df.columns if not col.startswith('aa_')]
+    return df[cols].notnull().sum(axis=1).to_numpy()
+
+
+def purge(df, survivor='first', cluster_col='aa_cluster', survivor_col='aa_survivor',
+          backend=None):
+    """Finds duplicate records in a DataFrame and picks one record of each group to keep
+
+    Args:
+        df (pd.DataFrame): DF of records run through clean.build_matching_cols()
+        survivor (str or function, optional): How to pick the record to keep from each cluster:
+            'first' (default) keeps the first record, 'complete' keeps the record with the most
+            non-missing values (the first of those on a tie), or a function that is passed the
+            DataFrame of a cluster's records and returns the index value of the one to keep
+        cluster_col (str, optional): Name of the column to add with each record's cluster id
+        survivor_col (str, optional): Name of the boolean column to add that marks the records
+            to keep
+        backend (str or object, optional): scoring backend for the fuzzy tiers, see
+            scoring.get_backend()
+
+    Returns:
+        df (pd.DataFrame): A copy of df with the cluster_col and survivor_col columns added
+
+    Example:
+    >>> from mergepurge import clean, purge
+    >>> customers = clean.build_matching_cols(customers, ['address', 'city', 'state', 'zip'],
+    ...                                       ['first', 'last'], ['company'])
+    >>> customers = purge.purge(customers, survivor='complete')
+    >>> deduped = customers[customers.aa_survivor]
+    """
+
+    clusters = find_duplicates(df, backend)
+
+    output = df.copy()
+    output[cluster_col] = clusters
+
+    if survivor == 'first':
+        keep = ~pd.Series(clusters).duplicated().to_numpy()
+    elif survivor == 'complete':
+        ranked = pd.DataFrame({'cluster': clusters,
+                               'filled': _completeness(df),
+                               'position': np.arange(len(df))})
+        ranked = ranked.sort_values(['cluster', 'filled', 'position'],
+                                    ascending=[True, False, True])
+        keep = np.zeros(len(df), dtype=bool)
+        keep[ranked.drop_duplicates(subset=['cluster'])['position'].to_numpy()] = True
+    elif callable(survivor):
+        kept = output.groupby(cluster_col, sort=False).apply(survivor)
+        keep = output.index.isin(kept)
+    else:
+        raise ValueError("survivor must be 'first', 'complete' or a function, not {}".format(
+                         survivor))
+
+    output[survivor_col] = keep
+    return output
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+
+class MatchResult(object):
+    """Compact, columnar form of the output of find_related()
+
+    Instead of a tuple and a pandas Index per record, the matches of all the search_for records are
+    stored CSR-style: the search_in index values matched by record i are
+    matches[offsets[i]:offsets[i + 1]].
+
+    Args:
+        search_for_index (pd.Index): Index values of the records that were searched for
+        offsets (np.ndarray): len(search_for_index) + 1 int offsets into matches
+        matches (np.ndarray or pd.Index): Matching search_in index values of every record, one
+            record after the other
+        match_type (list-like): How each search_for record was matched, None if it wasn't
+        categories (list, optional): Every match type that could have been found, in the order
+            they were tried, e.g. the names of the rules run. Defaults to the ones in match_type.
+
+    Attributes:
+        match_type (pd.Categorical): How each search_for record was matched, NaN if it wasn't
+
+    Example:
+    >>> from mergepurge import match
+    >>> related = match.find_related(contacts, other_contacts, result='csr')
+    >>> related.to_frame().head()
+    >>> merged = match.merge_lists(contacts, other_contacts, related, ['email'])
+    """
+
+    def __init__(self, search_for_index, offsets, matches, match_type, categories=None):
+        self.search_for_index = pd.Index(search_for_index)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.matches = pd.Index(matches)
+
+        categories = list(categories) if categories is not None else []
+        categories += sorted({mtype for mtype in match_type
+                              if mtype is not None and mtype not in categories})
+        self.match_type = pd.Categorical(match_type, categories=categories)
+
+    def __len__(self):
+        return len(self.search_for_index)
+
+    def __iter__(self):
+        return iter(self.to_tuples())
+
+    @property
+    def counts(self):
+        """Number of matching search_in records of each search_for record"""
+        return np.diff(self.offsets)
+
+    def to_tuples(self):
+        """The legacy output of find_related(), a list of (match_type, search_for index, Index)"""
+
+        related = []
+        for (i, (sf_ind, mtype)) in enumerate(zip(self.search_for_index, self.match_type)):
+            start, end = self.offsets[i], self.offsets[i + 1]
+            if start == end:
+                related.append((None, None, ()))
+            else:
+                related.append((mtype, sf_ind, self.matches[start:end]))
+        return related
+
+    def to_frame(self):
+        """Long-form DataFrame with a row for each matching pair of records
+
+        Returns:
+            pairs (pd.DataFrame): with columns search_for_ID, search_in_ID and match_type
+        """
+
+        counts = self.counts
+        return pd.DataFrame({'search_for_ID': self.search_for_index.repeat(counts),
+                             'search_in_ID': self.matches,
+                             'match_type': self.match_type.repeat(counts)})
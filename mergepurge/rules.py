@@ -0,0 +1,540 @@
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from . import scoring
+from .index import DEFAULT_BLOCKS, EMPTY, GEO_BLOCKS, BlockingIndex
+from .result import MatchResult
+from .stats import MatchStats, Timer
+
+
+COMPARATORS = ('exact', 'fuzzy')
+
+
+class Rule(object):
+    """One way two records can match, e.g. the same name in the same state
+
+    An 'exact' rule matches the records whose fields are all equal. A 'fuzzy' rule matches the
+    records of the same block (the records whose block columns are all equal) whose one field has a
+    fuzz.ratio above threshhold.
+
+    Args:
+        name (str): Match type reported for the records this rule matches
+        fields (list): Built matching columns compared, e.g. ['aa_fullname', 'aa_state']
+        comparator (str, optional): 'exact' (default) or 'fuzzy'
+        threshhold (int, optional): Fuzzy rules only, scores must be > this number
+        block (list, optional): Fuzzy rules only, the columns a candidate has to share with the
+            record, e.g. ['aa_state']
+        geo (boolean, optional): Fuzzy rules only, search the geographic levels of geo_blocks
+            instead of block when a plan is run with them, see match.find_related()
+
+    Example:
+    >>> from mergepurge import rules
+    >>> rules.Rule('FuzzBiz-ExactZip', ['aa_company'], 'fuzzy', 85, block=['aa_zip'])
+    """
+
+    def __init__(self, name, fields, comparator='exact', threshhold=None, block=None, geo=False):
+
+        if comparator not in COMPARATORS:
+            raise ValueError("comparator must be one of {}, not {}".format(COMPARATORS,
+                                                                          comparator))
+
+        self.name = name
+        self.fields = tuple(fields)
+        self.comparator = comparator
+        self.threshhold = threshhold
+        self.block = tuple(block) if block is not None else None
+        self.geo = geo
+
+        if len(self.fields) == 0:
+            raise ValueError('Rule {} has no fields.'.format(name))
+
+        if comparator == 'exact':
+            if threshhold is not None or block is not None or geo:
+                raise ValueError('Exact rule {} takes no threshhold, block or geo, it blocks on '
+                                 'its fields.'.format(name))
+            self.block = self.fields
+        elif len(self.fields) != 1 or threshhold is None or not self.block:
+            raise ValueError('Fuzzy rule {} needs exactly one field, a threshhold and a '
+                             'block.'.format(name))
+
+    @classmethod
+    def from_dict(cls, spec):
+        """Rule from a dict of its arguments, e.g. one entry of a JSON config"""
+        return cls(**spec)
+
+    def as_dict(self):
+        spec = OrderedDict([('name', self.name), ('fields', list(self.fields)),
+                            ('comparator', self.comparator)])
+        if self.comparator == 'fuzzy':
+            spec['threshhold'] = self.threshhold
+            spec['block'] = list(self.block)
+            if self.geo:
+                spec['geo'] = True
+        return spec
+
+    def __repr__(self):
+        return 'Rule({})'.format(', '.join('{}={!r}'.format(k, v)
+                                           for (k, v) in self.as_dict().items()))
+
+
+# the tiers of match.find_related()
+DEFAULT_RULES = [
+    Rule('ExactNameState', ['aa_fullname', 'aa_state']),
+    Rule('ExactAddress', ['aa_streetnum', 'aa_street', 'aa_state']),
+    Rule('ExactPhone', ['aa_phone']),
+    Rule('SortedName-ExactState', ['aa_fullname_tokens', 'aa_state']),
+    Rule('SortedBiz-ExactState', ['aa_company_tokens', 'aa_state']),
+    # alike sounding names are a weak match on their own (John and Jim are both J500), so only
+    # within one city
+    Rule('PhoneticName-ExactCity', ['aa_fullname_sdx', 'aa_city', 'aa_state']),
+    Rule('PhoneticBiz-ExactCity', ['aa_company_sdx', 'aa_city', 'aa_state']),
+    Rule('fuzzContact-ExactState', ['aa_fullname'], 'fuzzy', 89, block=['aa_state']),
+    Rule('FuzzBiz-ExactState', ['aa_company'], 'fuzzy', 90, block=['aa_state'], geo=True),
+]
+
+# (block, most records it can have) of each level a geo rule widens through with geo_blocks=True,
+# narrowest first. Blocks bigger than that are skipped, None for no limit. The state has none, so
+# a record whose narrower areas are all too big is still searched as widely as without geo_blocks.
+GEO_LEVELS = [('zip5', None), ('zip3', 10000), ('city_state', 10000), ('state', None)]
+
+# key columns -> name of the block of index.DEFAULT_BLOCKS or index.GEO_BLOCKS keyed on them
+BLOCK_NAMES = {cols: name for blocks in (GEO_BLOCKS, DEFAULT_BLOCKS)
+               for (name, cols) in blocks.items()}
+
+# blocks with fewer records than this are scored outright, building an ngram.NgramIndex to prune
+# them costs more than it saves
+PRUNE_MIN = 64
+
+# most pairs of names scored at once by fuzzy_batch(), to bound its memory
+BATCH_CELLS = 2 ** 22
+
+
+def geo_levels(idx, geo_blocks):
+    """The (block, max records) levels of geo_blocks, adding any of GEO_BLOCKS idx doesn't have
+
+    A level whose block idx doesn't have and can't add (it's read-only, or doesn't have the
+    block's columns) would never match anything, so it's left out.
+
+    Args:
+        idx (index.BlockingIndex): Index the levels are searched in
+        geo_blocks (boolean or list): True for GEO_LEVELS, or a list of (block name, max records)
+
+    Returns:
+        levels (list): [('state', None)], the state-only search, if geo_blocks is None or False
+    """
+
+    if geo_blocks is None or geo_blocks is False:
+        return [('state', None)]
+    if geo_blocks is True:
+        geo_blocks = GEO_LEVELS
+
+    levels = []
+    for (block, max_size) in geo_blocks:
+        if not idx.has_block(block):
+            if idx.read_only or block not in GEO_BLOCKS:
+                continue
+            if not idx.add_block(block, GEO_BLOCKS[block]):
+                continue
+        levels.append((block, max_size))
+    return levels
+
+
+def join_tier(mtype, idx, block, keys, rows, found, tier):
+    """Runs an exact tier for the rows of keys still unresolved, as one join against a block
+
+    Args:
+        mtype (str): Match type to record for the rows that match
+        idx (index.BlockingIndex): Index of the records to look for matches in
+        block (str): Name of the block of idx to join against
+        keys (pd.DataFrame): Key columns of every record being searched for, in the block's order
+        rows (np.ndarray): Positions in keys of the records still unresolved
+        found (list): (match type, positions) of each record, filled in for the rows that match
+        tier (stats.TierStats): Counters to add to
+
+    Returns:
+        rows (np.ndarray): The rows that are still unresolved
+    """
+
+    with Timer(tier):
+        (offsets, positions) = idx.join(block, keys.iloc[rows])
+    counts = np.diff(offsets)
+    tier.attempted += len(rows)
+    tier.candidates += int(counts.sum())
+    tier.matched += int((counts > 0).sum())
+
+    for j in np.flatnonzero(counts):
+        found[rows[j]] = (mtype, positions[offsets[j]:offsets[j + 1]])
+    return rows[counts == 0]
+
+
+def _fuzzy_positions(name, idx, candidates, col, threshhold, backend=None, block=None):
+    """Positions among candidates of idx whose col is a fuzzy match for name
+
+    The same records match.find_match_by_contact_name() and match.find_match_by_biz_name() would
+    return, but without building a DataFrame of the candidates.
+
+    Args:
+        block (tuple, optional): (name, key) of the block of idx that candidates are the records
+            of, to skip scoring the candidates that can't be a match with idx.candidates()
+
+    Returns:
+        (positions, comparisons): the matching positions and how many candidates were scored
+    """
+
+    name = str(name)
+    if name.startswith('nan') or len(candidates) == 0:
+        return EMPTY, 0
+
+    name = name.strip()
+    if block is not None and len(candidates) >= PRUNE_MIN:
+        candidates = idx.candidates(block[0], block[1], col, name, threshhold)
+        if len(candidates) == 0:
+            return EMPTY, 0
+
+    scores = scoring.score_column(name, idx.values(col, candidates), threshhold, backend)
+    return candidates[scores > threshhold], len(candidates)
+
+
+def fuzzy_batch(names, idx, block, key, col, threshhold, backend=None, prune=True, keep=None):
+    """Matches of several names among the records of one block, scored together
+
+    Each name gets the same positions _fuzzy_positions() would give it. With prune (or keep), each
+    name is only paired with its own candidates and all the pairs are scored at once, otherwise the
+    names are scored against the whole block in one matrix. Either way at most BATCH_CELLS pairs
+    are scored per call to the backend.
+
+    Args:
+        names (list): Values of col to look for, missing ones are never matched
+        idx (index.BlockingIndex): Index of the records to look for matches in
+        block, key: Name and key of the block of idx to search, e.g. 'state', ('CA',)
+        col (str): Column of idx the names are compared to, e.g. 'aa_company'
+        threshhold (int): Scores must be > this number
+        backend (str or object, optional): scoring backend, see scoring.get_backend()
+        prune (boolean, optional): Skip the records that can't be a match, see
+            index.BlockingIndex.candidates()
+        keep (callable, optional): Called with the number of a name in names and the positions
+            of its candidates, returns the ones to score it against. All of them by default.
+
+    Returns:
+        (matches, comparisons): a positions array for each of names and how many pairs were scored
+    """
+
+    matches = [EMPTY] * len(names)
+    same_block = idx.lookup(block, key)
+
+    queries, rows = [], []
+    for (i, name) in enumerate(names):
+        name = str(name)
+        if not name.startswith('nan') and len(same_block) > 0:
+            queries.append(name.strip())
+            rows.append(i)
+
+    if len(queries) == 0:
+        return matches, 0
+
+    comparisons = 0
+    prune = prune and len(same_block) >= PRUNE_MIN
+    chunk_rows = max(1, BATCH_CELLS // len(same_block))
+    for start in range(0, len(queries), chunk_rows):
+        chunk = queries[start:start + chunk_rows]
+
+        if prune or keep is not None:
+            candidates = [idx.candidates(block, key, col, query, threshhold) if prune
+                          else same_block for query in chunk]
+            if keep is not None:
+                candidates = [keep(i, found) for (i, found)
+                              in zip(rows[start:start + chunk_rows], candidates)]
+            counts = np.array([len(found) for found in candidates], dtype=np.int64)
+            paired = np.concatenate(candidates + [EMPTY])
+            scores = scoring.score_pairs(np.repeat(np.array(chunk, dtype=object), counts),
+                                         idx.values(col, paired), threshhold, backend)
+            hits = scores > threshhold
+
+            ends = np.cumsum(counts)
+            for (row, i) in enumerate(rows[start:start + chunk_rows]):
+                (first, last) = (ends[row] - counts[row], ends[row])
+                matches[i] = paired[first:last][hits[first:last]]
+            comparisons += len(paired)
+        else:
+            scores = scoring.score_matrix(chunk, idx.values(col, same_block), threshhold, backend)
+            for (row, i) in enumerate(rows[start:start + chunk_rows]):
+                matches[i] = same_block[scores[row] > threshhold]
+            comparisons += len(chunk) * len(same_block)
+
+    return matches, comparisons
+
+
+class Plan(object):
+    """Rules compiled against an index, ready to search it for records
+
+    Build with compile_rules(). Like match.find_related(), a record is only searched for with a rule
+    if none of the earlier rules matched it. Each exact rule is one join of the records still
+    unresolved against a block of the index, and each fuzzy rule scores the unresolved records
+    block by block, all the records of a block together with fuzzy_batch().
+
+    Attributes:
+        rules (list): The Rules in the order they're run
+        index (index.BlockingIndex): The index searched
+        blocks (dict): rule name -> name of the index block it searches, rules with the same key
+            columns share a block
+    """
+
+    def __init__(self, rules, idx, blocks):
+        self.rules = rules
+        self.index = idx
+        self.blocks = blocks
+
+    def __repr__(self):
+        return 'Plan({})'.format(', '.join('{}@{}'.format(rule.name, self.blocks[rule.name])
+                                           for rule in self.rules))
+
+    def _levels(self, rule, geo_blocks=None):
+        """(block, key columns, max records) of each block a fuzzy rule searches, in order"""
+
+        if rule.geo and geo_blocks:
+            return [(block, self.index.keys.get(block, ()), max_size)
+                    for (block, max_size) in geo_levels(self.index, geo_blocks)]
+        return [(self.blocks[rule.name], rule.block, None)]
+
+    def _run_fuzzy(self, rule, levels, keys, rows, found, tier, backend, prune):
+        """Scores the unresolved rows block by block, returns the rows still unresolved"""
+
+        col = rule.fields[0]
+        tier.attempted += len(rows)
+
+        # records a narrower level didn't match move on to the next one
+        unresolved = list(rows)
+        for (block, cols, max_size) in levels:
+            by_key = OrderedDict()
+            if len(cols) == 0:
+                by_key[None] = unresolved
+            else:
+                for (row, key) in zip(unresolved, keys[list(cols)].iloc[unresolved].itertuples(
+                                      index=False, name=None)):
+                    if any(pd.isnull(val) for val in key):
+                        key = None
+                    by_key.setdefault(key, []).append(row)
+
+            unresolved = []
+            for (key, block_rows) in by_key.items():
+                if key is None:
+                    unresolved.extend(block_rows)
+                    continue
+
+                size = len(self.index.lookup(block, key))
+                if max_size is not None and size > max_size:
+                    tier.skipped += len(block_rows)
+                    unresolved.extend(block_rows)
+                    continue
+
+                with Timer(tier):
+                    (matched, compared) = fuzzy_batch(keys[col].iloc[block_rows].tolist(),
+                                                      self.index, block, key, col,
+                                                      rule.threshhold, backend, prune)
+                tier.candidates += len(block_rows) * size
+                tier.comparisons += compared
+
+                for (row, matches) in zip(block_rows, matched):
+                    if len(matches) > 0:
+                        tier.matched += 1
+                        found[row] = (rule.name, matches)
+                    else:
+                        unresolved.append(row)
+
+        return np.array(sorted(unresolved), dtype=np.intp)
+
+    def run(self, search_for, backend=None, result='tuples', stats=None, prune=True,
+            verbose=True, progress=None, progress_every=1000, geo_blocks=None):
+        """Searches the index for the records of search_for
+
+        The rules up to the first fuzzy one are run over all of search_for at once. With progress,
+        the rest are run progress_every records at a time, calling progress after each of them.
+
+        Args:
+            search_for (pd.DataFrame): DF of records run through clean.build_matching_cols()
+            backend, result, stats, progress, progress_every, prune, verbose, geo_blocks: See
+                match.find_related()
+
+        Returns:
+            The same list of tuples (or MatchResult) as match.find_related(), with the rules'
+            names as the match types
+        """
+
+        if result not in ('tuples', 'csr'):
+            raise ValueError("result must be 'tuples' or 'csr', not {}".format(result))
+
+        if not search_for.index.is_unique:
+            raise ValueError('Duplicate index entries of records being searched for are not '
+                             'allowed.')
+
+        run_stats = MatchStats()
+        started = time.perf_counter()
+        num_to_match = len(search_for)
+
+        levels = {rule.name: self._levels(rule, geo_blocks) for rule in self.rules
+                  if rule.comparator != 'exact'}
+
+        columns = []
+        for rule in self.rules:
+            wanted = list(rule.fields + rule.block)
+            for (_, cols, _) in levels.get(rule.name, []):
+                wanted.extend(cols)
+            for col in wanted:
+                if col not in columns:
+                    columns.append(col)
+        keys = search_for.reindex(columns=columns)
+
+        found = [(None, EMPTY)] * num_to_match
+
+        def run_rule(rule, rows):
+            tier = run_stats.tier(rule.name)
+            if rule.comparator == 'exact':
+                return join_tier(rule.name, self.index, self.blocks[rule.name],
+                                 keys[list(rule.fields)], rows, found, tier)
+            return self._run_fuzzy(rule, levels[rule.name], keys, rows, found, tier, backend,
+                                   prune)
+
+        first_fuzzy = len(self.rules)
+        for (i, rule) in enumerate(self.rules):
+            if rule.comparator != 'exact':
+                first_fuzzy = i
+                break
+
+        rows = np.arange(num_to_match)
+        for rule in self.rules[:first_fuzzy]:
+            rows = run_rule(rule, rows)
+
+        chunk_rows = max(1, progress_every) if progress is not None else max(1, num_to_match)
+        for start in range(0, num_to_match, chunk_rows):
+            end = min(start + chunk_rows, num_to_match)
+            chunk = rows[(rows >= start) & (rows < end)]
+            for rule in self.rules[first_fuzzy:]:
+                chunk = run_rule(rule, chunk)
+
+            if progress is not None and end < num_to_match:
+                progress(end, num_to_match)
+
+        offsets = np.zeros(num_to_match + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(matches) for (_, matches) in found])
+        positions = np.concatenate([matches for (_, matches) in found] + [EMPTY])
+
+        run_stats.records = num_to_match
+        run_stats.matched = int(sum(mtype is not None for (mtype, _) in found))
+        run_stats.multiple = int((np.diff(offsets) > 1).sum())
+        run_stats.seconds = time.perf_counter() - started
+        if stats is not None:
+            stats.merge(run_stats)
+
+        if progress is not None:
+            progress(num_to_match, num_to_match)
+
+        if verbose:
+            print(run_stats.summary())
+
+        related = MatchResult(search_for.index, offsets, self.index.labels(positions),
+                              [mtype for (mtype, _) in found],
+                              [rule.name for rule in self.rules])
+        if result == 'csr':
+            return related
+        return related.to_tuples()
+
+    def match_record(self, record, stats, backend=None, prune=True, geo_blocks=None):
+        """Runs the rules for one record until one of them finds a match
+
+        Args:
+            record (dict): The record's built matching fields, missing ones are treated as NaN
+            stats (stats.MatchStats): Counters of each rule to add to
+            backend, prune, geo_blocks: See match.find_related()
+
+        Returns:
+            (match type, positions): The first rule that matched and the positions in the index
+                of the records it matched, or (None, positions of nothing)
+        """
+
+        for rule in self.rules:
+            tier = stats.tier(rule.name)
+            tier.attempted += 1
+
+            if rule.comparator == 'exact':
+                with Timer(tier):
+                    matches = self.index.lookup(self.blocks[rule.name],
+                                                tuple(record.get(col, np.nan)
+                                                      for col in rule.fields))
+                tier.candidates += len(matches)
+            else:
+                matches = EMPTY
+                for (block, cols, max_size) in self._levels(rule, geo_blocks):
+                    key = tuple(record.get(col, np.nan) for col in cols)
+                    with Timer(tier):
+                        same_block = self.index.lookup(block, key)
+                        if max_size is not None and len(same_block) > max_size:
+                            tier.skipped += 1
+                            continue
+                        (matches, compared) = _fuzzy_positions(
+                            record.get(rule.fields[0], np.nan), self.index, same_block,
+                            rule.fields[0], rule.threshhold, backend,
+                            (block, key) if prune else None)
+                    tier.candidates += len(same_block)
+                    tier.comparisons += compared
+                    if len(matches) > 0:
+                        break
+
+            if len(matches) > 0:
+                tier.matched += 1
+                return rule.name, matches
+
+        return None, EMPTY
+
+
+def compile_rules(rules, search_in):
+    """Compiles match rules into a Plan for searching search_in
+
+    Rules blocking on the same columns share one block of the index, and the blocks the index
+    already has (e.g. index.DEFAULT_BLOCKS) are reused. A read-only index (see index.load_index())
+    only has the blocks it was saved with, rules needing any other block match nothing.
+
+    The rules are run in the order given, they aren't reordered. Only the exact rules that come
+    before the first fuzzy rule are joined over all of the records at once, ahead of any fuzzy
+    scoring (see Plan.run()). An exact rule after a fuzzy one is only looked up for the records
+    the fuzzy rules before it didn't match, so put the exact rules first to get the cheap joins
+    first, as DEFAULT_RULES does.
+
+    Args:
+        rules (list): Rules, or dicts of their arguments (see Rule), in the order to try them
+        search_in (pd.DataFrame or index.BlockingIndex): DF of records to look for matches in,
+            run through clean.build_matching_cols(), or an index already built over one. Blocks
+            the rules need are added to the index (if it has their columns).
+
+    Returns:
+        plan (Plan)
+
+    Example:
+    >>> from mergepurge import rules
+    >>> plan = rules.compile_rules([
+    ...     {'name': 'ExactEmail', 'fields': ['email']},
+    ...     {'name': 'FuzzContact-ExactZip', 'fields': ['aa_fullname'], 'comparator': 'fuzzy',
+    ...      'threshhold': 85, 'block': ['aa_zip']},
+    ... ], accounts)
+    >>> related = plan.run(contacts)
+    """
+
+    rules = [rule if isinstance(rule, Rule) else Rule.from_dict(rule) for rule in rules]
+
+    names = [rule.name for rule in rules]
+    if len(set(names)) != len(names):
+        raise ValueError('Rule names must be unique, got {}'.format(names))
+
+    idx = search_in if isinstance(search_in, BlockingIndex) else BlockingIndex(search_in, {})
+
+    by_cols = dict(BLOCK_NAMES)
+    by_cols.update({cols: name for (name, cols) in idx.keys.items()})
+
+    blocks = {}
+    for rule in rules:
+        name = by_cols.setdefault(rule.block, '+'.join(rule.block))
+        if not idx.has_block(name) and not idx.read_only:
+            idx.add_block(name, rule.block)
+        blocks[rule.name] = name
+
+    return Plan(rules, idx, blocks)
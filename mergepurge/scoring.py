@@ -0,0 +1,258 @@
+import numpy as np
+import pandas as pd
+from fuzzywuzzy import fuzz
+
+try:
+    from rapidfuzz import fuzz as rf_fuzz
+    from rapidfuzz import process as rf_process
+except ImportError:  # pragma: no cover - rapidfuzz is optional
+    rf_fuzz = None
+    rf_process = None
+
+
+def _as_choices(choices):
+    """Candidate strings as an object array with missing values replaced by ''"""
+    choices = pd.Series(choices, dtype=object).fillna('')
+    return choices.map(str).to_numpy(dtype=object)
+
+
+def _blank(choices):
+    """Boolean array of which candidate strings are empty or only whitespace"""
+    return np.array([c.strip() == '' for c in choices], dtype=bool)
+
+
+class FuzzywuzzyBackend(object):
+    """Scores with fuzz.ratio() of the fuzzywuzzy library, one pair of strings at a time
+
+    Always available, but slow. Kept as the reference implementation the other backends have to
+    agree with.
+    """
+
+    name = 'fuzzywuzzy'
+
+    def score(self, query, choices, cutoff=0):
+        """Scores one query string against every candidate string
+
+        Args:
+            query (str): String to compare to every candidate
+            choices (list-like): Candidate strings, missing values score 0
+            cutoff (int, optional): Scores below this are reported as 0
+
+        Returns:
+            scores (np.ndarray): int fuzz.ratio of query and each candidate, blank ones score 0
+        """
+
+        choices = _as_choices(choices)
+        scores = np.zeros(len(choices), dtype=np.int64)
+        if query == '':
+            return scores
+
+        for (i, choice) in enumerate(choices):
+            if choice.strip() == '':
+                continue
+            scores[i] = fuzz.ratio(query, choice)
+
+        scores[scores < cutoff] = 0
+        return scores
+
+    def score_matrix(self, queries, choices, cutoff=0):
+        """Scores every query string against every candidate string
+
+        Returns:
+            scores (np.ndarray): 2d int array of shape (len(queries), len(choices))
+        """
+
+        choices = _as_choices(choices)
+        scores = np.zeros((len(queries), len(choices)), dtype=np.int64)
+        for (i, query) in enumerate(queries):
+            scores[i] = self.score(query, choices, cutoff)
+        return scores
+
+    def score_pairs(self, queries, choices, cutoff=0):
+        """Scores each query string against the candidate string at the same position
+
+        Returns:
+            scores (np.ndarray): 1d int array of len(queries)
+        """
+
+        choices = _as_choices(choices)
+        scores = np.zeros(len(choices), dtype=np.int64)
+        for (i, (query, choice)) in enumerate(zip(queries, choices)):
+            if query == '' or choice.strip() == '':
+                continue
+            scores[i] = fuzz.ratio(query, choice)
+
+        scores[scores < cutoff] = 0
+        return scores
+
+
+class RapidfuzzBackend(FuzzywuzzyBackend):
+    """Scores with the rapidfuzz library, a whole column or matrix per call in native code
+
+    rapidfuzz's ratio is the same normalized indel similarity fuzzywuzzy computes with
+    python-Levenshtein, so after rounding the scores are identical. Pairs that can't reach cutoff
+    are abandoned early.
+
+    Args:
+        workers (int, optional): Threads to score a matrix with, -1 for all cores
+    """
+
+    name = 'rapidfuzz'
+
+    def __init__(self, workers=1):
+        if rf_process is None:
+            raise ImportError('The rapidfuzz scoring backend requires the rapidfuzz package.')
+        self.workers = workers
+
+    def score_matrix(self, queries, choices, cutoff=0):
+
+        choices = _as_choices(choices)
+        queries = [str(query) for query in queries]
+        if len(queries) == 0 or len(choices) == 0:
+            return np.zeros((len(queries), len(choices)), dtype=np.int64)
+
+        # float64 so rounding x.5 scores agrees with fuzzywuzzy, and the cutoff is lowered by half a
+        # point so raw scores that round up to it aren't abandoned
+        raw = rf_process.cdist(queries, choices, scorer=rf_fuzz.ratio,
+                               score_cutoff=max(cutoff - 0.5, 0), dtype=np.float64,
+                               workers=self.workers)
+        scores = np.rint(raw).astype(np.int64)
+
+        scores[:, _blank(choices)] = 0
+        scores[[query == '' for query in queries], :] = 0
+        scores[scores < cutoff] = 0
+        return scores
+
+    def score(self, query, choices, cutoff=0):
+        return self.score_matrix([query], choices, cutoff)[0]
+
+    def score_pairs(self, queries, choices, cutoff=0):
+
+        if not hasattr(rf_process, 'cpdist'):  # pragma: no cover - rapidfuzz < 3.6
+            return super(RapidfuzzBackend, self).score_pairs(queries, choices, cutoff)
+
+        choices = _as_choices(choices)
+        queries = [str(query) for query in queries]
+        if len(queries) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        raw = rf_process.cpdist(queries, choices, scorer=rf_fuzz.ratio,
+                                score_cutoff=max(cutoff - 0.5, 0), dtype=np.float64,
+                                workers=self.workers)
+        scores = np.rint(raw).astype(np.int64)
+
+        scores[_blank(choices) | np.array([query == '' for query in queries], dtype=bool)] = 0
+        scores[scores < cutoff] = 0
+        return scores
+
+
+BACKENDS = {
+    'fuzzywuzzy': FuzzywuzzyBackend,
+    'rapidfuzz': RapidfuzzBackend,
+}
+
+DEFAULT_BACKEND = 'rapidfuzz' if rf_process is not None else 'fuzzywuzzy'
+
+_backends = {}
+
+
+def get_backend(backend=None):
+    """Looks up a scoring backend
+
+    Args:
+        backend (str or object, optional): Name of one of the BACKENDS, an object with score() and
+            score_matrix() methods, or None for DEFAULT_BACKEND
+
+    Returns:
+        backend (object): A scoring backend
+    """
+
+    if backend is None:
+        backend = DEFAULT_BACKEND
+
+    if not isinstance(backend, str):
+        return backend
+
+    if backend not in _backends:
+        try:
+            _backends[backend] = BACKENDS[backend]()
+        except KeyError:
+            raise ValueError('Unknown scoring backend: {}'.format(backend))
+
+    return _backends[backend]
+
+
+def set_default_backend(backend):
+    """Sets the scoring backend used when none is passed, e.g. 'fuzzywuzzy'"""
+
+    global DEFAULT_BACKEND
+    get_backend(backend)
+    DEFAULT_BACKEND = backend
+
+
+def score_column(query, choices, cutoff=0, backend=None):
+    """fuzz.ratio of query and each of choices, see FuzzywuzzyBackend.score()
+
+    Example:
+    >>> from mergepurge import scoring
+    >>> scores = scoring.score_column('Acme Corp', df['aa_company'], cutoff=90)
+    """
+    return get_backend(backend).score(query, choices, cutoff)
+
+
+def score_matrix(queries, choices, cutoff=0, backend=None):
+    """fuzz.ratio of every pair of queries and choices, see FuzzywuzzyBackend.score_matrix()"""
+    return get_backend(backend).score_matrix(queries, choices, cutoff)
+
+
+def score_pairs(queries, choices, cutoff=0, backend=None):
+    """fuzz.ratio of queries[i] and choices[i] for each i, see FuzzywuzzyBackend.score_pairs()
+
+    Backends without a score_pairs() method score the pairs one at a time with score().
+    """
+
+    backend = get_backend(backend)
+    if not hasattr(backend, 'score_pairs'):
+        return np.array([backend.score(query, [choice], cutoff)[0]
+                         for (query, choice) in zip(queries, choices)], dtype=np.int64)
+    return backend.score_pairs(queries, choices, cutoff)
+
+
+def top_k(scores, k):
+    """Positions of the k highest scores, best first, of a score array or each row of a matrix
+
+    A partial selection with np.argpartition, so picking a few candidates out of many costs about
+    one pass over the scores instead of a full sort. Equal scores are ranked by position, so the
+    result doesn't depend on how the partition happened to order them.
+
+    Args:
+        scores (np.ndarray): 1d or 2d int scores, e.g. from score_column() or score_matrix()
+        k (int): Number of positions to pick, capped at the number of scores (per row)
+
+    Returns:
+        positions (np.ndarray): Shape (k,) for 1d scores or (rows, k) for a matrix
+
+    Example:
+    >>> from mergepurge import scoring
+    >>> best = scoring.top_k(scoring.score_column('Acme Corp', df['aa_company']), 5)
+    """
+
+    scores = np.asarray(scores)
+    matrix = np.atleast_2d(scores)
+    n = matrix.shape[1]
+    k = max(0, min(int(k), n))
+
+    # a unique key per column: the score first, then the earlier position
+    keys = matrix.astype(np.int64) * (n + 1) + (n - np.arange(n))
+
+    if k == 0:
+        top = np.zeros((len(matrix), 0), dtype=np.intp)
+    else:
+        if k < n:
+            top = np.argpartition(-keys, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(n), matrix.shape)
+        order = np.argsort(-np.take_along_axis(keys, top, axis=1), axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+
+    return top if scores.ndim == 2 else top[0]
@@ -0,0 +1,147 @@
+"""Local HTTP/JSON service answering match.match_one() lookups against a prebuilt index
+
+Usage:
+    python -m mergepurge.server customers.idx --port 8000 --addy-cols address,city,state,zip \\
+        --contact-cols first,last --company-cols company [--phone-cols phone] [--name-keys] \\
+        [--geo-blocks]
+
+POST /match with a JSON object (one record) or a list of them. Each record is answered with
+{"match_type": ..., "ids": [...]}. GET /health answers {"records": <records in the index>}.
+"""
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from . import match
+from .index import load_index
+
+
+def _to_json(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+class MatchHandler(BaseHTTPRequestHandler):
+    """Answers the requests of a server made by make_server()"""
+
+    def _reply(self, status, body):
+        payload = json.dumps(body, default=_to_json).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path != '/health':
+            return self._reply(404, {'error': 'not found'})
+        return self._reply(200, {'records': len(self.server.search_in)})
+
+    def do_POST(self):
+        if self.path != '/match':
+            return self._reply(404, {'error': 'not found'})
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            records = json.loads(self.rfile.read(length).decode('utf-8'))
+        except ValueError as e:
+            return self._reply(400, {'error': 'invalid JSON: {}'.format(e)})
+
+        single = isinstance(records, dict)
+        if single:
+            records = [records]
+        if not all(isinstance(record, dict) for record in records):
+            return self._reply(400, {'error': 'expected a JSON object or a list of them'})
+
+        answers = []
+        for record in records:
+            (mtype, ids) = match.match_one(record, self.server.search_in,
+                                           **self.server.match_kwargs)
+            answers.append({'match_type': mtype, 'ids': ids})
+
+        return self._reply(200, answers[0] if single else answers)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+
+def make_server(search_in, host='127.0.0.1', port=8000, addy_cols=None, contact_cols=None,
+                company_cols=None, backend=None, verbose=False, phone_cols=None, geo_blocks=None,
+                name_keys=False):
+    """An HTTP server answering match.match_one() lookups, call serve_forever() on it to start
+
+    Each request is answered in its own thread, the lookups only read search_in.
+
+    Args:
+        search_in (index.BlockingIndex): Index of the records to look for matches in
+        host (str, optional): Address to listen on, local only by default
+        port (int, optional): Port to listen on, 0 picks a free one
+        addy_cols, contact_cols, company_cols (list, optional): Fields of the posted records to
+            build the matching fields from, see match.match_one()
+        backend (str or object, optional): scoring backend for the fuzzy tiers
+        verbose (boolean, optional): Log each request to stderr
+        phone_cols, geo_blocks, name_keys (optional): Passed on to match.match_one(), so the
+            server runs the same tiers it would, e.g. name_keys for an index built with them
+
+    Returns:
+        server (http.server.ThreadingHTTPServer)
+
+    Example:
+    >>> from mergepurge import index, server
+    >>> service = server.make_server(index.load_index('customers.idx'), port=8000,
+    ...                              contact_cols=['first', 'last'], addy_cols=['state'])
+    >>> service.serve_forever()
+    """
+
+    service = ThreadingHTTPServer((host, port), MatchHandler)
+    service.search_in = search_in
+    service.match_kwargs = {'addy_cols': addy_cols,
+                            'contact_cols': contact_cols,
+                            'company_cols': company_cols,
+                            'backend': backend,
+                            'phone_cols': phone_cols,
+                            'geo_blocks': geo_blocks,
+                            'name_keys': name_keys}
+    service.verbose = verbose
+    return service
+
+
+def _cols(value):
+    return [col for col in value.split(',') if col] if value else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('index', help='directory of an index saved with BlockingIndex.save()')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--addy-cols', help='comma separated address fields of the records')
+    parser.add_argument('--contact-cols', help='comma separated contact name fields')
+    parser.add_argument('--company-cols', help='comma separated company name fields')
+    parser.add_argument('--phone-cols', help='comma separated phone number fields')
+    parser.add_argument('--name-keys', action='store_true',
+                        help='match on the phonetic and sorted word name keys, for an index built '
+                             'with them')
+    parser.add_argument('--geo-blocks', action='store_true',
+                        help='widen the business name tier from the zip code out to the state')
+    parser.add_argument('--backend', help='scoring backend, e.g. rapidfuzz')
+    parser.add_argument('--verbose', action='store_true', help='log each request')
+    args = parser.parse_args(argv)
+
+    service = make_server(load_index(args.index), args.host, args.port, _cols(args.addy_cols),
+                          _cols(args.contact_cols), _cols(args.company_cols), args.backend,
+                          args.verbose, _cols(args.phone_cols), args.geo_blocks or None,
+                          args.name_keys)
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.server_close()
+
+
+if __name__ == '__main__':
+    main()
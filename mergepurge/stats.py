@@ -0,0 +1,182 @@
+import time
+from collections import OrderedDict
+
+
+class _Counters(object):
+    """Named counters that add up, so stats of chunks or batches can be merged"""
+
+    FIELDS = ()
+
+    def __init__(self):
+        for field in self.FIELDS:
+            setattr(self, field, 0)
+
+    def merge(self, other):
+        for field in self.FIELDS:
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+        return self
+
+    def as_dict(self):
+        return OrderedDict((field, getattr(self, field)) for field in self.FIELDS)
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, ', '.join(
+            '{}={!r}'.format(k, v) for (k, v) in self.as_dict().items()))
+
+
+class TierStats(_Counters):
+    """Counters of one tier of match.find_related()
+
+    Attributes:
+        attempted (int): Records that were searched for with this tier
+        candidates (int): Records looked at, the matches of exact lookups or the records of the
+            block that fuzzy tiers scored
+        comparisons (int): Fuzzy comparisons performed
+        matched (int): Records this tier found at least one match for
+        skipped (int): Times a record's block was left unscored because it had more records than
+            its geo level allows, see match.find_related(geo_blocks=...)
+        seconds (float): Time spent in this tier
+    """
+
+    FIELDS = ('attempted', 'candidates', 'comparisons', 'matched', 'skipped', 'seconds')
+
+
+class MatchStats(object):
+    """Where match.find_related() spent its time and what it found
+
+    Pass one to find_related(stats=...) and read it afterwards, or export as_dict() to a metrics
+    system. Passing the same object to several calls adds up their counters.
+
+    Attributes:
+        records (int): Records searched for
+        matched (int): Records with at least one match
+        multiple (int): Records with more than one match
+        seconds (float): Total time spent
+        tiers (OrderedDict): match type -> TierStats, in the order the tiers were tried
+
+    Example:
+    >>> from mergepurge import match, stats
+    >>> match_stats = stats.MatchStats()
+    >>> related = match.find_related(contacts, other_contacts, stats=match_stats, verbose=False)
+    >>> match_stats.as_dict()['tiers']['ExactNameState']['seconds']
+    """
+
+    def __init__(self):
+        self.records = 0
+        self.matched = 0
+        self.multiple = 0
+        self.seconds = 0.0
+        self.tiers = OrderedDict()
+
+    def tier(self, name):
+        """The TierStats of the named tier, created the first time it's asked for"""
+
+        if name not in self.tiers:
+            self.tiers[name] = TierStats()
+        return self.tiers[name]
+
+    def merge(self, other):
+        self.records += other.records
+        self.matched += other.matched
+        self.multiple += other.multiple
+        self.seconds += other.seconds
+        for (name, tier) in other.tiers.items():
+            self.tier(name).merge(tier)
+        return self
+
+    def as_dict(self):
+        return OrderedDict([('records', self.records),
+                            ('matched', self.matched),
+                            ('multiple', self.multiple),
+                            ('seconds', self.seconds),
+                            ('tiers', OrderedDict((name, tier.as_dict())
+                                                  for (name, tier) in self.tiers.items()))])
+
+    def summary(self):
+        """The percentages of records with a match and with multiple matches, as text"""
+
+        lines = []
+        for (count, what) in ((self.matched, 'at least 1 matching record.'),
+                              (self.multiple, 'multiple matching records.')):
+            lines.append(''.join((str(round(count / self.records * 100, 2)), '% (', str(count),
+                                  ') of search_for records have ', what)))
+        return '\n'.join(lines)
+
+
+class ParserStats(_Counters):
+    """Counters of one of the parsers in clean
+
+    Attributes:
+        calls (int): Records parsed
+        fast (int): Records parsed by the rule-based fast path, without the tagger
+        fallbacks (int): Times the tagger raised a RepeatedLabelError and the parse fell back to
+            picking one of the repeated labels (cache hits don't re-count these)
+        seconds (float): Time spent parsing, including cache lookups
+    """
+
+    FIELDS = ('calls', 'fast', 'fallbacks', 'seconds')
+
+    @property
+    def tagged_rate(self):
+        """Fraction of the records the fast path left to the tagger (or its cache)"""
+        return (self.calls - self.fast) / self.calls if self.calls else 0.0
+
+
+class CleanStats(object):
+    """Where clean.build_matching_cols() spent its time
+
+    Attributes:
+        records (int): Records cleaned
+        seconds (float): Total time spent
+        parsers (OrderedDict): 'address', 'person' or 'business' -> ParserStats
+    """
+
+    def __init__(self):
+        self.records = 0
+        self.seconds = 0.0
+        self.parsers = OrderedDict()
+
+    def parser(self, name):
+        """The ParserStats of the named parser, created the first time it's asked for"""
+
+        if name not in self.parsers:
+            self.parsers[name] = ParserStats()
+        return self.parsers[name]
+
+    def merge(self, other):
+        self.records += other.records
+        self.seconds += other.seconds
+        for (name, parser) in other.parsers.items():
+            self.parser(name).merge(parser)
+        return self
+
+    def as_dict(self):
+        return OrderedDict([('records', self.records),
+                            ('seconds', self.seconds),
+                            ('parsers', OrderedDict((name, parser.as_dict())
+                                                    for (name, parser) in self.parsers.items()))])
+
+    def summary(self):
+        """The share of each parser's records that fell back to the tagger, as text"""
+
+        lines = []
+        for (name, parser) in self.parsers.items():
+            lines.append('{}: {}% ({} of {}) of records parsed by the tagger.'.format(
+                name, round(parser.tagged_rate * 100, 2), parser.calls - parser.fast,
+                parser.calls))
+        return '\n'.join(lines)
+
+
+class Timer(object):
+    """Context manager that adds the time spent inside it to a counter's seconds attribute"""
+
+    def __init__(self, counter):
+        self.counter = counter
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.counter.seconds += time.perf_counter() - self.start
+        return False
@@ -0,0 +1,113 @@
+import pandas as pd
+from . import clean, match
+from .index import BlockingIndex
+
+
+def build_index(search_in, wanted_cols=None):
+    """Builds a BlockingIndex of search_in keeping only the columns needed to match and merge
+
+    Args:
+        search_in (pd.DataFrame): DF of records already run through clean.build_matching_cols()
+        wanted_cols (list, optional): Columns of search_in to merge into the records searched for
+
+    Returns:
+        idx (index.BlockingIndex)
+    """
+
+    if wanted_cols is None:
+        wanted_cols = []
+
+    keep = [col for col in search_in.columns if col.startswith('aa_') or col in wanted_cols]
+    return BlockingIndex(search_in[keep])
+
+
+def merge_chunks(search_for, search_in, output, wanted_cols, addy_cols=None, contact_cols=None,
+                 company_cols=None, chunksize=100000, sep='\t', read_kwargs=None,
+                 write_kwargs=None, drop_built_cols=True, stats=None, progress=None,
+                 **build_kwargs):
+    """Cleans, matches and merges a list of contacts too large to fit in memory, a chunk at a time
+
+    Streams the records of search_for through clean.build_matching_cols(), match.find_related()
+    and match.merge_lists() one chunk at a time, appending each merged chunk to output. Only one
+    chunk of search_for and an index of search_in are held in memory at once, so peak memory depends
+    on chunksize and the size of search_in, not on the size of search_for.
+
+    Args:
+        search_for (str, file-like or iterable): Path or buffer of a delimited file of records to
+            look for, or an iterable of DataFrames (e.g. pd.read_csv(..., chunksize=n))
+        search_in (pd.DataFrame or index.BlockingIndex): Records to look for matches in, already
+            run through clean.build_matching_cols(), or an index of them from build_index()
+        output (str or file-like): Path or buffer to write the merged records to
+        wanted_cols (list): Columns of search_in to add to the records of search_for
+        addy_cols, contact_cols, company_cols (list): Columns of search_for to build matching
+            columns from, see clean.build_matching_cols()
+        chunksize (int, optional): Records of search_for per chunk when reading from a file
+        sep (str, optional): Delimiter of the input file and the output
+        read_kwargs (dict, optional): Additional arguments to pd.read_csv()
+        write_kwargs (dict, optional): Additional arguments to pd.DataFrame.to_csv()
+        drop_built_cols (boolean, optional): Leave the aa_ matching columns out of the output
+        stats (stats.MatchStats, optional): Filled in with the matching stats of every chunk
+        progress (function, optional): Called with the number of records read so far after each
+            chunk is written
+        **build_kwargs: Additional arguments to clean.build_matching_cols() e.g. n_jobs
+
+    Returns:
+        n_records (int): How many records of search_for were read
+
+    Example:
+    >>> from mergepurge import clean, stream
+    >>> accounts = clean.build_matching_cols(accounts, ['address', 'city', 'state', 'zip'],
+    ...                                      ['first', 'last'], ['company'])
+    >>> stream.merge_chunks('vendor.tsv', accounts, 'merged.tsv', ['email', 'customer_ID'],
+    ...                     ['address', 'city', 'state', 'zip'], ['first', 'last'], ['company'])
+    """
+
+    if isinstance(search_in, BlockingIndex):
+        idx = search_in
+    else:
+        idx = build_index(search_in, wanted_cols)
+
+    if isinstance(search_for, pd.DataFrame):
+        chunks = [search_for]
+    elif hasattr(search_for, 'read') or isinstance(search_for, str):
+        read_kwargs = dict(read_kwargs or {})
+        read_kwargs.setdefault('sep', sep)
+        chunks = pd.read_csv(search_for, chunksize=chunksize, **read_kwargs)
+    else:
+        chunks = search_for
+
+    write_kwargs = dict(write_kwargs or {})
+    write_kwargs.setdefault('sep', sep)
+    write_kwargs.setdefault('index', False)
+
+    def write(merged, mode):
+        if drop_built_cols:
+            merged = merged.drop([col for col in merged.columns if col.startswith('aa_')],
+                                 axis=1)
+        merged.to_csv(output, header=mode == 'w', mode=mode, **write_kwargs)
+
+    # the first write truncates output and writes the header, the rest append
+    mode = 'w'
+    n_records = 0
+    empty = pd.DataFrame()
+    for chunk in chunks:
+        if len(chunk) == 0:
+            empty = chunk
+            continue
+
+        chunk = clean.build_matching_cols(chunk, addy_cols, contact_cols, company_cols,
+                                          **build_kwargs)
+        related = match.find_related(chunk, idx, result='csr', stats=stats, verbose=False)
+        write(match.merge_lists(chunk, idx.frame, related, wanted_cols, verbose=False), mode)
+        mode = 'a'
+
+        n_records += len(chunk)
+        if progress is not None:
+            progress(n_records)
+
+    # no records at all still leaves an output with just the header, of the columns of an empty
+    # chunk if there was one
+    if mode == 'w':
+        write(match.merge_lists(empty, idx.frame, [], wanted_cols, verbose=False), mode)
+
+    return n_records
@@ -1,5 +1,7 @@
 import os
+import random
 import sys
+import pandas as pd
 
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -7,3 +9,37 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 TOP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 COMP_PATH = os.path.join(TOP_DIR, 'tests', 'complete_parsed.tsv')
 PARTIAL_PATH = os.path.join(TOP_DIR, 'tests', 'incomplete.tsv')
+
+# keeps the leading zeros of zip codes and street numbers
+DTYPES = {'aa_streetnum': str, 'aa_zip': str, 'zipcode': str}
+
+
+def read_records(path=COMP_PATH):
+    """The test records of a .tsv, e.g. COMP_PATH, as a DataFrame"""
+    return pd.read_csv(path, sep='\t', encoding='utf-8', dtype=DTYPES)
+
+
+def typo_records(records, seed=0):
+    """A copy of records with two neighboring letters swapped in each aa_fullname and aa_company"""
+
+    rng = random.Random(seed)
+
+    def typo(name):
+        if not isinstance(name, str) or len(name) < 3:
+            return name
+        i = rng.randrange(len(name) - 1)
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+
+    noisy = records.copy()
+    noisy['aa_fullname'] = noisy['aa_fullname'].map(typo)
+    noisy['aa_company'] = noisy['aa_company'].map(typo)
+    return noisy
+
+
+def misspelled_records(records):
+    """A copy of records with the first 'a' of each aa_fullname made an 'e', indexed from 1000"""
+
+    misspelled = records.copy()
+    misspelled['aa_fullname'] = misspelled['aa_fullname'].str.replace('a', 'e', n=1)
+    misspelled.index = misspelled.index + 1000
+    return misspelled
@@ -0,0 +1,89 @@
+import asyncio
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from context import read_records, typo_records
+from mergepurge import batching, clean, index, match, stats
+
+
+COMP = read_records()
+
+
+def _records():
+    search_for = typo_records(COMP)
+    search_for['aa_streetnum'] = '9'
+    search_for.loc[::7, 'aa_state'] = np.nan
+    search_for.loc[::5, 'aa_fullname'] = np.nan
+    return search_for.to_dict('records')
+
+
+def test_match_many_agrees_with_match_one():
+    idx = index.BlockingIndex(COMP)
+    records = _records()
+    one_by_one = [match.match_one(record, idx) for record in records]
+    assert {mtype for (mtype, _) in one_by_one} == {None, 'ExactNameState',
+                                                    'fuzzContact-ExactState', 'FuzzBiz-ExactState'}
+
+    match_stats = stats.MatchStats()
+    assert match.match_many(records, idx, stats=match_stats) == one_by_one
+    assert match.match_many(records, idx, prune=False) == one_by_one
+    assert match_stats.records == len(records)
+    assert match_stats.matched == sum(mtype is not None for (mtype, _) in one_by_one)
+
+
+def test_match_many_from_threads():
+    idx = index.BlockingIndex(COMP)
+    records = _records()
+    expected = match.match_many(records, idx)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        answers = list(pool.map(lambda _: match.match_many(records, idx), range(8)))
+    assert all(answer == expected for answer in answers)
+
+
+def test_batcher_answers_concurrent_lookups():
+    idx = index.BlockingIndex(COMP)
+    records = _records()
+    expected = [match.match_one(record, idx) for record in records]
+
+    async def lookup():
+        batcher = batching.MatchBatcher(idx, max_batch=32, max_wait=0.01)
+        try:
+            answers = await batcher.match_all(records)
+        finally:
+            await batcher.close()
+        return answers, batcher.batches
+
+    (answers, batches) = asyncio.run(lookup())
+    assert answers == expected
+    assert 1 < batches < len(records)
+
+
+def test_batcher_fails_lookups_when_its_worker_dies():
+    idx = index.BlockingIndex(COMP)
+    records = _records()
+
+    async def lookup():
+        batcher = batching.MatchBatcher(idx, max_batch=4, max_wait=0.01)
+        # an answer that can't be handed out kills the worker outside of matching
+        batcher._match_many = lambda records: None
+        try:
+            return await asyncio.wait_for(asyncio.gather(*(batcher.match(record)
+                                                           for record in records[:10]),
+                                                         return_exceptions=True), 5)
+        finally:
+            await batcher.close()
+
+    answers = asyncio.run(lookup())
+    assert len(answers) == 10
+    assert all(isinstance(answer, TypeError) for answer in answers)
+
+
+def test_parse_cache_shared_between_threads():
+    cache = clean.ParseCache(maxsize=50)
+    names = ['name {}'.format(i % 80) for i in range(2000)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        parsed = list(pool.map(lambda name: cache.lookup(('upper', name), str.upper, name), names))
+    assert parsed == [name.upper() for name in names]
+    assert len(cache) == 50
+    assert cache.hits + cache.misses == len(names)
+    assert len(pickle.loads(pickle.dumps(cache))) == 50
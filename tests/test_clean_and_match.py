@@ -1,6 +1,6 @@
 import os
 import pytest
-from mergepurge import clean, match
+from mergepurge import clean, index, match, rules, stats
 import pandas as pd
 import numpy as np
 from context import COMP_PATH, PARTIAL_PATH
@@ -58,6 +58,147 @@ def test_build_matching_cols():
     assert all(built[BUILT_COLS] == known)
 
 
+def test_build_matching_cols_in_parallel():
+    serial = clean.build_matching_cols(partial.copy(),
+                                       PART_LOC_COLS,
+                                       PART_CONTACT_COLS,
+                                       PART_COMPANY_COLS)
+    parallel = clean.build_matching_cols(partial.copy(),
+                                         PART_LOC_COLS,
+                                         PART_CONTACT_COLS,
+                                         PART_COMPANY_COLS,
+                                         n_jobs=2,
+                                         chunksize=3)
+    assert serial.equals(parallel)
+
+    # a missing column is blank either way
+    missing = PART_LOC_COLS + ['no_such_col']
+    serial = clean.build_matching_cols(partial.copy(), missing)
+    parallel = clean.build_matching_cols(partial.copy(), missing, n_jobs=2, chunksize=3)
+    assert serial.equals(parallel)
+
+
+def test_parse_cache_reuses_parses():
+    cache = clean.ParseCache()
+    twice = pd.concat([partial, partial], ignore_index=True)
+    built = clean.build_matching_cols(twice, PART_LOC_COLS, PART_CONTACT_COLS, PART_COMPANY_COLS,
+                                      cache=cache)
+    uncached = clean.build_matching_cols(twice.copy(), PART_LOC_COLS, PART_CONTACT_COLS,
+                                         PART_COMPANY_COLS, cache=False)
+    assert built.equals(uncached)
+    assert cache.hits >= cache.misses
+
+
+@pytest.mark.parametrize('cache, expected', [(True, True), (False, False), (None, False),
+                                             (clean.ParseCache(), True)])
+def test_worker_processes_cache_unless_told_not_to(cache, expected):
+    assert clean._worker_cache(cache) is expected
+
+
+def test_parse_cache_is_bounded():
+    cache = clean.ParseCache(maxsize=2)
+    for key in 'abc':
+        cache.lookup(key, str.upper, key)
+    assert len(cache) == 2
+    assert 'a' not in cache
+    assert cache.lookup('c', str.upper, 'c') == 'C'
+    assert cache.stats() == {'hits': 1, 'misses': 3, 'size': 2, 'maxsize': 2}
+
+
+def test_parse_cache_persistence(tmp_path):
+    path = str(tmp_path / 'parses.pkl')
+    cache = clean.ParseCache(path=path)
+    parsed = clean.parse_business_name(trecords[0], COMP_COMPANY_COLS, cache=cache)
+    cache.save()
+
+    reloaded = clean.ParseCache(path=path)
+    assert len(reloaded) == 1
+    assert clean.parse_business_name(trecords[0], COMP_COMPANY_COLS, cache=reloaded) == parsed
+    assert reloaded.hits == 1
+
+
+@pytest.mark.parametrize('records', [complete, partial])
+def test_fast_path_matches_taggers(records):
+    raw = records[[col for col in records.columns if not col.startswith('aa_')]]
+    tagged = clean.build_matching_cols(raw.copy(), PART_LOC_COLS, PART_CONTACT_COLS,
+                                       PART_COMPANY_COLS, cache=False)
+    clean_stats = stats.CleanStats()
+    fast = clean.build_matching_cols(raw.copy(), PART_LOC_COLS, PART_CONTACT_COLS,
+                                     PART_COMPANY_COLS, cache=False, stats=clean_stats,
+                                     fast_path=True)
+    assert fast.equals(tagged)
+    assert clean_stats.parsers['address'].fast > 0
+    assert clean_stats.parsers['person'].fast > 0
+    assert clean_stats.parsers['business'].fast == 0
+    assert 0 < clean_stats.parsers['address'].tagged_rate < 1
+    assert 'address' in clean_stats.summary()
+
+
+@pytest.mark.parametrize('address', ['3386 Oakgreen Cove Kieler WI 53812',
+                                     '12 North Main St Chicago IL 60601',
+                                     '12 Main St Chicago ZZ 60601',
+                                     '12 Main St Chicago IL 60601-1234',
+                                     '12 Main St Suite 100 Chicago IL 60601',
+                                     '8042 Tall Pine Trail Green Bay WI 54301'])
+def test_fast_path_leaves_ambiguous_addresses_to_tagger(address):
+    assert clean._fast_address(address) is None
+
+
+def test_fast_path_simple_inputs():
+    assert clean._fast_address('8042 Tall Pine Trail, Sheffield IL 61361') == \
+        ('8042', 'Tall Pine', 'Sheffield', 'IL', '61361')
+    assert clean._fast_contact_name('Rob Bannister')[1:] == ('Rob', 'Bannister', 'Rob Bannister')
+    for name in ['Dr Spaceman', 'Rob  Bannister', 'rob bannister', 'Leo Van Spaceman', 'Leo']:
+        assert clean._fast_contact_name(name) is None
+
+
+def test_preclean_location_cols():
+    df = pd.DataFrame({'street': ['12 Main St\nSuite 4', 'N/A', '3 Oak/Elm Rd'],
+                       'city': ['Madison', 'Not available', '1/2 Way']})
+    cleaned = clean.preclean_location_cols(df, ['street', 'city'])
+    assert list(cleaned) == ['12 Main St, Suite 4, Madison', ', ', '3 Oak / Elm Rd, 1/2 Way']
+    assert list(cleaned) == [clean._preclean(clean._concat_row(row, ['street', 'city'], True),
+                                             clean.ADDRESS_SUBS) for row in df.to_dict('records')]
+
+
+@pytest.mark.parametrize('records', [complete, partial])
+def test_precleaned_parse_matches_row_parse(records):
+    built = clean.build_matching_cols(records.copy(), COMP_LOC_COLS, COMP_CONTACT_COLS,
+                                      COMP_COMPANY_COLS)
+    cols = ['aa_streetnum', 'aa_street', 'aa_city', 'aa_state', 'aa_zip', 'aa_fulladdy',
+            'aa_title', 'aa_firstname', 'aa_lastname', 'aa_fullname', 'aa_company']
+
+    for (row, from_cols) in zip(records.to_dict('records'),
+                                built[cols].itertuples(index=False, name=None)):
+        from_row = clean.parse_location_cols(row, COMP_LOC_COLS) + \
+            clean.parse_contact_name(row, COMP_CONTACT_COLS) + \
+            (clean.parse_business_name(row, COMP_COMPANY_COLS),)
+        assert all(a == b or (pd.isnull(a) and pd.isnull(b)) for (a, b) in zip(from_row, from_cols))
+
+
+PHONES = ['(608) 555-0142', '1-608-555-0142 ext. 12', '608.555.0142 Ext 3 ext 4',
+          '608 555 0142 ext', '+1 (608) 555 0142', '555-0142', '608-555-0142 x12', '', np.nan,
+          6085550142]
+
+
+def test_clean_US_phones_agrees_with_rows():
+    df = pd.DataFrame({'phone': PHONES, 'ext': ['', np.nan] * 5})
+    number, ext = clean.clean_US_phones(df, ['phone', 'ext'])
+    rows = [clean.clean_US_phone(row, ['phone', 'ext'], extension=True)
+            for (_, row) in df.iterrows()]
+    assert [(str(n), str(e)) for (n, e) in zip(number, ext)] == \
+        [(str(n), str(e)) for (n, e) in rows]
+    assert number[1] == '6085550142' and ext[1] == '12'
+    assert pd.isnull(number[5]) and pd.isnull(ext[0])
+
+
+def test_build_matching_cols_phone():
+    df = clean.build_matching_cols(pd.DataFrame({'phone': PHONES}), phone_cols=['phone'])
+    assert df['aa_phone'].notnull().sum() == 6
+    record = clean.build_matching_record({'phone': PHONES[1]}, phone_cols=['phone'])
+    assert (record['aa_phone'], record['aa_phone_ext']) == ('6085550142', '12')
+
+
 # ################  Test match.py  ################# #
 
 partial_parsed  = clean.build_matching_cols(partial.copy(),
@@ -83,3 +224,343 @@ def test_find_related(row):
     print('\nKnown to match index {}, found {}'.format(str(known), str(found)))
 
     assert known == found
+
+
+def test_find_related_with_prebuilt_index():
+    idx = index.BlockingIndex(complete)
+    reused = match.find_related(partial_parsed, idx)
+    assert [(t, i, list(m)) for (t, i, m) in reused] == \
+        [(t, i, list(m)) for (t, i, m) in related_records]
+
+
+def test_blocking_index_lookup():
+    idx = index.BlockingIndex(complete)
+    first = complete.iloc[0]
+    found = idx.lookup('name_state', (first.aa_fullname, first.aa_state))
+    assert 0 in idx.labels(found)
+    assert len(idx.lookup('name_state', (first.aa_fullname, np.nan))) == 0
+    assert len(idx.lookup('no_such_block', ('WI',))) == 0
+
+
+def test_compact_matching_cols():
+    compact = clean.compact_matching_cols(
+        clean.build_geo_keys(partial_parsed.drop(columns='matching_record')))
+    assert all(isinstance(compact[col].dtype, pd.CategoricalDtype)
+               for col in clean.CATEGORICAL_COLS)
+    assert list(compact['aa_fullname'].fillna('')) == list(partial_parsed['aa_fullname'].fillna(''))
+
+    found = match.find_related(compact, clean.compact_matching_cols(complete.copy()))
+    assert [(t, i, list(m)) for (t, i, m) in found] == \
+        [(t, i, list(m)) for (t, i, m) in related_records]
+
+    built = clean.build_matching_cols(partial.head(5).copy(), PART_LOC_COLS, PART_CONTACT_COLS,
+                                      PART_COMPANY_COLS, compact=True, fulladdy=False)
+    assert 'aa_fulladdy' not in built.columns
+    assert isinstance(built['aa_state'].dtype, pd.CategoricalDtype)
+
+
+def test_blocking_index_join():
+    idx = index.BlockingIndex(complete)
+    keys = partial_parsed[['aa_streetnum', 'aa_street', 'aa_state']]
+    for join in (idx.join, idx._join_by_lookup):
+        (offsets, positions) = join('address', keys)
+        assert [list(positions[offsets[i]:offsets[i + 1]]) for i in range(len(keys))] == \
+            [list(idx.lookup('address', key)) for key in keys.itertuples(index=False, name=None)]
+    assert join('no_such_block', keys)[0][-1] == 0
+
+
+def test_saved_index_finds_the_same_records(tmp_path):
+    path = str(tmp_path / 'complete.idx')
+    index.BlockingIndex(complete).save(path, columns=['email'])
+
+    for mmap in (True, False):
+        loaded = index.load_index(path, mmap=mmap)
+        found = match.find_related(partial_parsed, loaded)
+        assert [(t, i, list(m)) for (t, i, m) in found] == \
+            [(t, i, list(m)) for (t, i, m) in related_records]
+
+    assert list(loaded.frame['email']) == list(complete['email'].astype(object))
+
+
+def test_saved_index_groups(tmp_path):
+    path = str(tmp_path / 'complete.idx')
+    idx = index.BlockingIndex(complete)
+    idx.save(path)
+    loaded = index.load_index(path)
+
+    for block in ('state', 'address'):
+        groups = {key: list(positions) for (key, positions) in idx.groups(block)}
+        loaded_groups = {tuple(str(val) for val in key): list(positions)
+                         for (key, positions) in loaded.groups(block)}
+        assert loaded_groups == {tuple(str(val) for val in key): positions
+                                 for (key, positions) in groups.items()}
+    assert list(loaded.groups('no_such_block')) == []
+
+
+MERGE_DEST = pd.DataFrame({'name': ['a', 'b', 'c']}, index=[10, 11, 12])
+MERGE_SRC  = pd.DataFrame({'email': ['x@a', 'y@a', 'z@b'], 'other': [1, 2, 3]}, index=[7, 8, 9])
+MERGE_MATCHES = [('ExactNameState', 10, pd.Index([7, 8])),
+                 (None, None, ()),
+                 ('ExactAddress', 12, pd.Index([9]))]
+
+
+def test_merge_lists_all():
+    merged = match.merge_lists(MERGE_DEST, MERGE_SRC, MERGE_MATCHES, ['email'])
+    assert list(merged['name']) == ['a', 'a', 'b', 'c']
+    assert list(merged['email'].fillna('')) == ['x@a', 'y@a', '', 'z@b']
+    assert list(merged['src_ID'].fillna(-1)) == [7, 8, -1, 9]
+    assert list(merged['multiple_emails'].fillna('')) == [True, True, '', False]
+    assert list(merged['source_type'].fillna('')) == ['ExactNameState', 'ExactNameState', '',
+                                                      'ExactAddress']
+
+
+def test_merge_lists_first():
+    merged = match.merge_lists(MERGE_DEST, MERGE_SRC, MERGE_MATCHES, ['email'], how='first')
+    assert list(merged['email'].fillna('')) == ['x@a', '', 'z@b']
+    assert list(merged['multiple_emails'].fillna('')) == [True, '', False]
+
+
+def test_merge_lists_aggregate():
+    merged = match.merge_lists(MERGE_DEST, MERGE_SRC, MERGE_MATCHES, ['email'], how='aggregate')
+    assert list(merged['email'].fillna('')) == ['x@a, y@a', '', 'z@b']
+    assert merged['src_ID'].iloc[0] == (7, 8)
+
+
+def test_merge_lists_without_matches():
+    merged = match.merge_lists(MERGE_DEST, MERGE_SRC, [(None, None, ())] * 3, ['email'])
+    assert list(merged['name']) == ['a', 'b', 'c']
+    assert merged['email'].isnull().all()
+
+
+def test_find_related_csr_result():
+    related = match.find_related(partial_parsed, complete, result='csr')
+    assert len(related) == len(partial_parsed)
+    assert [(t, i, list(m)) for (t, i, m) in related.to_tuples()] == \
+        [(t, i, list(m)) for (t, i, m) in related_records]
+
+    pairs = related.to_frame()
+    assert len(pairs) == related.counts.sum()
+    assert list(pairs.columns) == ['search_for_ID', 'search_in_ID', 'match_type']
+
+    from_csr = match.merge_lists(partial_parsed, complete, related, ['email'])
+    from_tuples = match.merge_lists(partial_parsed, complete, related_records, ['email'])
+    assert from_csr.equals(from_tuples)
+
+
+def test_find_related_stats(capsys):
+    match_stats = stats.MatchStats()
+    progress = []
+    match.find_related(partial_parsed, complete, stats=match_stats, verbose=False,
+                       progress=lambda done, total: progress.append((done, total)),
+                       progress_every=5)
+    assert capsys.readouterr().out == ''
+
+    found = [row for row in related_records if row[0] is not None]
+    assert match_stats.records == len(partial_parsed)
+    assert match_stats.matched == len(found)
+    assert list(match_stats.tiers) == match.MATCH_TYPES
+    assert sum(tier.matched for tier in match_stats.tiers.values()) == len(found)
+    assert match_stats.tiers['ExactNameState'].attempted == len(partial_parsed)
+    assert progress == [(5, 20), (10, 20), (15, 20), (20, 20)]
+
+
+def test_build_matching_cols_stats():
+    clean_stats = stats.CleanStats()
+    clean.build_matching_cols(partial.copy(), PART_LOC_COLS, PART_CONTACT_COLS,
+                              PART_COMPANY_COLS, cache=False, stats=clean_stats)
+    assert clean_stats.records == len(partial)
+    assert list(clean_stats.parsers) == ['address', 'person', 'business']
+    assert all(parser.calls == len(partial) for parser in clean_stats.parsers.values())
+    assert clean_stats.as_dict()['parsers']['address']['seconds'] > 0
+
+
+def test_find_related_exact_phone():
+    search_in = complete.copy()
+    search_in['aa_phone'] = ['608555{:04d}'.format(i) for i in range(len(search_in))]
+    search_for = search_in.iloc[:3].copy()
+    search_for['aa_fullname'] = ['Nobody', np.nan, search_for['aa_fullname'].iloc[2]]
+    search_for['aa_streetnum'] = '0'
+    search_for['aa_company'] = np.nan
+
+    found = match.find_related(search_for, search_in, verbose=False)
+    assert [(t, list(m)) for (t, _, m) in found] == \
+        [('ExactPhone', [0]), ('ExactPhone', [1]), ('ExactNameState', [2])]
+
+    # without the column the tier never matches
+    found = match.find_related(search_for.drop(columns='aa_phone'), search_in, verbose=False)
+    assert 'ExactPhone' not in [t for (t, _, _) in found]
+
+
+def test_zip_prefixes_agree_with_zip_prefix():
+    zips = pd.Series(['02134-1203', np.nan, '123', ' 94110', '60614'])
+    (zip5, zip3) = clean.zip_prefixes(zips)
+    assert list(zip(zip5, zip3)) == [clean.zip_prefix(zip_) for zip_ in zips]
+    assert clean.zip_prefix('02134-1203') == ('02134', '021')
+    assert zip5.isnull().tolist() == [False, True, True, False, False]
+
+
+def test_find_related_geo_blocks(tmp_path):
+    # a chain with a location in the record's zip code and one in another city of the state
+    search_in = complete.iloc[:3].copy()
+    search_in['aa_fullname'] = ['Abe Froman', 'Cameron Frye', 'Ed Rooney']
+    search_in['aa_company'] = 'Chez Quis Restaurants'
+    search_in['aa_state'] = 'IL'
+    search_in['aa_city'] = ['Chicago', 'Springfield', 'Chicago']
+    search_in['aa_zip'] = ['60614', '62701', '60601']
+    clean.build_geo_keys(search_in)
+
+    search_for = search_in.iloc[[0]].copy()
+    search_for['aa_fullname'] = 'Sloane Peterson'
+    search_for['aa_streetnum'] = '0'
+    search_for['aa_company'] = 'Chez Quis Restaurant'
+    search_for.index = ['x']
+
+    by_state = match.find_related(search_for, search_in, verbose=False)
+    assert [(t, list(m)) for (t, _, m) in by_state] == [('FuzzBiz-ExactState', [0, 1, 2])]
+
+    geo_stats = stats.MatchStats()
+    by_zip = match.find_related(search_for, search_in, verbose=False, geo_blocks=True,
+                                stats=geo_stats)
+    assert [(t, list(m)) for (t, _, m) in by_zip] == [('FuzzBiz-ExactState', [0])]
+    assert geo_stats.tiers['FuzzBiz-ExactState'].candidates == 1
+
+    # a zip code no one else has widens to the zip prefix, then to the city
+    search_for['aa_zip5'] = '60699'
+    assert list(match.find_related(search_for, search_in, verbose=False,
+                                   geo_blocks=True)[0][2]) == [0, 2]
+    search_for['aa_zip5'], search_for['aa_zip3'] = '99999', '999'
+    assert list(match.find_related(search_for, search_in, verbose=False,
+                                   geo_blocks=True)[0][2]) == [0, 2]
+
+    # blocks bigger than their level allows are skipped
+    geo_stats = stats.MatchStats()
+    levels = [('city_state', 1), ('state', 2)]
+    assert match.find_related(search_for, search_in, verbose=False, geo_blocks=levels,
+                              stats=geo_stats)[0][0] is None
+    assert geo_stats.tiers['FuzzBiz-ExactState'].skipped == 2
+
+    idx = index.BlockingIndex(search_in)
+    record = search_for.iloc[0].to_dict()
+    for geo_blocks in (True, levels, [('state', None)]):
+        expected = match.find_related(search_for, idx, verbose=False, geo_blocks=geo_blocks)
+        (mtype, ids) = match.match_one(record, idx, geo_blocks=geo_blocks)
+        assert (mtype, ids) == (expected[0][0], list(expected[0][2]))
+        assert match.match_many([record], idx, geo_blocks=geo_blocks) == [(mtype, ids)]
+
+    # a saved index can't add the geo blocks once loaded, so they're saved with it
+    path = str(tmp_path / 'geo.idx')
+    index.BlockingIndex(search_in).save(path)
+    saved = index.load_index(path)
+    for geo_blocks in (True, levels):
+        expected = match.find_related(search_for, idx, verbose=False, geo_blocks=geo_blocks)
+        found = match.find_related(search_for, saved, verbose=False, geo_blocks=geo_blocks)
+        assert [(t, list(m)) for (t, _, m) in found] == [(t, list(m)) for (t, _, m) in expected]
+        assert match.match_one(record, saved, geo_blocks=geo_blocks) == \
+            match.match_one(record, idx, geo_blocks=geo_blocks)
+
+    # levels a read-only index doesn't have are left out
+    assert rules.geo_levels(saved, [('zip5', None), ('no_such_block', None)]) == [('zip5', None)]
+
+
+def test_geo_keys_only_built_when_asked():
+    built = clean.build_matching_cols(partial.head(5).copy(), PART_LOC_COLS, PART_CONTACT_COLS,
+                                      PART_COMPANY_COLS)
+    assert 'aa_zip5' not in built.columns and 'aa_zip3' not in built.columns
+
+    built = clean.build_matching_cols(partial.head(5).copy(), PART_LOC_COLS, PART_CONTACT_COLS,
+                                      PART_COMPANY_COLS, geo_keys=True)
+    assert list(built['aa_zip5']) == [clean.zip_prefix(z)[0] for z in built['aa_zip']]
+    assert list(built['aa_zip3']) == [clean.zip_prefix(z)[1] for z in built['aa_zip']]
+
+    record = partial.iloc[0].to_dict()
+    assert 'aa_zip5' not in clean.build_matching_record(record, PART_LOC_COLS)
+    built = clean.build_matching_record(record, PART_LOC_COLS, geo_keys=True)
+    assert (built['aa_zip5'], built['aa_zip3']) == clean.zip_prefix(built['aa_zip'])
+
+
+@pytest.mark.parametrize('word,code', [('Robert', 'R163'), ('Rupert', 'R163'), ('Ashcraft', 'A261'),
+                                       ('Tymczak', 'T522'), ('Pfister', 'F236'), ('Lee', 'L000'),
+                                       ('Smyth', 'S530'), ('Katherine', 'C365'), ('12', '')])
+def test_soundex(word, code):
+    assert clean.soundex(word) == code
+
+
+def test_find_related_name_keys():
+    search_in = complete.iloc[:4].copy()
+    search_in['aa_fullname'] = ['Catherine Smith', 'Abe Froman', 'Ed Rooney', 'Jeanie Bueller']
+    search_in['aa_company'] = ['Chez Quis', 'Sausage King of Chicago', 'Shermer High', np.nan]
+    search_in['aa_state'] = 'IL'
+
+    search_for = search_in.copy()
+    search_for['aa_fullname'] = ['Katherine Smyth', 'Froman Abe', 'Nobody', 'Nobody Else']
+    search_for['aa_company'] = [np.nan, np.nan, 'High, Shermer', np.nan]
+    search_for['aa_streetnum'] = '0'
+    search_for.index = ['a', 'b', 'c', 'd']
+
+    found = match.find_related(search_for, search_in, verbose=False)
+    assert [t for (t, _, _) in found] == [None] * 4
+    clean.build_name_keys(search_in)
+
+    keyed = clean.build_name_keys(search_for.copy())
+    assert keyed['aa_fullname_tokens'].tolist() == ['katherine smyth', 'abe froman', 'nobody',
+                                                    'else nobody']
+    match_stats = stats.MatchStats()
+    found = match.find_related(keyed, search_in, verbose=False, stats=match_stats)
+    assert [(t, list(m)) for (t, _, m) in found] == [('PhoneticName-ExactCity', [0]),
+                                                     ('SortedName-ExactState', [1]),
+                                                     ('SortedBiz-ExactState', [2]), (None, [])]
+    # the keys are looked up before any names are scored
+    assert match_stats.tiers['PhoneticName-ExactCity'].attempted == 2
+    assert match_stats.tiers['fuzzContact-ExactState'].attempted == 1
+
+    record = search_for.loc['a'].to_dict()
+    assert match.match_one(record, search_in) == (None, [])
+    assert match.match_one(record, search_in, name_keys=True) == ('PhoneticName-ExactCity', [0])
+
+    # alike sounding names elsewhere in the state aren't matched
+    keyed['aa_city'] = 'Springfield'
+    assert [t for (t, _, _) in match.find_related(keyed, search_in, verbose=False)] == \
+        [None, 'SortedName-ExactState', 'SortedBiz-ExactState', None]
+
+
+def test_find_neighbors():
+    search_for = complete.copy()
+    search_for['aa_fullname'] = search_for['aa_fullname'].str.replace('a', 'e', n=1)
+    search_for.index = search_for.index + 1000
+
+    pass_stats = stats.MatchStats()
+    found = match.find_neighbors(search_for, complete, window=4, stats=pass_stats, verbose=False)
+    assert len(found) == len(search_for)
+
+    passes = [name for (name, _, _, _) in match.NEIGHBOR_PASSES]
+    assert list(pass_stats.tiers) == passes
+    for tier in pass_stats.tiers.values():
+        assert tier.comparisons <= 4 * tier.attempted
+
+    # records already matched by a pass aren't searched for again
+    first = pass_stats.tiers[passes[0]]
+    assert first.attempted == len(search_for)
+    assert pass_stats.tiers[passes[1]].attempted == first.attempted - first.matched
+
+    # the record a misspelled name came from sorts right next to it
+    for (mtype, sf_ind, matches) in found:
+        if mtype == passes[0]:
+            assert sf_ind - 1000 in matches
+
+
+def test_find_neighbors_window_is_centered_on_the_key():
+    search_in = pd.DataFrame({'aa_state': 'IL', 'aa_city': list('ABCDEFGHIJ'),
+                              'aa_company': ['Acme {}'.format(c) for c in 'ABCDEFGHIJ']})
+    search_for = pd.DataFrame({'aa_state': ['IL'], 'aa_city': ['F'], 'aa_company': ['Acme F']},
+                              index=['x'])
+    passes = [('Neighbor-StateCity', ('aa_state', 'aa_city'), 'aa_company', 99)]
+
+    found = match.find_neighbors(search_for, search_in, passes, window=2, verbose=False)
+    assert [(t, list(m)) for (t, _, m) in found] == [('Neighbor-StateCity', [5])]
+
+    # only a window wide enough to reach a record sorting far away finds it
+    search_for['aa_city'] = 'A'
+    found = match.find_neighbors(search_for, search_in, passes, window=5, verbose=False)
+    assert found[0][0] is None
+    found = match.find_neighbors(search_for, search_in, passes, window=6, verbose=False)
+    assert list(found[0][2]) == [5]
@@ -0,0 +1,105 @@
+import contextlib
+import io
+import json
+import threading
+import urllib.request
+import numpy as np
+import pandas as pd
+import pytest
+from context import misspelled_records, read_records
+from mergepurge import clean, index, match, server, stats
+
+
+COMP = read_records()
+
+LOC_COLS     = ['address', 'city', 'state', 'zipcode']
+CONTACT_COLS = ['first', 'last']
+COMPANY_COLS = ['company']
+
+
+def test_match_one_agrees_with_find_related():
+    search_for = misspelled_records(COMP)
+    with contextlib.redirect_stdout(io.StringIO()):
+        related = match.find_related(search_for, COMP)
+
+    idx = index.BlockingIndex(COMP)
+    match_stats = stats.MatchStats()
+    for (record, (mtype, _, found)) in zip(search_for.to_dict('records'), related):
+        assert match.match_one(record, idx, stats=match_stats) == (mtype, list(found))
+
+    assert match_stats.records == len(search_for)
+    assert match_stats.matched == sum(mtype is not None for (mtype, _, _) in related)
+
+
+def test_match_one_cleans_raw_records():
+    idx = index.BlockingIndex(COMP)
+    record = COMP[LOC_COLS + CONTACT_COLS + COMPANY_COLS].iloc[0].to_dict()
+    (mtype, ids) = match.match_one(record, idx, LOC_COLS, CONTACT_COLS, COMPANY_COLS)
+    assert mtype == 'ExactNameState'
+    assert 0 in ids
+
+
+def test_match_one_no_match():
+    record = {'aa_fullname': 'Nobody Atall', 'aa_state': 'ZZ', 'aa_company': np.nan}
+    assert match.match_one(record, index.BlockingIndex(COMP)) == (None, [])
+
+
+@pytest.mark.parametrize('row', range(0, 60, 7))
+def test_build_matching_record_matches_build_matching_cols(row):
+    raw = COMP[LOC_COLS + CONTACT_COLS + COMPANY_COLS]
+    built = clean.build_matching_cols(raw.iloc[[row]].copy(), LOC_COLS, CONTACT_COLS,
+                                      COMPANY_COLS, cache=False)
+    record = clean.build_matching_record(raw.iloc[row].to_dict(), LOC_COLS, CONTACT_COLS,
+                                         COMPANY_COLS, cache=False)
+    for col in built.columns:
+        expected = built[col].iloc[0]
+        if pd.isnull(expected):
+            assert pd.isnull(record[col])
+        else:
+            assert record[col] == expected
+
+
+def _serve(service, records):
+    """Health and /match answers of service for records"""
+
+    thread = threading.Thread(target=service.serve_forever, daemon=True)
+    thread.start()
+    url = 'http://127.0.0.1:{}'.format(service.server_address[1])
+
+    try:
+        with urllib.request.urlopen(url + '/health') as response:
+            health = json.load(response)
+
+        request = urllib.request.Request(url + '/match', data=json.dumps(records).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request) as response:
+            answers = json.load(response)
+    finally:
+        service.shutdown()
+        service.server_close()
+
+    return health, answers
+
+
+def test_server_answers_lookups():
+    records = COMP[['aa_fullname', 'aa_state']].iloc[:3].to_dict('records')
+    (health, answers) = _serve(server.make_server(index.BlockingIndex(COMP), port=0), records)
+
+    assert health == {'records': len(COMP)}
+    assert [answer['match_type'] for answer in answers] == ['ExactNameState'] * 3
+    assert [i in answer['ids'] for (i, answer) in enumerate(answers)] == [True] * 3
+
+
+def test_server_runs_the_name_key_and_geo_tiers():
+    idx = index.BlockingIndex(clean.build_geo_keys(clean.build_name_keys(COMP.copy())))
+    records = COMP[['aa_fullname', 'aa_company', 'aa_city', 'aa_state', 'aa_zip']].iloc[:3]
+    records = records.assign(aa_fullname=[' '.join(reversed(name.split()))
+                                          for name in records['aa_fullname']])
+    records = records.fillna('').to_dict('records')
+
+    options = {'geo_blocks': True, 'name_keys': True}
+    (_, answers) = _serve(server.make_server(idx, port=0, **options), records)
+    expected = [match.match_one(record, idx, **options) for record in records]
+    assert [(answer['match_type'], answer['ids']) for answer in answers] == \
+        [(mtype, list(ids)) for (mtype, ids) in expected]
+    assert 'SortedName-ExactState' in [mtype for (mtype, _) in expected]
@@ -0,0 +1,68 @@
+import contextlib
+import io
+import pytest
+from context import misspelled_records, read_records
+from mergepurge import match, matcher
+
+
+COMP = read_records()
+
+LOC_COLS     = ['address', 'city', 'state', 'zipcode']
+CONTACT_COLS = ['first', 'last']
+COMPANY_COLS = ['company']
+
+
+def _related(search_for, search_in):
+    with contextlib.redirect_stdout(io.StringIO()):
+        related = match.find_related(search_for, search_in)
+    return [(mtype, i, list(found)) for (mtype, i, found) in related]
+
+
+def test_added_in_batches_matches_full_list():
+    accounts = matcher.Matcher(COMP.iloc[:40])
+    accounts.add(COMP.iloc[40:70]).add(COMP.iloc[70:])
+    assert len(accounts) == len(COMP)
+    search_for = misspelled_records(COMP)
+    assert _related(search_for, accounts) == _related(search_for, COMP)
+
+
+def test_remove_and_update_reflected_immediately():
+    accounts = matcher.Matcher(COMP)
+    search_for = misspelled_records(COMP)
+    _related(search_for, accounts)
+
+    removed = list(COMP.index[::3])
+    accounts.remove(removed)
+    assert not any(label in accounts for label in removed)
+    assert _related(search_for, accounts) == _related(search_for, COMP.drop(removed))
+
+    accounts.update(COMP.iloc[::3])
+    assert len(accounts) == len(COMP)
+    assert _related(search_for, accounts) == _related(search_for, accounts.frame)
+
+
+def test_compacts_after_removing_most_records():
+    accounts = matcher.Matcher(COMP)
+    accounts.remove(list(COMP.index[:80]))
+    assert accounts._n == len(accounts) == len(COMP) - 80
+    assert list(accounts.frame.index) == list(COMP.index[80:])
+    search_for = misspelled_records(COMP)
+    assert _related(search_for, accounts) == _related(search_for, COMP.iloc[80:])
+
+
+def test_duplicate_and_missing_labels():
+    accounts = matcher.Matcher(COMP.iloc[:10])
+    with pytest.raises(ValueError):
+        accounts.add(COMP.iloc[5:15])
+    with pytest.raises(KeyError):
+        accounts.remove([10])
+
+
+def test_cleans_added_records():
+    raw = COMP[LOC_COLS + CONTACT_COLS + COMPANY_COLS]
+    accounts = matcher.Matcher(raw.iloc[:5], LOC_COLS, CONTACT_COLS, COMPANY_COLS)
+    accounts.add(raw.iloc[5:10])
+    built = accounts.frame
+    assert list(built.index) == list(range(10))
+    assert list(built['aa_fullname']) == list(COMP['aa_fullname'].iloc[:10])
+    assert list(built['aa_state']) == list(COMP['aa_state'].iloc[:10])
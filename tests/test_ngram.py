@@ -0,0 +1,65 @@
+import contextlib
+import io
+import random
+import numpy as np
+import pandas as pd
+import pytest
+from context import read_records, typo_records
+from mergepurge import match, ngram, scoring
+
+
+NAMES = ['Kathrine Kline', 'Katherine Klein', '', '   ', np.nan, 'Rob Bannister', 'Robert Banister',
+         'Kline', 'Kathrine Kline ', 'Kathrine Kline', 'Acme Corp', 'Acme Corp.', 'a', 'ab']
+
+
+def _random_names(n, seed=0):
+    rng = random.Random(seed)
+    names = []
+    for _ in range(n):
+        length = rng.randint(1, 14)
+        names.append(''.join(rng.choice('abcde ') for _ in range(length)))
+    return names
+
+
+@pytest.mark.parametrize('threshhold', [0, 50, 80, 89, 90, 99])
+def test_candidates_include_every_match(threshhold):
+    names = _random_names(500)
+    grams = ngram.NgramIndex(names)
+    for query in _random_names(50, seed=1) + ['Kathrine Kline']:
+        scores = scoring.score_column(query, names)
+        found = set(grams.candidates(query, threshhold))
+        assert set(np.flatnonzero(scores > threshhold)) <= found
+
+
+def test_candidates_skip_blanks_and_empty_queries():
+    grams = ngram.NgramIndex(NAMES)
+    assert len(grams) == len(NAMES)
+    assert list(grams.candidates('', 0)) == []
+    found = list(grams.candidates('Kathrine Kline', 90))
+    assert 0 in found and 9 in found
+    assert not {2, 3, 4} & set(found)
+
+
+@pytest.mark.parametrize('query', ['Kathrine Kline', 'Acme Corp', 'Kline', '  Rob Banister  '])
+def test_finders_with_ngram_index_match_without(query):
+    search = pd.DataFrame({'aa_fullname': NAMES, 'aa_company': NAMES}, index=range(10, 24))
+    grams = ngram.NgramIndex(search['aa_fullname'])
+    for threshhold in (50, 89, 90):
+        for finder in (match.find_match_by_contact_name, match.find_match_by_biz_name):
+            pruned = finder(query, search, threshhold, ngram_index=grams)
+            assert list(pruned.index) == list(finder(query, search, threshhold).index)
+
+
+def test_find_related_pruned_matches_unpruned():
+    comp = read_records()
+    search_for = typo_records(comp)
+    search_for['aa_streetnum'] = '9'
+    search_for.index = search_for.index + 1000
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        pruned = match.find_related(search_for, comp, result='csr')
+        unpruned = match.find_related(search_for, comp, result='csr', prune=False)
+
+    assert list(pruned.match_type) == list(unpruned.match_type)
+    assert list(pruned.offsets) == list(unpruned.offsets)
+    assert list(pruned.matches) == list(unpruned.matches)
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+from mergepurge import index, purge, rules
+from context import read_records
+
+complete = read_records()
+
+# every other record again, with a different address and a misspelled name
+dupes = complete.iloc[::2].copy()
+dupes['aa_streetnum'] = '1'
+dupes['email'] = np.nan
+dupes['aa_fullname'] = dupes['aa_fullname'].str.replace('a', 'e', n=1)
+with_dupes = pd.concat([complete, dupes], ignore_index=True)
+
+
+def test_union_find():
+    uf = purge.UnionFind(5)
+    uf.union(0, 1)
+    uf.union(3, 4)
+    uf.union(1, 4)
+    roots = uf.roots()
+    assert len({roots[i] for i in (0, 1, 3, 4)}) == 1
+    assert roots[2] == 2
+
+
+def test_find_duplicates_clusters_each_copy_with_its_original():
+    clusters = purge.find_duplicates(with_dupes)
+    n = len(complete)
+    for (i, orig) in enumerate(range(0, n, 2)):
+        assert clusters[n + i] == clusters[orig]
+    assert len(set(clusters)) == n
+
+
+def test_find_duplicates_in_a_saved_index(tmp_path):
+    path = str(tmp_path / 'with_dupes.idx')
+    index.BlockingIndex(with_dupes).save(path)
+    clusters = purge.find_duplicates(index.load_index(path))
+    assert list(clusters) == list(purge.find_duplicates(with_dupes))
+
+
+def test_find_duplicates_fuzzy_chunks(monkeypatch):
+    clusters = purge.find_duplicates(with_dupes)
+    monkeypatch.setattr(rules, 'BATCH_CELLS', 1)
+    assert list(purge.find_duplicates(with_dupes)) == list(clusters)
+
+
+def test_link_fuzzy_scores_each_pair_once():
+    same_state = complete.head(40).copy()
+    same_state['aa_state'] = 'CA'
+    idx = index.BlockingIndex(same_state)
+    usable = np.array([purge._searchable(name) for name in same_state['aa_company']])
+    n = usable.sum()
+
+    compared = {}
+    for prune in (False, True):
+        resolved = np.zeros(len(idx), dtype=bool)
+        (compared[prune], _) = purge._link_fuzzy(purge.UnionFind(len(idx)), idx, 'state',
+                                                 'aa_company', 90, resolved, prune=prune)
+    assert compared[False] == n * (n - 1) // 2
+    assert compared[True] <= compared[False]
+
+    # unresolved records are scored against the resolved ones and the unresolved ones after them
+    resolved[:10] = True
+    (done, left) = (usable[:10].sum(), usable[10:].sum())
+    (pairs, _) = purge._link_fuzzy(purge.UnionFind(len(idx)), idx, 'state', 'aa_company', 90,
+                                   resolved, prune=False)
+    assert pairs == left * done + left * (left - 1) // 2
+
+
+def test_purge_survivors():
+    first = purge.purge(with_dupes)
+    assert first['aa_survivor'].sum() == len(complete)
+    assert first['aa_survivor'].iloc[:len(complete)].all()
+
+    # the duplicates are missing an email, so are never the most complete record
+    complete_ = purge.purge(with_dupes.iloc[::-1], survivor='complete')
+    assert not complete_.loc[complete_.index >= len(complete), 'aa_survivor'].any()
+
+    last = purge.purge(with_dupes, survivor=lambda cluster: cluster.index[-1])
+    assert last['aa_survivor'].iloc[len(complete):].all()
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import pytest
+from context import read_records, typo_records
+from mergepurge import index, match, rules, stats
+
+
+COMP = read_records()
+
+
+def _search_for():
+    search_for = typo_records(COMP)
+    search_for.loc[::3, 'aa_streetnum'] = '9'
+    search_for.loc[::7, 'aa_state'] = np.nan
+    search_for.loc[::5, 'aa_fullname'] = np.nan
+    return pd.concat([search_for, COMP], ignore_index=True)
+
+
+def _listed(related):
+    return [(mtype, sf_ind, list(matches)) for (mtype, sf_ind, matches) in related]
+
+
+def test_default_rules_agree_with_find_related():
+    search_for = _search_for()
+    expected_stats, plan_stats = stats.MatchStats(), stats.MatchStats()
+    expected = match.find_related(search_for, COMP, stats=expected_stats, verbose=False)
+
+    plan = rules.compile_rules(rules.DEFAULT_RULES, COMP)
+    assert _listed(plan.run(search_for, stats=plan_stats, verbose=False)) == _listed(expected)
+    assert _listed(plan.run(search_for, prune=False, verbose=False)) == _listed(expected)
+
+    assert (plan_stats.matched, plan_stats.multiple) == \
+        (expected_stats.matched, expected_stats.multiple)
+    for (name, tier) in expected_stats.tiers.items():
+        assert (plan_stats.tiers[name].attempted, plan_stats.tiers[name].matched) == \
+            (tier.attempted, tier.matched)
+
+
+def test_rules_share_the_index_blocks():
+    idx = index.BlockingIndex(COMP)
+    plan = rules.compile_rules(rules.DEFAULT_RULES, idx)
+    assert plan.index is idx
+    assert plan.blocks['ExactNameState'] == 'name_state'
+    assert plan.blocks['fuzzContact-ExactState'] == plan.blocks['FuzzBiz-ExactState'] == 'state'
+    assert list(idx.keys) == list(index.DEFAULT_BLOCKS)[:3]
+
+    # so all of the exact rules are run as whole-set joins before any names are scored
+    comparators = [rule.comparator for rule in plan.rules]
+    assert comparators == sorted(comparators, key=lambda comparator: comparator != 'exact')
+
+
+def test_custom_rules_from_dicts():
+    search_for = _search_for()
+    search_for.loc[::2, 'email'] = np.nan
+    plan = rules.compile_rules([
+        {'name': 'FuzzBiz-ExactZip', 'fields': ['aa_company'], 'comparator': 'fuzzy',
+         'threshhold': 85, 'block': ['aa_zip']},
+        {'name': 'ExactEmail', 'fields': ['email']},
+    ], COMP)
+
+    # in the order given
+    assert [rule.name for rule in plan.rules] == ['FuzzBiz-ExactZip', 'ExactEmail']
+    assert plan.blocks == {'ExactEmail': 'email', 'FuzzBiz-ExactZip': 'aa_zip'}
+
+    related = plan.run(search_for, result='csr', verbose=False)
+    emails = search_for['email'].to_numpy()
+    for (i, mtype) in enumerate(related.match_type):
+        ids = related.matches[related.offsets[i]:related.offsets[i + 1]]
+        if mtype == 'ExactEmail':
+            assert set(COMP.loc[ids, 'email']) == {emails[i]}
+        elif mtype == 'FuzzBiz-ExactZip':
+            assert set(COMP.loc[ids, 'aa_zip']) == {search_for['aa_zip'].iloc[i]}
+    assert set(related.match_type.dropna()) == {'ExactEmail', 'FuzzBiz-ExactZip'}
+
+
+def test_find_related_runs_the_default_rules():
+    assert match.MATCH_TYPES == [rule.name for rule in rules.DEFAULT_RULES]
+
+    related = match.find_related(_search_for(), COMP, result='csr', verbose=False)
+    assert list(related.match_type.categories) == match.MATCH_TYPES
+
+
+def test_rules_on_a_saved_index(tmp_path):
+    path = str(tmp_path / 'comp.idx')
+    index.BlockingIndex(COMP).save(path)
+    saved = index.load_index(path)
+
+    # a read-only index keeps the blocks it was saved with, rules needing others match nothing
+    plan = rules.compile_rules([rules.Rule('ExactEmail', ['email'])] + rules.DEFAULT_RULES, saved)
+    assert list(saved.keys) == list(index.DEFAULT_BLOCKS)[:3] + ['city_state']
+    related = plan.run(_search_for(), result='csr', verbose=False)
+    assert 'ExactEmail' not in set(related.match_type.dropna())
+    assert list(related.match_type.categories) == ['ExactEmail'] + match.MATCH_TYPES
+
+
+def test_match_record_agrees_with_run():
+    search_for = _search_for()
+    plan = rules.compile_rules(rules.DEFAULT_RULES, COMP)
+    related = plan.run(search_for, verbose=False)
+    for (record, (mtype, _, matches)) in zip(search_for.to_dict('records'), related):
+        (found, positions) = plan.match_record(record, stats.MatchStats())
+        assert found == mtype
+        assert list(plan.index.labels(positions)) == list(matches)
+
+
+def test_geo_rules_round_trip():
+    (rule,) = [rule for rule in rules.DEFAULT_RULES if rule.geo]
+    assert rule.name == 'FuzzBiz-ExactState'
+    assert rule.geo and rule.as_dict()['geo'] is True
+    assert rules.Rule.from_dict(rule.as_dict()).as_dict() == rule.as_dict()
+    with pytest.raises(ValueError):
+        rules.Rule('a', ['aa_zip'], geo=True)
+
+
+@pytest.mark.parametrize('spec', [{'name': 'a', 'fields': ['aa_zip'], 'comparator': 'soundex'},
+                                  {'name': 'a', 'fields': ['aa_zip'], 'threshhold': 90},
+                                  {'name': 'a', 'fields': ['aa_company'], 'comparator': 'fuzzy',
+                                   'threshhold': 90},
+                                  {'name': 'a', 'fields': []}])
+def test_invalid_rules(spec):
+    with pytest.raises(ValueError):
+        rules.Rule.from_dict(spec)
+
+
+def test_rule_names_must_be_unique():
+    with pytest.raises(ValueError):
+        rules.compile_rules([rules.Rule('a', ['aa_zip']), rules.Rule('a', ['email'])], COMP)
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+from context import read_records, typo_records
+from mergepurge import match, scoring
+
+
+NAMES = ['Kathrine Kline', 'Katherine Klein', '', '   ', np.nan, 'Rob Bannister', 'Robert Banister',
+         'Kline', 'Kathrine Kline ']
+
+
+@pytest.mark.parametrize('query', ['Kathrine Kline', 'Robert Bannister', 'Kline', ''])
+def test_backends_agree(query):
+    slow = scoring.score_column(query, NAMES, backend='fuzzywuzzy')
+    fast = scoring.score_column(query, NAMES, backend='rapidfuzz')
+    assert list(slow) == list(fast)
+
+
+@pytest.mark.parametrize('cutoff', [66, 67, 68])
+def test_backends_agree_at_the_cutoff(cutoff):
+    # scores 66.67 before rounding to 67
+    queries, choices = ['abcdefgh'], ['abcdefxyzw', 'abcdefgh', 'xyz']
+    slow = scoring.score_matrix(queries, choices, cutoff, backend='fuzzywuzzy')
+    fast = scoring.score_matrix(queries, choices, cutoff, backend='rapidfuzz')
+    assert slow.tolist() == fast.tolist()
+    assert slow[0, 0] == (67 if cutoff <= 67 else 0)
+    assert scoring.score_pairs(queries * 3, choices, cutoff, backend='rapidfuzz').tolist() == \
+        slow[0].tolist()
+
+
+def test_cutoff_zeroes_low_scores():
+    scores = scoring.score_column('Kathrine Kline', NAMES, cutoff=90)
+    assert all((scores == 0) | (scores >= 90))
+    assert scores[0] == 100
+
+
+def test_score_matrix_matches_rows():
+    queries = ['Kathrine Kline', 'Rob Bannister']
+    matrix = scoring.score_matrix(queries, NAMES)
+    assert matrix.shape == (2, len(NAMES))
+    for (i, query) in enumerate(queries):
+        assert list(matrix[i]) == list(scoring.score_column(query, NAMES))
+
+
+@pytest.mark.parametrize('backend', ['fuzzywuzzy', 'rapidfuzz'])
+def test_score_pairs_matches_columns(backend):
+    queries = ['Kathrine Kline', 'Rob Bannister', '']
+    for cutoff in (0, 90):
+        pairs = scoring.score_pairs(np.repeat(queries, len(NAMES)), NAMES * len(queries), cutoff,
+                                    backend)
+        assert list(pairs) == [score for query in queries
+                               for score in scoring.score_column(query, NAMES, cutoff, backend)]
+
+
+def test_find_match_by_contact_name_does_not_modify_search_df():
+    search = pd.DataFrame({'aa_fullname': NAMES, 'aa_lastname': NAMES})
+    before = search.copy()
+    found = match.find_match_by_contact_name('Kathrine Kline', search, 95)
+    assert list(found.index) == [0, 8]
+    assert search.equals(before)
+
+
+def test_top_k_ranks_ties_by_position():
+    scores = np.array([[5, 9, 9, 1, 9], [0, 0, 3, 0, 0]])
+    assert scoring.top_k(scores, 2).tolist() == [[1, 2], [2, 0]]
+    assert scoring.top_k(scores[0], 10).tolist() == [1, 2, 4, 0, 3]
+    assert scoring.top_k(scores[0], 0).tolist() == []
+
+
+def test_finders_return_top_n():
+    search = pd.DataFrame({'aa_fullname': NAMES, 'aa_company': NAMES})
+    for find in (match.find_match_by_contact_name, match.find_match_by_biz_name):
+        (found, top) = find('Kathrine Kline', search, 95, topN=3)
+        assert list(found.index) == [0, 8]
+        assert list(top.index) == [0, 8, 1]
+        assert list(top['aa_score']) == [100, 97, 90]
+        assert 'aa_score' not in search.columns
+
+
+def test_rank_candidates():
+    search_in = pd.DataFrame({'aa_fullname': NAMES, 'aa_state': 'WI'}, index=range(10, 19))
+    search_for = pd.DataFrame({'aa_fullname': ['Kathrine Kline', 'Rob Bannister', np.nan],
+                               'aa_state': ['WI', 'WI', 'WI']}, index=['a', 'b', 'c'])
+
+    ranked = match.rank_candidates(search_for, search_in, k=2, min_score=50)
+    assert list(ranked.columns) == ['search_for_ID', 'search_in_ID', 'score', 'rank']
+    assert list(ranked.itertuples(index=False, name=None)) == \
+        [('a', 10, 100, 1), ('a', 18, 97, 2), ('b', 15, 100, 1), ('b', 16, 86, 2)]
+
+    search_for.loc['b', 'aa_state'] = 'IL'
+    assert list(match.rank_candidates(search_for, search_in, k=1)['search_for_ID']) == ['a']
+    assert list(match.rank_candidates(search_for, search_in, k=1, block=None)['search_for_ID']) \
+        == ['a', 'b']
+
+
+@pytest.mark.parametrize('min_score', [1, 43, 60, 80])
+def test_rank_candidates_backends_agree(min_score):
+    search_in = read_records()
+    search_for = typo_records(search_in)
+    search_for.index = search_for.index + 1000
+
+    slow = match.rank_candidates(search_for, search_in, min_score=min_score, backend='fuzzywuzzy')
+    fast = match.rank_candidates(search_for, search_in, min_score=min_score, backend='rapidfuzz')
+    pd.testing.assert_frame_equal(slow, fast)
+
+
+def test_rank_candidates_chunks_by_cells(monkeypatch):
+    search_in = read_records()
+    search_for = typo_records(search_in)
+    search_for.index = search_for.index + 1000
+
+    whole = match.rank_candidates(search_for, search_in, k=3, block=None)
+    monkeypatch.setattr(match, 'RANK_CELLS', len(search_in) * 2 + 1)
+    pd.testing.assert_frame_equal(match.rank_candidates(search_for, search_in, k=3, block=None),
+                                  whole)
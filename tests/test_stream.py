@@ -0,0 +1,70 @@
+import io
+import pandas as pd
+from mergepurge import clean, match, stream
+from context import PARTIAL_PATH, read_records
+
+DTYPES    = {'aa_streetnum': str, 'aa_zip': str, 'zipcode': str}
+LOC_COLS  = ['address', 'city', 'state', 'zipcode']
+NAME_COLS = ['first', 'last']
+BIZ_COLS  = ['company']
+WANTED    = ['email', 'ID']
+
+complete = read_records()
+
+
+def test_merge_chunks_matches_in_memory_merge(tmp_path):
+    out_path = str(tmp_path / 'merged.tsv')
+    n_read = stream.merge_chunks(PARTIAL_PATH, complete, out_path, WANTED,
+                                 LOC_COLS, NAME_COLS, BIZ_COLS,
+                                 chunksize=6, read_kwargs={'dtype': DTYPES})
+
+    partial = pd.read_csv(PARTIAL_PATH, sep='\t', encoding='utf-8', dtype=DTYPES)
+    partial = clean.build_matching_cols(partial, LOC_COLS, NAME_COLS, BIZ_COLS)
+    merged = match.merge_lists(partial, complete, match.find_related(partial, complete), WANTED)
+    merged = merged.drop([col for col in merged.columns if col.startswith('aa_')], axis=1)
+
+    buf = io.StringIO()
+    merged.to_csv(buf, sep='\t', index=False)
+    buf.seek(0)
+
+    assert n_read == len(partial)
+    streamed = pd.read_csv(out_path, sep='\t')
+    expected = pd.read_csv(buf, sep='\t')
+    # a chunk without unmatched records writes the IDs as ints instead of floats
+    pd.testing.assert_frame_equal(streamed, expected, check_dtype=False)
+
+
+def test_merge_chunks_after_an_empty_chunk(tmp_path):
+    partial = pd.read_csv(PARTIAL_PATH, sep='\t', encoding='utf-8', dtype=DTYPES)
+    whole_path, chunked_path = str(tmp_path / 'whole.tsv'), str(tmp_path / 'chunked.tsv')
+
+    stream.merge_chunks(partial.copy(), complete, whole_path, WANTED,
+                        LOC_COLS, NAME_COLS, BIZ_COLS)
+    chunks = [partial.iloc[:0].copy(), partial.iloc[:6].copy(), partial.iloc[6:].copy()]
+    n_read = stream.merge_chunks(chunks, complete, chunked_path, WANTED,
+                                 LOC_COLS, NAME_COLS, BIZ_COLS)
+
+    assert n_read == len(partial)
+    pd.testing.assert_frame_equal(pd.read_csv(chunked_path, sep='\t'),
+                                  pd.read_csv(whole_path, sep='\t'), check_dtype=False)
+
+
+def test_merge_chunks_without_records(tmp_path):
+    partial = pd.read_csv(PARTIAL_PATH, sep='\t', encoding='utf-8', dtype=DTYPES)
+    whole_path, empty_path = str(tmp_path / 'whole.tsv'), str(tmp_path / 'empty.tsv')
+    stream.merge_chunks(partial, complete, whole_path, WANTED, LOC_COLS, NAME_COLS, BIZ_COLS)
+
+    # output is truncated and gets just the header
+    with open(empty_path, 'w') as f:
+        f.write('stale\n')
+    for chunks in ([partial.iloc[:0].copy()], io.StringIO('\t'.join(partial.columns) + '\n')):
+        assert stream.merge_chunks(chunks, complete, empty_path, WANTED,
+                                   LOC_COLS, NAME_COLS, BIZ_COLS) == 0
+        written = pd.read_csv(empty_path, sep='\t')
+        assert len(written) == 0
+        assert list(written.columns) == list(pd.read_csv(whole_path, sep='\t').columns)
+
+    # without even an empty chunk only the added columns are known
+    assert stream.merge_chunks([], complete, empty_path, WANTED) == 0
+    assert list(pd.read_csv(empty_path, sep='\t').columns) == \
+        WANTED + ['src_ID', 'dest_ID', 'source_type', 'multiple_emails']